@@ -1,16 +1,70 @@
-GOST_PARAMS = {
-    'Шрифт': 'Times New Roman',
-    'Размер шрифта': 14,
-    'Верхнее поле (см)': 2.0,
-    'Нижнее поле (см)': 2.0,
-    'Левое поле (см)': 3.0,
-    'Правое поле (см)': 1.0,
-    'Межстрочный интервал': 1.5,
-    'Отступ абзаца (см)': 1.25,
-    'Наличие колонтитулов': True,
-    'Наличие нумерации страниц': True,
-    'Наличие титульного листа': True
-}
+import os
+
+# Профили требований ГОСТ (JSON/YAML), см. utils/gost_profiles.py
+GOST_PROFILES_DIR = os.path.join(os.path.dirname(__file__), 'data', 'gost_profiles')
+DEFAULT_GOST_PROFILE = 'gost_7_32'
+
+RANDOM_SEED = 42
+
+# Воспроизводимое обучение (см. models/splits.py)
+TEST_SIZE = 0.2
+DETERMINISTIC_TRAINING = True  # фиксировать сиды Python/NumPy/TF и включать детерминированные операции TF
+
+# Режим больших датасетов (см. utils/large_dataset.py)
+DATASET_CACHE_DIR = os.path.join(os.path.dirname(__file__), 'data', 'cache')
+LARGE_DATASET_THRESHOLD_MB = 50  # загруженные файлы больше этого размера сохраняются на диск по частям
+LARGE_DATASET_CHUNK_ROWS = 50000
+LARGE_DATASET_SAMPLE_SIZE = 5000
+LARGE_DATASET_PAGE_SIZE = 100
+
+# Нечеткий поиск авторов (см. utils/author_index.py)
+AUTHOR_INDEX_CANDIDATES = 200  # кандидатов по триграммам для точного переранжирования
+AUTHOR_SEARCH_TOP_K = 10
+
+# Поиск дубликатов и повторных сдач работ (см. utils/dedup.py)
+DEDUP_NUM_PERM = 64  # длина сигнатуры MinHash
+DEDUP_BANDS = 16  # полос LSH (по DEDUP_NUM_PERM // DEDUP_BANDS значений в полосе)
+DEDUP_SHINGLE_SIZE = 4  # длина символьных шинглов названия
+DEDUP_SIMILARITY = 0.8  # порог оценки сходства Жаккара для почти-дубликатов
+
+# Мониторинг дрейфа входных данных (см. utils/drift.py)
+DRIFT_DIR = os.path.join(os.path.dirname(__file__), 'data', 'drift')  # состояние мониторов по источникам
+DRIFT_BINS = 10  # интервалов гистограммы на числовой признак (по квантилям обучающей выборки)
+DRIFT_PSI_WARN = 0.1
+DRIFT_PSI_ALERT = 0.25
+DRIFT_MAX_UNSEEN = 100  # сколько разных новых категорий хранить поименно
+
+# Офлайн-оценка кросс-валидацией (см. models/evaluation.py), отчет читает раздел "Анализ модели"
+EVALUATION_DIR = os.path.join(os.path.dirname(__file__), 'data', 'evaluation')
+EVAL_FOLDS = 5
+EVAL_WORKERS = None  # процессов; None - min(число фолдов, число ядер)
+EVAL_TF_THREADS = None  # потоков TF (intra/inter-op) в процессе; None - ядра / процессы
+EVAL_TOP_GROUPS = 20  # авторов с наибольшим числом ошибок в отчете
+
+# Фоновая проверка документов из папки (см. watch_daemon.py)
+WATCH_DIR = os.path.join(os.path.dirname(__file__), 'incoming')
+RESULTS_DB = os.path.join(os.path.dirname(__file__), 'data', 'results.sqlite3')
+WATCH_POLL_INTERVAL = 5  # секунд между просмотрами папки
+WATCH_QUEUE_SIZE = 32  # максимум файлов/пакетов в очередях между стадиями
+WATCH_BATCH_SIZE = 512  # строк в одном вызове модели
+WATCH_EXTRACT_WORKERS = 2
+
+# Атрибуция признаков (см. models/attribution.py): 'occlusion' или 'integrated_gradients'
+ATTRIBUTION_METHOD = 'occlusion'
+ATTRIBUTION_TOP_K = 5
+ATTRIBUTION_BATCH_ROWS = 8192  # строк в одном вызове predict при атрибуции
+IG_STEPS = 32
+
+# Бэкенд модели (см. models/backends.py): 'keras' (нейросеть), 'gbt' (градиентный бустинг) или 'logreg'
+MODEL_BACKEND = 'keras'
+BACKEND_MIN_ACCURACY = 0.95  # порог качества при выборе самого быстрого бэкенда (python -m models.backends)
+
+# Вариант модели для инференса (см. models/quantization.py, только для бэкенда 'keras'):
+# 'float32' (Keras), 'float16' или 'int8' (TFLite)
+MODEL_VARIANT = 'float32'
+QUANTIZED_VARIANTS = ('float16', 'int8')
+# Отчеты сравнения вариантов и бэкендов (python -m models.quantization / models.backends), в git не хранятся
+BENCHMARK_DIR = os.path.join(os.path.dirname(__file__), 'data', 'benchmarks')
 
 REQUIRED_COLUMNS = [
     'Название документа', 'Автор', 'Дата создания', 'Шрифт',
@@ -1,164 +1,336 @@
-# import docx
-# from docx.shared import Pt, Cm
-# from docx.oxml import parse_xml
-# from docx.oxml.ns import nsdecls
-# import pandas as pd
-# from typing import List, Dict, Union
-# import io
-# import re
-#
-#
-# class DocxProcessor:
-#     @staticmethod
-#     def extract_basic_metadata(doc) -> Dict:
-#         """Извлекает только основные параметры оформления из DOCX"""
-#         sections = doc.sections[0]
-#         style = doc.styles['Normal']
-#
-#         return {
-#             'font': style.font.name,
-#             'font_size': style.font.size.pt if style.font.size else 14,
-#             'top_margin': sections.top_margin.cm,
-#             'bottom_margin': sections.bottom_margin.cm,
-#             'left_margin': sections.left_margin.cm,
-#             'right_margin': sections.right_margin.cm,
-#             'line_spacing': style.paragraph_format.line_spacing or 1.5,
-#             'paragraph_indent': style.paragraph_format.first_line_indent.cm if style.paragraph_format.first_line_indent else 1.25,
-#             'has_headers': len(doc.sections[0].header.tables) > 0,
-#             'has_pagination': any(page_num in f.text for page_num in ['стр.', 'page'] for f in doc.footers),
-#             'has_title_page': any('титульный' in p.text.lower() for p in doc.paragraphs[:10])
-#         }
-#
-#     @staticmethod
-#     def _check_headers(doc) -> bool:
-#         """Проверяет оформление заголовков по ГОСТ"""
-#         for paragraph in doc.paragraphs:
-#             if paragraph.style.name.startswith('Heading'):
-#                 # Проверка: заголовки должны быть жирными и без точки в конце
-#                 if not paragraph.style.font.bold:
-#                     return False
-#                 if paragraph.text.strip().endswith('.'):
-#                     return False
-#                 # Проверка выравнивания (по центру для заголовков 1 уровня)
-#                 if 'Heading 1' in paragraph.style.name and paragraph.alignment != 1:  # 1 = center
-#                     return False
-#         return True
-#
-#     @staticmethod
-#     def _check_images(doc) -> bool:
-#         """Проверяет оформление рисунков по ГОСТ"""
-#         has_errors = False
-#         for paragraph in doc.paragraphs:
-#             if 'Рис.' in paragraph.text:
-#                 # Проверка формата подписи: "Рис. 1. - Описание"
-#                 if not re.match(r'^Рис\. \d+\..+', paragraph.text):
-#                     has_errors = True
-#                 # Проверка что рисунок действительно существует перед подписью
-#                 if not DocxProcessor._has_image_before_paragraph(doc, paragraph):
-#                     has_errors = True
-#         return not has_errors
-#
-#     @staticmethod
-#     def _has_image_before_paragraph(doc, paragraph) -> bool:
-#         """Проверяет наличие рисунка перед подписью"""
-#         # Логика поиска изображения перед подписью
-#         prev_elem = paragraph._element.getprevious()
-#         while prev_elem is not None:
-#             if prev_elem.tag.endswith('pict'):
-#                 return True
-#             prev_elem = prev_elem.getprevious()
-#         return False
-#
-#     @staticmethod
-#     def _check_tables(doc) -> bool:
-#         """Проверяет оформление таблиц по ГОСТ"""
-#         for table in doc.tables:
-#             # Проверка наличия заголовка таблицы
-#             if not table.rows[0].cells[0].text.strip():
-#                 return False
-#
-#             # Проверка что таблица имеет границы
-#             tbl_pr = table._element.xpath('w:tblPr')
-#             if tbl_pr and 'w:borders' not in tbl_pr[0].xml:
-#                 return False
-#         return True
-#
-#     @staticmethod
-#     def _check_links(doc) -> bool:
-#         """Проверяет оформление ссылок по ГОСТ"""
-#         for paragraph in doc.paragraphs:
-#             if '[' in paragraph.text and ']' in paragraph.text:
-#                 # Проверка формата ссылок: [1] или [1, с. 15]
-#                 if not re.search(r'\[\d+(, с\. \d+)?\]', paragraph.text):
-#                     return False
-#         return True
-#
-#     @staticmethod
-#     def _check_details(doc) -> bool:
-#         """Проверяет наличие всех реквизитов документа"""
-#         required_details = [
-#             'УДК', 'ББК', 'Автор', 'Название',
-#             'Год', 'Страниц'
-#         ]
-#         first_page_text = '\n'.join(p.text for p in doc.paragraphs[:20])
-#         return all(detail in first_page_text for detail in required_details)
-#
-#     @staticmethod
-#     def _check_contents(doc) -> bool:
-#         """Проверяет содержание/оглавление"""
-#         for paragraph in doc.paragraphs:
-#             if 'содержание' in paragraph.text.lower() or 'оглавление' in paragraph.text.lower():
-#                 # Проверка что содержание не пустое
-#                 next_para = paragraph._element.getnext()
-#                 if next_para is not None and next_para.text.strip():
-#                     return True
-#         return False
-#
-#     @staticmethod
-#     def _check_lists(doc) -> bool:
-#         """Проверяет оформление списков"""
-#         for paragraph in doc.paragraphs:
-#             if paragraph.style.name == 'List Paragraph':
-#                 # Проверка отступов в списках
-#                 if paragraph.paragraph_format.left_indent < Pt(18):
-#                     return False
-#         return True
-#
-#     @staticmethod
-#     def _check_appendix(doc) -> bool:
-#         """Проверяет оформление приложений"""
-#         appendix_pattern = re.compile(r'^Приложение [А-Я]', re.IGNORECASE)
-#         for paragraph in doc.paragraphs:
-#             if appendix_pattern.match(paragraph.text):
-#                 # Проверка что приложение начинается с новой страницы
-#                 if 'pageBreakBefore' not in paragraph._element.xml:
-#                     return False
-#         return True
-#
-#     @staticmethod
-#     def _check_pagination(doc) -> bool:
-#         """Проверяет наличие нумерации страниц"""
-#         for footer in doc.sections[0].footer.paragraphs:
-#             if any(char.isdigit() for char in footer.text):
-#                 return True
-#         return False
-#
-#     @staticmethod
-#     def _check_title_page(doc) -> bool:
-#         """Проверяет наличие титульного листа"""
-#         first_page_text = '\n'.join(p.text for p in doc.paragraphs[:10])
-#         keywords = ['реферат', 'курсовая', 'диплом', 'титульный']
-#         return any(keyword in first_page_text.lower() for keyword in keywords)
-#
-#     @staticmethod
-#     def process_files(files: List[io.BytesIO]) -> pd.DataFrame:
-#         """Обрабатывает список файлов и возвращает DataFrame"""
-#         data = []
-#         for file in files:
-#             try:
-#                 doc = docx.Document(file)
-#                 metadata = DocxProcessor.extract_metadata(doc)
-#                 data.append(metadata)
-#             except Exception as e:
-#                 print(f"Ошибка обработки файла: {str(e)}")
-#         return pd.DataFrame(data)
+import docx
+from docx.shared import Pt, Cm, Twips
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls, qn
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from collections import Counter
+import pandas as pd
+from typing import List, Dict, Union
+import io
+import re
+
+
+class DocxProcessor:
+    @staticmethod
+    def extract_basic_metadata(doc) -> Dict:
+        """Извлекает только основные параметры оформления из DOCX"""
+        sections = doc.sections[0]
+
+        return {
+            'font': DocxProcessor._resolve_font(doc),
+            'font_size': DocxProcessor._resolve_font_size(doc),
+            'top_margin': sections.top_margin.cm,
+            'bottom_margin': sections.bottom_margin.cm,
+            'left_margin': sections.left_margin.cm,
+            'right_margin': sections.right_margin.cm,
+            'line_spacing': DocxProcessor._resolve_line_spacing(doc),
+            'paragraph_indent': DocxProcessor._resolve_indent(doc),
+            'has_headers': any(p.text.strip() for p in sections.header.paragraphs) or len(sections.header.tables) > 0,
+            'has_pagination': DocxProcessor._check_pagination(doc),
+            'has_title_page': any('титульный' in p.text.lower() for p in doc.paragraphs[:10])
+        }
+
+    @staticmethod
+    def _resolve_font(doc) -> Union[str, None]:
+        """
+        Определяет шрифт основного текста так, как его отобразит Word:
+        1. шрифт, явно заданный в большей части текста документа (по длине фрагментов)
+        2. шрифт стиля Normal или его базовых стилей
+        3. шрифт по умолчанию документа (docDefaults), в том числе ссылка на шрифт темы
+        Возвращает None, если шрифт определить нельзя: подставлять значение по ГОСТ нельзя,
+        иначе документ ошибочно пройдет проверку шрифта.
+        """
+        runs = [(run.font.name, len(run.text)) for paragraph in doc.paragraphs for run in paragraph.runs]
+        return (DocxProcessor._dominant(runs)
+                or DocxProcessor._normal_style_value(doc, lambda style: DocxProcessor._rfonts_name(doc, style.element.rPr))
+                or DocxProcessor._rfonts_name(doc, DocxProcessor._doc_defaults(doc, 'w:rPr')))
+
+    @staticmethod
+    def _resolve_font_size(doc) -> Union[float, None]:
+        """Размер шрифта основного текста (пт) в том же порядке, что и _resolve_font; None, если не задан нигде."""
+        def points(length):
+            return length.pt if length is not None else None
+
+        runs = [(points(run.font.size), len(run.text)) for paragraph in doc.paragraphs for run in paragraph.runs]
+        size = DocxProcessor._dominant(runs)
+        if size is None:
+            size = DocxProcessor._normal_style_value(doc, lambda style: points(style.font.size))
+        if size is None:
+            sz = DocxProcessor._doc_defaults(doc, 'w:rPr', 'w:sz')
+            size = int(sz.get(qn('w:val'))) / 2 if sz is not None else None  # w:sz - в полупунктах
+        return size
+
+    @staticmethod
+    def _resolve_line_spacing(doc) -> Union[float, None]:
+        """
+        Межстрочный интервал (множитель) основного текста: преобладающий у абзацев,
+        затем стиль Normal и его базовые стили, затем docDefaults.
+        Точный интервал (в пунктах, а не множитель) с правилом ГОСТ не сравним и дает None.
+        """
+        def multiple(line_spacing):
+            return line_spacing if isinstance(line_spacing, float) else None
+
+        paragraphs = [(multiple(p.paragraph_format.line_spacing), len(p.text)) for p in doc.paragraphs]
+        spacing = DocxProcessor._dominant(paragraphs)
+        if spacing is None:
+            spacing = DocxProcessor._normal_style_value(doc, lambda style: multiple(style.paragraph_format.line_spacing))
+        if spacing is None:
+            element = DocxProcessor._doc_defaults(doc, 'w:pPr', 'w:spacing')
+            if element is not None and element.get(qn('w:line')) and element.get(qn('w:lineRule'), 'auto') == 'auto':
+                spacing = int(element.get(qn('w:line'))) / 240  # 240 - одинарный интервал
+        return spacing
+
+    @staticmethod
+    def _resolve_indent(doc) -> Union[float, None]:
+        """Отступ первой строки абзаца (см) в том же порядке, что и _resolve_line_spacing; выступ - отрицательный."""
+        def centimeters(length):
+            return length.cm if length is not None else None
+
+        paragraphs = [(centimeters(p.paragraph_format.first_line_indent), len(p.text)) for p in doc.paragraphs]
+        indent = DocxProcessor._dominant(paragraphs)
+        if indent is None:
+            indent = DocxProcessor._normal_style_value(
+                doc, lambda style: centimeters(style.paragraph_format.first_line_indent))
+        if indent is None:
+            element = DocxProcessor._doc_defaults(doc, 'w:pPr', 'w:ind')
+            if element is not None and element.get(qn('w:firstLine')):
+                indent = Twips(int(element.get(qn('w:firstLine')))).cm
+            elif element is not None and element.get(qn('w:hanging')):
+                indent = -Twips(int(element.get(qn('w:hanging')))).cm
+        return indent
+
+    @staticmethod
+    def _dominant(weighted_values):
+        """
+        Значение, явно заданное в большей части текста: пары (значение, длина текста).
+        None, если такого нет - тогда значение берется из стилей.
+        """
+        explicit, total = Counter(), 0
+        for value, length in weighted_values:
+            total += length
+            if value is not None:
+                explicit[value] += length
+        if explicit:
+            value, length = explicit.most_common(1)[0]
+            if length * 2 > total:
+                return value
+        return None
+
+    @staticmethod
+    def _normal_style_value(doc, getter):
+        """Первое непустое значение getter(стиль) для стиля Normal и цепочки его базовых стилей."""
+        style = doc.styles['Normal']
+        while style is not None:
+            value = getter(style)
+            if value is not None:
+                return value
+            style = style.base_style
+        return None
+
+    @staticmethod
+    def _doc_defaults(doc, props, tag=None):
+        """Свойства по умолчанию документа (w:docDefaults): w:rPr или w:pPr, либо их дочерний элемент tag."""
+        defaults = doc.styles.element.find(qn('w:docDefaults'))
+        if defaults is None:
+            return None
+        element = defaults.find(f"{qn(props + 'Default')}/{qn(props)}")
+        if element is None or tag is None:
+            return element
+        return element.find(qn(tag))
+
+    @staticmethod
+    def _rfonts_name(doc, rpr) -> Union[str, None]:
+        """Шрифт из элемента w:rPr: явное имя (ascii/hAnsi) или шрифт темы по ссылке asciiTheme/hAnsiTheme."""
+        rfonts = rpr.find(qn('w:rFonts')) if rpr is not None else None
+        if rfonts is None:
+            return None
+        for attr in ('w:ascii', 'w:hAnsi'):
+            if rfonts.get(qn(attr)):
+                return rfonts.get(qn(attr))
+        for attr in ('w:asciiTheme', 'w:hAnsiTheme'):
+            if rfonts.get(qn(attr)):
+                return DocxProcessor._theme_font(doc, rfonts.get(qn(attr)))
+        return None
+
+    @staticmethod
+    def _theme_font(doc, theme_ref) -> Union[str, None]:
+        """Латинский шрифт темы документа по ссылке вида minorHAnsi / majorAscii."""
+        try:
+            theme = parse_xml(doc.part.part_related_by(RT.THEME).blob)
+        except KeyError:
+            return None
+        kind = 'a:majorFont' if theme_ref.startswith('major') else 'a:minorFont'
+        latin = theme.find(f'.//{qn(kind)}/{qn("a:latin")}')
+        if latin is None or not latin.get('typeface'):
+            return None
+        return latin.get('typeface')
+
+    @staticmethod
+    def _check_headers(doc) -> bool:
+        """Проверяет оформление заголовков по ГОСТ"""
+        for paragraph in doc.paragraphs:
+            if paragraph.style.name.startswith('Heading'):
+                # Проверка: заголовки должны быть жирными и без точки в конце
+                if not paragraph.style.font.bold:
+                    return False
+                if paragraph.text.strip().endswith('.'):
+                    return False
+                # Проверка выравнивания (по центру для заголовков 1 уровня)
+                if 'Heading 1' in paragraph.style.name and paragraph.alignment != 1:  # 1 = center
+                    return False
+        return True
+
+    @staticmethod
+    def _check_images(doc) -> bool:
+        """Проверяет оформление рисунков по ГОСТ"""
+        has_errors = False
+        for paragraph in doc.paragraphs:
+            if 'Рис.' in paragraph.text:
+                # Проверка формата подписи: "Рис. 1. - Описание"
+                if not re.match(r'^Рис\. \d+\..+', paragraph.text):
+                    has_errors = True
+                # Проверка что рисунок действительно существует перед подписью
+                if not DocxProcessor._has_image_before_paragraph(doc, paragraph):
+                    has_errors = True
+        return not has_errors
+
+    @staticmethod
+    def _has_image_before_paragraph(doc, paragraph) -> bool:
+        """Проверяет наличие рисунка перед подписью"""
+        # Логика поиска изображения перед подписью
+        prev_elem = paragraph._element.getprevious()
+        while prev_elem is not None:
+            if prev_elem.tag.endswith('pict'):
+                return True
+            prev_elem = prev_elem.getprevious()
+        return False
+
+    @staticmethod
+    def _check_tables(doc) -> bool:
+        """Проверяет оформление таблиц по ГОСТ"""
+        for table in doc.tables:
+            # Проверка наличия заголовка таблицы
+            if not table.rows[0].cells[0].text.strip():
+                return False
+
+            # Проверка что таблица имеет границы
+            tbl_pr = table._element.xpath('w:tblPr')
+            if tbl_pr and 'w:borders' not in tbl_pr[0].xml:
+                return False
+        return True
+
+    @staticmethod
+    def _check_links(doc) -> bool:
+        """Проверяет оформление ссылок по ГОСТ"""
+        for paragraph in doc.paragraphs:
+            if '[' in paragraph.text and ']' in paragraph.text:
+                # Проверка формата ссылок: [1] или [1, с. 15]
+                if not re.search(r'\[\d+(, с\. \d+)?\]', paragraph.text):
+                    return False
+        return True
+
+    @staticmethod
+    def _check_details(doc) -> bool:
+        """Проверяет наличие всех реквизитов документа"""
+        required_details = [
+            'УДК', 'ББК', 'Автор', 'Название',
+            'Год', 'Страниц'
+        ]
+        first_page_text = '\n'.join(p.text for p in doc.paragraphs[:20])
+        return all(detail in first_page_text for detail in required_details)
+
+    @staticmethod
+    def _check_contents(doc) -> bool:
+        """Проверяет содержание/оглавление"""
+        paragraphs = doc.paragraphs
+        for i, paragraph in enumerate(paragraphs):
+            if 'содержание' in paragraph.text.lower() or 'оглавление' in paragraph.text.lower():
+                # Проверка что содержание не пустое
+                if i + 1 < len(paragraphs) and paragraphs[i + 1].text.strip():
+                    return True
+        return False
+
+    @staticmethod
+    def _check_lists(doc) -> bool:
+        """Проверяет оформление списков"""
+        for paragraph in doc.paragraphs:
+            if paragraph.style.name == 'List Paragraph':
+                # Проверка отступов в списках
+                left_indent = paragraph.paragraph_format.left_indent
+                if left_indent is None or left_indent < Pt(18):
+                    return False
+        return True
+
+    @staticmethod
+    def _check_appendix(doc) -> bool:
+        """Проверяет оформление приложений"""
+        appendix_pattern = re.compile(r'^Приложение [А-Я]', re.IGNORECASE)
+        for paragraph in doc.paragraphs:
+            if appendix_pattern.match(paragraph.text):
+                # Проверка что приложение начинается с новой страницы
+                if 'pageBreakBefore' not in paragraph._element.xml:
+                    return False
+        return True
+
+    @staticmethod
+    def _check_pagination(doc) -> bool:
+        """Проверяет наличие нумерации страниц"""
+        for footer in doc.sections[0].footer.paragraphs:
+            if any(char.isdigit() for char in footer.text):
+                return True
+        return False
+
+    @staticmethod
+    def _check_title_page(doc) -> bool:
+        """Проверяет наличие титульного листа"""
+        first_page_text = '\n'.join(p.text for p in doc.paragraphs[:10])
+        keywords = ['реферат', 'курсовая', 'диплом', 'титульный']
+        return any(keyword in first_page_text.lower() for keyword in keywords)
+
+    @staticmethod
+    def extract_metadata(doc, file_name: str = '') -> Dict:
+        """
+        Извлекает все параметры документа в формате строки датасета:
+        - основные параметры оформления (шрифт, поля, интервалы)
+        - результаты проверок заголовков, рисунков, таблиц, ссылок и т.д.
+        - название, автора и дату создания из свойств документа
+        """
+        basic = DocxProcessor.extract_basic_metadata(doc)
+        properties = doc.core_properties
+        return {
+            'Название документа': properties.title or file_name,
+            'Автор': properties.author or '',
+            'Дата создания': properties.created.strftime('%d.%m.%Y') if properties.created else '',
+            'Шрифт': basic['font'],
+            'Размер шрифта': basic['font_size'],
+            'Верхнее поле (см)': round(basic['top_margin'], 2),
+            'Нижнее поле (см)': round(basic['bottom_margin'], 2),
+            'Левое поле (см)': round(basic['left_margin'], 2),
+            'Правое поле (см)': round(basic['right_margin'], 2),
+            'Межстрочный интервал': basic['line_spacing'],
+            'Отступ абзаца (см)': round(basic['paragraph_indent'], 2) if basic['paragraph_indent'] is not None else None,
+            'Наличие колонтитулов': basic['has_headers'],
+            'Наличие нумерации страниц': basic['has_pagination'],
+            'Наличие титульного листа': basic['has_title_page'] or DocxProcessor._check_title_page(doc),
+            'Верно ли оформлены заголовки': DocxProcessor._check_headers(doc),
+            'Есть ли содержание с правильными отступами': DocxProcessor._check_contents(doc),
+            'Верно ли оформлены ссылки': DocxProcessor._check_links(doc),
+            'Верно ли оформлены таблицы': DocxProcessor._check_tables(doc),
+            'Верно ли оформлены рисунки': DocxProcessor._check_images(doc),
+            'Соответствует ли оформление списков': DocxProcessor._check_lists(doc),
+            'Правильно ли оформлены приложения': DocxProcessor._check_appendix(doc),
+            'Верно ли указаны реквизиты документа': DocxProcessor._check_details(doc)
+        }
+
+    @staticmethod
+    def process_files(files: List[io.BytesIO]) -> pd.DataFrame:
+        """Обрабатывает список файлов и возвращает DataFrame"""
+        data = []
+        for file in files:
+            try:
+                doc = docx.Document(file)
+                metadata = DocxProcessor.extract_metadata(doc, getattr(file, 'name', ''))
+                data.append(metadata)
+            except Exception as e:
+                print(f"Ошибка обработки файла: {str(e)}")
+        return pd.DataFrame(data)
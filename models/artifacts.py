@@ -0,0 +1,262 @@
+import os
+import json
+import time
+import hashlib
+import numpy as np
+import tensorflow as tf
+from sklearn.preprocessing import StandardScaler, LabelEncoder
+from config import MODEL_VARIANT
+from models.quantization import MODEL_DIR, load_variant, variant_path
+from models.backends import KerasBackend, get_backend
+from utils.drift import DriftReference, REFERENCE_NAME
+
+MANIFEST_NAME = 'artifacts.json'
+FORMAT_VERSION = 1
+
+# Имена файлов компонентов (кроме самой модели - ее файл задает бэкенд); pickle/joblib не используются
+ARTIFACT_FILES = {
+    'scaler': 'scaler.npz',
+    'label_encoder': 'label_encoder.json',
+    'history': 'history.npz'
+}
+LEGACY_FILES = {'scaler': 'scaler.pkl', 'label_encoder': 'label_encoder.pkl', 'history': 'history.pkl'}
+
+
+def file_sha256(path):
+    """SHA-256 содержимого файла, читается блоками."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def update_manifest(file_names, model_dir=MODEL_DIR, reset=False, backend=None):
+    """
+    Записывает контрольные суммы и размеры файлов в artifacts.json.
+    При reset=True прежние записи удаляются (например, квантованные варианты старой модели).
+    backend - имя бэкенда сохраненной модели (models/backends.py), если он изменился.
+    Манифест заменяется атомарно, поэтому при сбое остается прежняя согласованная версия.
+    """
+    path = os.path.join(model_dir, MANIFEST_NAME)
+    manifest = {'format_version': FORMAT_VERSION, 'files': {}}
+    if os.path.exists(path) and not reset:
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+    if backend is not None:
+        manifest['backend'] = backend
+    for name in file_names:
+        file_path = os.path.join(model_dir, name)
+        manifest['files'][name] = {'sha256': file_sha256(file_path), 'size': os.path.getsize(file_path)}
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def save_scaler(scaler, path):
+    """Статистики StandardScaler в npz (средние, дисперсии, масштабы, имена признаков)."""
+    np.savez_compressed(path, mean=scaler.mean_, var=scaler.var_, scale=scaler.scale_,
+                        n_samples_seen=np.asarray(scaler.n_samples_seen_),
+                        feature_names=np.asarray(scaler.feature_names_in_, dtype=str),
+                        with_mean=scaler.with_mean, with_std=scaler.with_std)
+
+
+def load_scaler(path):
+    """Восстанавливает обученный StandardScaler из npz без pickle."""
+    with np.load(path, allow_pickle=False) as data:
+        scaler = StandardScaler(with_mean=bool(data['with_mean']), with_std=bool(data['with_std']))
+        scaler.mean_ = data['mean']
+        scaler.var_ = data['var']
+        scaler.scale_ = data['scale']
+        scaler.n_samples_seen_ = data['n_samples_seen'][()]
+        scaler.feature_names_in_ = data['feature_names'].astype(object)
+        scaler.n_features_in_ = len(scaler.mean_)
+    return scaler
+
+
+def save_label_encoder(label_encoder, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'classes': [str(c) for c in label_encoder.classes_]}, f, ensure_ascii=False)
+
+
+def load_label_encoder(path):
+    with open(path, encoding='utf-8') as f:
+        classes = json.load(f)['classes']
+    label_encoder = LabelEncoder()
+    label_encoder.classes_ = np.array(classes, dtype=object)
+    return label_encoder
+
+
+def save_history(history_data, path):
+    """История обучения: по массиву float32 на каждую метрику, сжатый npz."""
+    np.savez_compressed(path, **{key: np.asarray(values, dtype=np.float32) for key, values in history_data.items()})
+
+
+def load_history(path):
+    """Возвращает историю в том же виде, что history.history в Keras: {метрика: список по эпохам}."""
+    with np.load(path, allow_pickle=False) as data:
+        return {key: data[key].tolist() for key in data.files}
+
+
+def save_artifacts(backend, scaler, label_encoder, history_data, model_dir=MODEL_DIR):
+    """
+    Сохраняет все компоненты в безопасном формате и записывает их контрольные суммы.
+    Модель сохраняет сам бэкенд (backend.save) в свой файл, имя бэкенда попадает в манифест.
+    """
+    os.makedirs(model_dir, exist_ok=True)
+    backend.save(os.path.join(model_dir, backend.file_name))
+    save_scaler(scaler, os.path.join(model_dir, ARTIFACT_FILES['scaler']))
+    save_label_encoder(label_encoder, os.path.join(model_dir, ARTIFACT_FILES['label_encoder']))
+    save_history(history_data, os.path.join(model_dir, ARTIFACT_FILES['history']))
+    update_manifest([backend.file_name, *ARTIFACT_FILES.values()], model_dir, reset=True, backend=backend.name)
+
+
+class ModelArtifacts:
+    """
+    Ленивая загрузка компонентов модели:
+    - каждый компонент читается только при первом обращении (model, scaler, label_encoder, history)
+    - перед чтением файл сверяется с контрольной суммой из artifacts.json
+    Например, для предсказания история обучения и кодировщик не загружаются вовсе.
+    Модель загружается бэкендом, записанным в манифесте (у старых манифестов - Keras).
+    """
+
+    def __init__(self, model_dir=MODEL_DIR, variant=MODEL_VARIANT):
+        self.model_dir = model_dir
+        self.variant = variant
+        with open(os.path.join(model_dir, MANIFEST_NAME), encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        self._cache = {}
+
+    def verified_path(self, name):
+        """Путь к файлу компонента после проверки контрольной суммы. ValueError при несовпадении."""
+        path = os.path.join(self.model_dir, name)
+        expected = self.manifest['files'].get(name)
+        if expected is None:
+            raise ValueError(f"Файл {name} отсутствует в манифесте {MANIFEST_NAME}")
+        if os.path.getsize(path) != expected['size'] or file_sha256(path) != expected['sha256']:
+            raise ValueError(f"Контрольная сумма {name} не совпадает: файл поврежден или подменен")
+        return path
+
+    def _load(self, key, loader):
+        if key not in self._cache:
+            self._cache[key] = loader()
+        return self._cache[key]
+
+    @property
+    def model(self):
+        """
+        Модель с интерфейсом predict как у Keras: для бэкенда Keras - в варианте self.variant
+        (квантованный вариант, если он экспортирован), для остальных бэкендов - их собственный файл.
+        """
+        def load():
+            backend = get_backend(self.manifest.get('backend', KerasBackend.name))
+            quantized = os.path.basename(variant_path(self.variant, self.model_dir))
+            if backend is KerasBackend and self.variant != 'float32' and quantized in self.manifest['files']:
+                self.verified_path(quantized)
+                return load_variant(self.variant, self.model_dir)
+            if backend is KerasBackend and self.variant != 'float32':
+                print(f"Вариант {self.variant} не экспортирован (python -m models.quantization), используется float32")
+            return backend.load(self.verified_path(backend.file_name))
+        return self._load('model', load)
+
+    @property
+    def scaler(self):
+        return self._load('scaler', lambda: load_scaler(self.verified_path(ARTIFACT_FILES['scaler'])))
+
+    @property
+    def label_encoder(self):
+        return self._load('label_encoder',
+                          lambda: load_label_encoder(self.verified_path(ARTIFACT_FILES['label_encoder'])))
+
+    @property
+    def history(self):
+        return self._load('history', lambda: load_history(self.verified_path(ARTIFACT_FILES['history'])))
+
+    @property
+    def drift_reference(self):
+        """Снимок обучающей выборки для мониторинга дрейфа или None, если модель сохранена без него."""
+        def load():
+            if REFERENCE_NAME not in self.manifest['files']:
+                return None
+            return DriftReference.load(self.verified_path(REFERENCE_NAME))
+        return self._load('drift_reference', load)
+
+
+def migrate_legacy_artifacts(model_dir=MODEL_DIR):
+    """
+    Переводит компоненты, сохраненные старой версией (joblib/pickle), в новый формат.
+    Выполняет распаковку pickle, поэтому запускать только для своих, доверенных файлов.
+    Возвращает True, если миграция выполнена.
+    """
+    legacy_paths = {key: os.path.join(model_dir, name) for key, name in LEGACY_FILES.items()}
+    if not all(os.path.exists(p) for p in legacy_paths.values()):
+        return False
+    import joblib
+
+    save_scaler(joblib.load(legacy_paths['scaler']), os.path.join(model_dir, ARTIFACT_FILES['scaler']))
+    save_label_encoder(joblib.load(legacy_paths['label_encoder']),
+                       os.path.join(model_dir, ARTIFACT_FILES['label_encoder']))
+    save_history(joblib.load(legacy_paths['history']), os.path.join(model_dir, ARTIFACT_FILES['history']))
+    update_manifest([KerasBackend.file_name, *ARTIFACT_FILES.values()], model_dir, backend=KerasBackend.name)
+    for path in legacy_paths.values():
+        os.remove(path)
+    return True
+
+
+def _measure_load(mode, model_dir, queue):
+    """Выполняется в отдельном процессе: время загрузки и прирост пикового RSS."""
+    import resource
+
+    def peak_rss_mb():
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    before = peak_rss_mb()
+    started = time.perf_counter()
+    if mode == 'legacy':
+        import joblib
+        tf.keras.models.load_model(os.path.join(model_dir, KerasBackend.file_name), compile=False)
+        for name in LEGACY_FILES.values():
+            joblib.load(os.path.join(model_dir, name))
+    else:
+        artifacts = ModelArtifacts(model_dir, variant='float32')
+        artifacts.model, artifacts.scaler
+        if mode == 'artifacts_all':
+            artifacts.label_encoder, artifacts.history
+    queue.put({'load_ms': (time.perf_counter() - started) * 1000, 'rss_delta_mb': peak_rss_mb() - before})
+
+
+def benchmark_loading(legacy_dir, model_dir=MODEL_DIR, repeats=3):
+    """
+    Сравнивает загрузку компонентов (каждый замер - в новом процессе после импорта TF):
+    - legacy: модель + все pickle-файлы, как раньше
+    - artifacts_predict: только то, что нужно для предсказания (модель и скейлер)
+    - artifacts_all: все компоненты в новом формате
+    Возвращает {режим: {'load_ms', 'rss_delta_mb'}} (медиана по repeats).
+    """
+    import multiprocessing
+
+    context = multiprocessing.get_context('spawn')
+    report = {}
+    for mode, directory in (('legacy', legacy_dir), ('artifacts_predict', model_dir), ('artifacts_all', model_dir)):
+        runs = []
+        for _ in range(repeats):
+            queue = context.Queue()
+            process = context.Process(target=_measure_load, args=(mode, directory, queue))
+            process.start()
+            runs.append(queue.get())
+            process.join()
+        report[mode] = {key: float(np.median([run[key] for run in runs])) for key in runs[0]}
+    return report
+
+
+if __name__ == '__main__':
+    import sys
+
+    # python -m models.artifacts [папка со старыми .pkl для сравнения]
+    if migrate_legacy_artifacts():
+        print("Компоненты переведены из pickle в новый формат")
+    if len(sys.argv) > 1:
+        for mode, stats in benchmark_loading(sys.argv[1]).items():
+            print(f"{mode:>18}: {stats['load_ms']:.1f} мс, пиковый RSS +{stats['rss_delta_mb']:.1f} МБ")
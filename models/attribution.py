@@ -0,0 +1,147 @@
+import time
+import numpy as np
+import tensorflow as tf
+from typing import List, Tuple
+from config import ATTRIBUTION_METHOD, ATTRIBUTION_TOP_K, ATTRIBUTION_BATCH_ROWS, IG_STEPS
+
+
+def _predict(model, X, batch_size):
+    """Предсказание пачками без вывода прогресса Keras. Возвращает вектор вероятностей."""
+    return np.asarray(model.predict(X, batch_size=batch_size, verbose=0)).reshape(-1)
+
+
+def occlusion_attributions(model, X_scaled, baseline=None, batch_rows=ATTRIBUTION_BATCH_ROWS):
+    """
+    Оценивает вклад признаков методом окклюзии:
+    - каждый признак документа по очереди заменяется базовым значением
+    - вклад = f(x) - f(x с замененным признаком)
+    Базовое значение по умолчанию - нули, т.е. среднее обучающей выборки после StandardScaler.
+    Стоимость ограничена: ровно (число признаков + 1) предсказаний на документ,
+    все возмущенные строки считаются пачками по batch_rows.
+    Возвращает (вероятности [n], вклады [n, число признаков]).
+    """
+    X_scaled = np.asarray(X_scaled, dtype=np.float32)
+    n_docs, n_features = X_scaled.shape
+    baseline = np.zeros(n_features, dtype=np.float32) if baseline is None else np.asarray(baseline, np.float32)
+
+    probabilities = _predict(model, X_scaled, batch_rows)
+    attributions = np.empty((n_docs, n_features), dtype=np.float32)
+
+    # Документы обрабатываются блоками, чтобы возмущенная матрица занимала не больше batch_rows строк
+    docs_per_block = max(1, batch_rows // n_features)
+    diagonal = np.eye(n_features, dtype=bool)
+    for start in range(0, n_docs, docs_per_block):
+        block = X_scaled[start:start + docs_per_block]
+        # [блок, признак, признак]: в строке i признак i заменен базовым значением
+        perturbed = np.where(diagonal, baseline, block[:, None, :])
+        occluded = _predict(model, perturbed.reshape(-1, n_features), batch_rows).reshape(len(block), n_features)
+        attributions[start:start + len(block)] = probabilities[start:start + len(block), None] - occluded
+
+    return probabilities, attributions
+
+
+def integrated_gradients(model, X_scaled, baseline=None, steps=IG_STEPS, batch_rows=ATTRIBUTION_BATCH_ROWS):
+    """
+    Вычисляет интегрированные градиенты для дифференцируемой модели Keras:
+    - строит steps точек на отрезке от базового значения до x
+    - усредняет градиенты выхода по входу и умножает на (x - базовое значение)
+    Сумма вкладов документа примерно равна f(x) - f(базовое значение).
+    Возвращает (вероятности [n], вклады [n, число признаков]).
+    """
+    X_scaled = np.asarray(X_scaled, dtype=np.float32)
+    n_docs, n_features = X_scaled.shape
+    baseline = np.zeros(n_features, dtype=np.float32) if baseline is None else np.asarray(baseline, np.float32)
+    alphas = ((np.arange(steps, dtype=np.float32) + 0.5) / steps)[None, :, None]  # метод средних прямоугольников
+
+    probabilities = _predict(model, X_scaled, batch_rows)
+    attributions = np.empty((n_docs, n_features), dtype=np.float32)
+
+    docs_per_block = max(1, batch_rows // steps)
+    for start in range(0, n_docs, docs_per_block):
+        block = X_scaled[start:start + docs_per_block]
+        delta = block - baseline
+        path = tf.convert_to_tensor((baseline + alphas * delta[:, None, :]).reshape(-1, n_features))
+        with tf.GradientTape() as tape:
+            tape.watch(path)
+            outputs = model(path, training=False)
+        grads = tape.gradient(outputs, path).numpy().reshape(len(block), steps, n_features)
+        attributions[start:start + len(block)] = grads.mean(axis=1) * delta
+
+    return probabilities, attributions
+
+
+def compute_attributions(model, X_scaled, method=ATTRIBUTION_METHOD, baseline=None):
+    """
+    Выбирает метод атрибуции ('occlusion' или 'integrated_gradients') и вычисляет вклады.
+    integrated_gradients требует дифференцируемую модель (бэкенд Keras), окклюзия работает с любой.
+    """
+    if method == 'integrated_gradients':
+        # Признак дифференцируемости задают бэкенды и TFLiteModel; модель без него считается недифференцируемой
+        if not getattr(model, 'differentiable', False):
+            raise ValueError("integrated_gradients недоступен для этой модели, используйте 'occlusion'")
+        return integrated_gradients(model, X_scaled, baseline=baseline)
+    if method == 'occlusion':
+        return occlusion_attributions(model, X_scaled, baseline=baseline)
+    raise ValueError(f"Неизвестный метод атрибуции: {method}")
+
+
+def top_contributors(attributions, feature_names, k=ATTRIBUTION_TOP_K) -> List[List[Tuple[str, float]]]:
+    """
+    Отбирает для каждого документа k признаков с наибольшим по модулю вкладом.
+    Возвращает список списков (признак, вклад), отсортированных по убыванию модуля вклада.
+    """
+    attributions = np.asarray(attributions)
+    k = min(k, attributions.shape[1])
+    top_idx = np.argsort(-np.abs(attributions), axis=1)[:, :k]
+    top_values = np.take_along_axis(attributions, top_idx, axis=1)
+    return [[(feature_names[j], float(v)) for j, v in zip(row_idx, row_values)]
+            for row_idx, row_values in zip(top_idx, top_values)]
+
+
+def explain_batch(model, X_scaled, feature_names, method=ATTRIBUTION_METHOD, k=ATTRIBUTION_TOP_K):
+    """
+    Предсказывает и объясняет пакет документов за один векторный проход.
+    Возвращает список результатов {'probability', 'top_contributors'} по документам.
+    """
+    probabilities, attributions = compute_attributions(model, X_scaled, method=method)
+    return [{'probability': float(p), 'top_contributors': top}
+            for p, top in zip(probabilities, top_contributors(attributions, list(feature_names), k))]
+
+
+def benchmark_attribution(model, X_scaled, methods=('occlusion', 'integrated_gradients'), repeats=3):
+    """
+    Сравнивает стоимость атрибуции с обычным предсказанием на одном и том же пакете.
+    Возвращает {метод: {'ms_per_doc', 'ratio_to_predict'}}, включая 'predict'.
+    """
+    X_scaled = np.asarray(X_scaled, dtype=np.float32)
+
+    def best_time(fn):
+        fn()  # прогрев (построение графа TF)
+        timings = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - started)
+        return min(timings)
+
+    predict_time = best_time(lambda: _predict(model, X_scaled, ATTRIBUTION_BATCH_ROWS))
+    report = {'predict': {'ms_per_doc': predict_time / len(X_scaled) * 1000, 'ratio_to_predict': 1.0}}
+    for method in methods:
+        method_time = best_time(lambda: compute_attributions(model, X_scaled, method=method))
+        report[method] = {'ms_per_doc': method_time / len(X_scaled) * 1000,
+                          'ratio_to_predict': method_time / predict_time}
+    return report
+
+
+if __name__ == '__main__':
+    import pandas as pd
+    from models.model_utils import load_artifacts, preprocess_data
+
+    artifacts = load_artifacts()
+    model, scaler = artifacts.model, artifacts.scaler
+    X, _, _ = preprocess_data(pd.read_csv('data/default_dataset.csv'))
+    # Увеличиваем пакет до нескольких тысяч документов
+    X_scaled = np.tile(scaler.transform(X), (5, 1))
+    print(f"Документов в пакете: {len(X_scaled)}")
+    for name, stats in benchmark_attribution(model, X_scaled).items():
+        print(f"{name:>22}: {stats['ms_per_doc']:.3f} мс/док, x{stats['ratio_to_predict']:.1f} к предсказанию")
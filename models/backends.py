@@ -0,0 +1,339 @@
+import os
+import abc
+import time
+import shutil
+import tempfile
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.models import Sequential
+from tensorflow.keras.layers import Dense, Dropout
+from tensorflow.keras.optimizers import Adam
+from tensorflow.keras.callbacks import EarlyStopping
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, roc_auc_score, log_loss
+from config import RANDOM_SEED, ATTRIBUTION_BATCH_ROWS
+
+REPORT_NAME = 'backends_report.json'
+
+
+def create_model(input_shape):
+    """
+    Создает и компилирует модель нейронной сети для бинарной классификации.
+    Архитектура: 3 полносвязных слоя с Dropout для регуляризации.
+    Возвращает скомпилированную модель Keras.
+    """
+    model = Sequential([
+        Dense(128, activation='relu', input_shape=(input_shape,)),
+        Dropout(0.3),
+        Dense(64, activation='relu'),
+        Dropout(0.2),
+        Dense(32, activation='relu'),
+        Dense(1, activation='sigmoid')
+    ])
+    model.compile(optimizer=Adam(learning_rate=0.001),
+                  loss='binary_crossentropy',
+                  metrics=['accuracy', 'Precision', 'Recall', 'AUC'])
+    return model
+
+
+def _sigmoid(raw):
+    return 1.0 / (1.0 + np.exp(-raw))
+
+
+class ModelBackend(abc.ABC):
+    """
+    Общий интерфейс моделей, которые можно обучать, сохранять и загружать:
+    - fit(X, y) обучает на масштабированных признаках и возвращает историю {метрика: список}
+    - predict(X, batch_size) возвращает вероятности формы [n, 1], как model.predict в Keras,
+      поэтому атрибуция, демон и интерфейс работают с любым бэкендом без изменений
+    - save(path) / load(path) сохраняют модель в один файл без pickle (file_name)
+    Параметры бэкенда (params) входят в манифест обучения.
+    """
+    name = None
+    file_name = None
+    params = {}
+    differentiable = False  # поддерживает ли integrated_gradients
+
+    @abc.abstractmethod
+    def fit(self, X, y):
+        pass
+
+    @abc.abstractmethod
+    def predict_proba(self, X):
+        """Вероятности класса 1 для одного пакета строк, вектор [n]."""
+
+    def predict(self, X, batch_size=None, verbose=0):
+        """Предсказание пачками по batch_size строк (по умолчанию ATTRIBUTION_BATCH_ROWS)."""
+        X = np.asarray(X, dtype=np.float32)
+        batch_size = batch_size or ATTRIBUTION_BATCH_ROWS
+        probabilities = np.empty(len(X), dtype=np.float32)
+        for start in range(0, len(X), batch_size):
+            probabilities[start:start + batch_size] = self.predict_proba(X[start:start + batch_size])
+        return probabilities.reshape(-1, 1)
+
+    @abc.abstractmethod
+    def save(self, path):
+        pass
+
+    @classmethod
+    @abc.abstractmethod
+    def load(cls, path):
+        pass
+
+
+class KerasBackend(ModelBackend):
+    """Полносвязная сеть Keras (create_model) с ранней остановкой по val_loss."""
+    name = 'keras'
+    file_name = 'model.h5'
+    params = {'epochs': 50, 'batch_size': 32, 'validation_split': 0.2, 'patience': 10}
+    differentiable = True
+
+    def __init__(self, keras_model=None):
+        self.keras_model = keras_model
+
+    def fit(self, X, y):
+        self.keras_model = create_model(X.shape[1])
+        early_stopping = EarlyStopping(monitor='val_loss', patience=self.params['patience'],
+                                       restore_best_weights=True)
+        history = self.keras_model.fit(X, y,
+                                       epochs=self.params['epochs'],
+                                       batch_size=self.params['batch_size'],
+                                       validation_split=self.params['validation_split'],
+                                       callbacks=[early_stopping],
+                                       verbose=0)  # verbose=0 чтобы не засорять лог Streamlit
+        return history.history
+
+    def predict_proba(self, X):
+        return self.predict(X).reshape(-1)
+
+    def predict(self, X, batch_size=None, verbose=0):
+        return self.keras_model.predict(np.asarray(X, dtype=np.float32),
+                                        batch_size=batch_size or ATTRIBUTION_BATCH_ROWS, verbose=verbose)
+
+    def __call__(self, inputs, training=False):
+        """Прямой проход графа TF (нужен для градиентов в integrated_gradients)."""
+        return self.keras_model(inputs, training=training)
+
+    def save(self, path):
+        self.keras_model.save(path)
+
+    @classmethod
+    def load(cls, path):
+        return cls(tf.keras.models.load_model(path, compile=False))
+
+
+class GradientBoostingBackend(ModelBackend):
+    """
+    Градиентный бустинг деревьев (sklearn GradientBoostingClassifier).
+    После обучения деревья переводятся в массивы [дерево, узел], предсказание -
+    векторный спуск всех деревьев сразу за max_depth шагов без вызовов sklearn
+    (одномерные np.take по сплошным индексам узлов).
+    Листья ссылаются сами на себя, поэтому лишние шаги для неглубоких ветвей ничего не меняют.
+    """
+    name = 'gbt'
+    file_name = 'model_gbt.npz'
+    params = {'n_estimators': 150, 'learning_rate': 0.1, 'max_depth': 3, 'subsample': 1.0}
+    block_rows = 1024  # промежуточные массивы [строки, деревья] остаются в кеше процессора
+
+    def __init__(self, arrays=None):
+        self.arrays = None
+        if arrays is not None:
+            self._set_arrays(arrays)
+
+    def _set_arrays(self, arrays):
+        """Сохраняет массивы деревьев и готовит плоские копии для predict_proba."""
+        self.arrays = arrays
+        n_trees, n_nodes = arrays['feature'].shape
+        offsets = np.arange(n_trees, dtype=np.int64) * n_nodes
+        self._roots = offsets
+        self._feature = arrays['feature'].ravel()
+        self._threshold = arrays['threshold'].ravel()
+        self._value = arrays['value'].ravel()
+        # Потомки узла i - элементы 2i (влево) и 2i + 1 (вправо), уже со сдвигом на начало дерева
+        children = np.stack([arrays['left'], arrays['right']], axis=-1) + offsets[:, None, None]
+        self._children = children.ravel()
+
+    def fit(self, X, y):
+        y = np.asarray(y)
+        estimator = GradientBoostingClassifier(random_state=RANDOM_SEED, **self.params).fit(X, y)
+        trees = [tree.tree_ for tree in estimator.estimators_[:, 0]]
+        n_nodes = max(tree.node_count for tree in trees)
+        nodes = np.arange(n_nodes)
+        arrays = {
+            'feature': np.zeros((len(trees), n_nodes), dtype=np.int32),
+            'threshold': np.full((len(trees), n_nodes), np.inf, dtype=np.float32),
+            'left': np.tile(nodes, (len(trees), 1)).astype(np.int32),
+            'right': np.tile(nodes, (len(trees), 1)).astype(np.int32),
+            'value': np.zeros((len(trees), n_nodes), dtype=np.float64)
+        }
+        for i, tree in enumerate(trees):
+            split = tree.children_left >= 0
+            count = tree.node_count
+            arrays['feature'][i, :count][split] = tree.feature[split]
+            arrays['threshold'][i, :count][split] = tree.threshold[split]
+            arrays['left'][i, :count][split] = tree.children_left[split]
+            arrays['right'][i, :count][split] = tree.children_right[split]
+            arrays['value'][i, :count] = tree.value[:, 0, 0] * self.params['learning_rate']
+        prior = estimator.init_.class_prior_[1]
+        arrays['init'] = np.float64(np.log(prior / (1 - prior)))
+        arrays['depth'] = np.int32(max(tree.max_depth for tree in trees))
+        self._set_arrays(arrays)
+
+        # Кривая обучения по стадиям бустинга (аналог эпох Keras)
+        staged = list(estimator.staged_predict_proba(X))
+        return {'loss': [log_loss(y, p[:, 1]) for p in staged],
+                'accuracy': [accuracy_score(y, p[:, 1] > 0.5) for p in staged]}
+
+    def predict_proba(self, X):
+        # sklearn сравнивает признаки в float32 - так же, чтобы пороги совпадали
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if len(X) > self.block_rows:
+            return np.concatenate([self.predict_proba(X[start:start + self.block_rows])
+                                   for start in range(0, len(X), self.block_rows)])
+        row_offsets = (np.arange(len(X), dtype=np.int64) * X.shape[1])[:, None]
+        node = np.broadcast_to(self._roots, (len(X), len(self._roots))).copy()
+        X_flat = X.ravel()
+        for _ in range(int(self.arrays['depth'])):
+            go_right = X_flat.take(row_offsets + self._feature.take(node)) > self._threshold.take(node)
+            node = self._children.take(node * 2 + go_right)
+        return _sigmoid(self.arrays['init'] + self._value.take(node).sum(axis=1))
+
+    def save(self, path):
+        np.savez_compressed(path, **self.arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls({key: data[key] for key in data.files})
+
+
+class LogisticRegressionBackend(ModelBackend):
+    """Логистическая регрессия - базовый уровень качества; модель - вектор весов и свободный член."""
+    name = 'logreg'
+    file_name = 'model_logreg.npz'
+    params = {'C': 1.0, 'max_iter': 1000}
+
+    def __init__(self, coef=None, intercept=0.0):
+        self.coef = coef
+        self.intercept = intercept
+
+    def fit(self, X, y):
+        estimator = LogisticRegression(random_state=RANDOM_SEED, **self.params).fit(X, np.asarray(y))
+        self.coef = estimator.coef_[0].astype(np.float64)
+        self.intercept = float(estimator.intercept_[0])
+        return {}
+
+    def predict_proba(self, X):
+        return _sigmoid(X @ self.coef + self.intercept)
+
+    def save(self, path):
+        np.savez_compressed(path, coef=self.coef, intercept=self.intercept)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['coef'], float(data['intercept']))
+
+
+BACKENDS = {backend.name: backend for backend in (KerasBackend, GradientBoostingBackend, LogisticRegressionBackend)}
+
+
+def get_backend(name):
+    """Класс бэкенда по имени ('keras', 'gbt', 'logreg'). ValueError для неизвестного имени."""
+    if name not in BACKENDS:
+        raise ValueError(f"Неизвестный бэкенд модели: {name}. Доступны: {', '.join(BACKENDS)}")
+    return BACKENDS[name]
+
+
+def compare_backends(X_train_scaled, y_train, X_test_scaled, y_test, names=tuple(BACKENDS),
+                     repeats=5, throughput_rows=20000):
+    """
+    Обучает каждый бэкенд на одном и том же разбиении и сравнивает:
+    - время обучения (с фиксированными сидами, как в train_and_save_model)
+    - пропускную способность predict (документов в секунду) на пакете из throughput_rows строк
+    - задержку предсказания одного документа (как при ручной проверке в интерфейсе)
+    - размер сохраненного файла модели
+    - accuracy и AUC на отложенной выборке
+    Модели сохраняются во временную папку и загружаются обратно, метрики считаются по загруженным.
+    Возвращает отчет {бэкенд: метрики}.
+    """
+    from models.splits import set_global_seed
+
+    X_test_scaled = np.asarray(X_test_scaled, dtype=np.float32)
+    y_test = np.asarray(y_test)
+    X_throughput = np.resize(X_test_scaled, (max(throughput_rows, len(X_test_scaled)), X_test_scaled.shape[1]))
+    work_dir = tempfile.mkdtemp(prefix='backends_')
+    report = {}
+    try:
+        for name in names:
+            backend_cls = get_backend(name)
+            set_global_seed(RANDOM_SEED)
+            started = time.perf_counter()
+            backend = backend_cls()
+            backend.fit(np.asarray(X_train_scaled, dtype=np.float32), np.asarray(y_train))
+            train_seconds = time.perf_counter() - started
+
+            path = os.path.join(work_dir, backend_cls.file_name)
+            backend.save(path)
+            backend = backend_cls.load(path)
+            probabilities = backend.predict(X_test_scaled).reshape(-1)
+            timings, latencies = [], []
+            for _ in range(repeats):
+                started = time.perf_counter()
+                backend.predict(X_throughput, batch_size=len(X_throughput))
+                timings.append(time.perf_counter() - started)
+                started = time.perf_counter()
+                backend.predict(X_test_scaled[:1])
+                latencies.append(time.perf_counter() - started)
+            report[name] = {
+                'train_seconds': train_seconds,
+                'docs_per_second': float(len(X_throughput) / min(timings)),
+                'latency_ms': float(np.median(latencies) * 1000),
+                'size_kb': os.path.getsize(path) / 1024,
+                'accuracy': float(accuracy_score(y_test, probabilities > 0.5)),
+                'auc': float(roc_auc_score(y_test, probabilities))
+            }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return report
+
+
+def pick_backend(report, min_accuracy, metric='docs_per_second'):
+    """
+    Самый быстрый бэкенд, у которого accuracy не ниже min_accuracy, или None.
+    metric: 'docs_per_second' (пакетная проверка, больше - лучше) или 'latency_ms' (один документ, меньше - лучше).
+    """
+    passing = [name for name, stats in report.items() if stats['accuracy'] >= min_accuracy]
+    if not passing:
+        return None
+    sign = -1 if metric == 'latency_ms' else 1
+    return max(passing, key=lambda name: sign * report[name][metric])
+
+
+if __name__ == '__main__':
+    import json
+    import pandas as pd
+    from sklearn.preprocessing import StandardScaler
+    from config import BACKEND_MIN_ACCURACY, BENCHMARK_DIR
+    from models.model_utils import preprocess_data
+    from models.splits import load_or_create_split
+
+    df = pd.read_csv('data/default_dataset.csv')
+    X, y, _ = preprocess_data(df)
+    # То же разбиение, что и в train_and_save_model (из кеша датасета)
+    train_idx, test_idx = load_or_create_split(df)
+    scaler = StandardScaler().fit(X.iloc[train_idx])
+    report = compare_backends(scaler.transform(X.iloc[train_idx]), y.iloc[train_idx],
+                              scaler.transform(X.iloc[test_idx]), y.iloc[test_idx])
+    # Отчет не кладется рядом с моделью: директория модели хранится в git
+    os.makedirs(BENCHMARK_DIR, exist_ok=True)
+    with open(os.path.join(BENCHMARK_DIR, REPORT_NAME), 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    for name, stats in report.items():
+        print(f"{name:>7}: обучение {stats['train_seconds']:.2f} с, {stats['docs_per_second']:.0f} док/с, "
+              f"{stats['latency_ms']:.2f} мс на документ, "
+              f"{stats['size_kb']:.0f} КБ, accuracy {stats['accuracy']:.3f}, AUC {stats['auc']:.3f}")
+    print(f"Самый быстрый с accuracy >= {BACKEND_MIN_ACCURACY}: "
+          f"пакетная проверка - {pick_backend(report, BACKEND_MIN_ACCURACY) or 'нет'}, "
+          f"один документ - {pick_backend(report, BACKEND_MIN_ACCURACY, 'latency_ms') or 'нет'}")
@@ -0,0 +1,250 @@
+import os
+import json
+import html
+import time
+import datetime
+import multiprocessing
+import numpy as np
+import pandas as pd
+import tensorflow as tf
+from concurrent.futures import ProcessPoolExecutor
+from sklearn.model_selection import StratifiedKFold
+from sklearn.preprocessing import StandardScaler
+from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score, confusion_matrix
+from config import (MODEL_BACKEND, RANDOM_SEED, DETERMINISTIC_TRAINING, EVALUATION_DIR, EVAL_FOLDS, EVAL_WORKERS,
+                    EVAL_TF_THREADS, EVAL_TOP_GROUPS)
+from models.backends import get_backend
+from models.splits import set_global_seed
+from utils.author_index import normalize_name
+from utils.large_dataset import dataset_hash
+
+METRICS = ('accuracy', 'precision', 'recall', 'f1', 'auc')
+
+_worker_data = None  # (X, y) процесса-исполнителя, передаются один раз при запуске процесса
+
+
+def classification_metrics(y_true, probabilities):
+    """
+    Метрики бинарной классификации по вероятностям (порог 0.5) и матрица ошибок [[TN, FP], [FN, TP]].
+    AUC равен None, если в выборке только один класс.
+    """
+    y_true = np.asarray(y_true).astype(int)
+    y_pred = (np.asarray(probabilities) > 0.5).astype(int)
+    return {
+        'accuracy': float(accuracy_score(y_true, y_pred)),
+        'precision': float(precision_score(y_true, y_pred, zero_division=0)),
+        'recall': float(recall_score(y_true, y_pred, zero_division=0)),
+        'f1': float(f1_score(y_true, y_pred, zero_division=0)),
+        'auc': float(roc_auc_score(y_true, probabilities)) if len(np.unique(y_true)) > 1 else None,
+        'confusion': confusion_matrix(y_true, y_pred, labels=[0, 1]).tolist()
+    }
+
+
+def summarize_folds(fold_metrics):
+    """
+    Среднее и разброс каждой метрики по фолдам. Фолды без значения (AUC при одном классе) пропускаются;
+    если значения нет ни в одном фолде, mean и std равны None.
+    """
+    summary = {}
+    for name in METRICS:
+        values = [m[name] for m in fold_metrics if m[name] is not None]
+        summary[name] = {'mean': float(np.mean(values)) if values else None,
+                         'std': float(np.std(values)) if values else None}
+    return summary
+
+
+def group_breakdown(keys, labels, y_true, y_pred):
+    """
+    Качество предсказаний вне фолда по группам документов (автор, шрифт):
+    keys - ключ группы, labels - подпись группы в отчете (берется первая в группе).
+    Список строк отсортирован по числу ошибок модели, затем по числу документов.
+    """
+    frame = pd.DataFrame({'key': keys, 'label': labels, 'true': np.asarray(y_true).astype(int),
+                          'pred': np.asarray(y_pred).astype(int)})
+    frame['fp'] = (frame['pred'] == 1) & (frame['true'] == 0)
+    frame['fn'] = (frame['pred'] == 0) & (frame['true'] == 1)
+    grouped = frame.groupby('key', sort=False).agg(label=('label', 'first'), docs=('true', 'size'),
+                                                   compliant=('true', 'mean'), fp=('fp', 'sum'), fn=('fn', 'sum'))
+    grouped['errors'] = grouped['fp'] + grouped['fn']
+    grouped = grouped.sort_values(['errors', 'docs'], ascending=False)
+    return [{
+        'Группа': row.label,
+        'Документов': int(row.docs),
+        'Соответствует ГОСТ': float(row.compliant),
+        'Accuracy': float(1 - row.errors / row.docs),
+        'Ошибок модели': int(row.errors),
+        'Ложно принятых': int(row.fp),
+        'Ложно отклоненных': int(row.fn)
+    } for row in grouped.itertuples()]
+
+
+def _init_worker(X, y, tf_threads):
+    """
+    Запуск процесса-исполнителя: ограничение потоков TF до первой операции
+    (иначе каждый процесс займет все ядра) и сохранение данных для всех его фолдов.
+    """
+    global _worker_data
+    tf.config.threading.set_intra_op_parallelism_threads(tf_threads)
+    tf.config.threading.set_inter_op_parallelism_threads(tf_threads)
+    _worker_data = (X, y)
+
+
+def _run_fold(fold, train_idx, test_idx, backend_name, seed, deterministic):
+    """Обучает бэкенд на train-части фолда (скейлер - только на ней) и предсказывает test-часть."""
+    X, y = _worker_data
+    if deterministic:
+        set_global_seed(seed)
+    started = time.perf_counter()
+    scaler = StandardScaler().fit(X[train_idx])
+    backend = get_backend(backend_name)()
+    backend.fit(scaler.transform(X[train_idx]), y[train_idx])
+    train_seconds = time.perf_counter() - started
+    probabilities = backend.predict(scaler.transform(X[test_idx])).reshape(-1)
+    return {'fold': fold, 'test_idx': test_idx, 'probabilities': probabilities,
+            'train_seconds': train_seconds, 'seconds': time.perf_counter() - started}
+
+
+def evaluate_dataset(df, folds=EVAL_FOLDS, workers=EVAL_WORKERS, tf_threads=EVAL_TF_THREADS,
+                     backend_name=MODEL_BACKEND, seed=RANDOM_SEED, dedup=False):
+    """
+    Стратифицированная k-блочная кросс-валидация бэкенда модели на датасете:
+    - фолды обучаются одновременно в пуле процессов (spawn: TF небезопасен при fork),
+      по умолчанию min(фолдов, ядер) процессов и ядра/процессы потоков TF в каждом
+    - метрики по каждому фолду, их среднее и разброс
+    - метрики и матрица ошибок по предсказаниям вне фолда для всего датасета
+    - разбивка ошибок по авторам и шрифтам
+    Датасет предобрабатывается так же, как в train_and_save_model (с dedup - после исключения дубликатов).
+    Возвращает отчет (dict, сериализуемый в JSON).
+    """
+    from models.model_utils import preprocess_data
+    from utils.dedup import deduplicate
+
+    if dedup:
+        df = deduplicate(df)
+    content_hash = dataset_hash(df)  # тот же хеш, что у training_manifest и в интерфейсе
+    df = df.reset_index(drop=True)
+    X, y, _ = preprocess_data(df)
+    X, y = X.to_numpy(dtype=np.float32), y.to_numpy().astype(int)
+    cpu_count = os.cpu_count() or 1
+    workers = workers or min(folds, cpu_count)
+    tf_threads = tf_threads or max(1, cpu_count // workers)
+
+    splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed)
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_worker, initargs=(X, y, tf_threads)) as pool:
+        futures = [pool.submit(_run_fold, fold, train_idx, test_idx, backend_name, seed, DETERMINISTIC_TRAINING)
+                   for fold, (train_idx, test_idx) in enumerate(splitter.split(X, y), start=1)]
+        results = [future.result() for future in futures]
+    wall_seconds = time.perf_counter() - started
+
+    oof = np.empty(len(y), dtype=np.float64)
+    fold_metrics = []
+    for result in results:
+        oof[result['test_idx']] = result['probabilities']
+        metrics = classification_metrics(y[result['test_idx']], result['probabilities'])
+        fold_metrics.append({'fold': result['fold'], 'n_test': len(result['test_idx']), **metrics,
+                             'train_seconds': result['train_seconds']})
+
+    y_pred = (oof > 0.5).astype(int)
+    authors = df['Автор'].astype(str) if 'Автор' in df.columns else pd.Series([''] * len(df))
+    fonts = df['Шрифт'].astype(str) if 'Шрифт' in df.columns else pd.Series([''] * len(df))
+    return {
+        'dataset_hash': content_hash,
+        'n_rows': len(df),
+        'dedup': dedup,
+        'backend': backend_name,
+        'params': get_backend(backend_name).params,
+        'folds': folds,
+        'seed': seed,
+        'workers': workers,
+        'tf_threads': tf_threads,
+        'created': datetime.datetime.now().strftime('%d.%m.%Y %H:%M'),
+        'wall_seconds': wall_seconds,
+        'fold_seconds_total': float(sum(result['seconds'] for result in results)),
+        'fold_metrics': fold_metrics,
+        'summary': summarize_folds(fold_metrics),
+        'overall': classification_metrics(y, oof),
+        'by_author': group_breakdown(authors.map(normalize_name), authors, y, y_pred),
+        'by_font': group_breakdown(fonts, fonts, y, y_pred)
+    }
+
+
+def report_path(content_hash, backend_name=MODEL_BACKEND, extension='json', report_dir=EVALUATION_DIR):
+    """Файл отчета: один на пару (датасет, бэкенд), датасет определяется хешем содержимого."""
+    return os.path.join(report_dir, f'{content_hash[:16]}_{backend_name}.{extension}')
+
+
+def render_html(report, top_groups=EVAL_TOP_GROUPS):
+    """Статический HTML-отчет: параметры запуска, метрики по фолдам, итог и разбивки по шрифтам и авторам."""
+    def table(rows):
+        return pd.DataFrame(rows).to_html(index=False, float_format=lambda value: f'{value:.3f}', na_rep='-')
+
+    folds = [{key: value for key, value in row.items() if key != 'confusion'} for row in report['fold_metrics']]
+    summary = [{'Метрика': name, 'Среднее': stats['mean'], 'Std': stats['std']}
+               for name, stats in report['summary'].items()]
+    (tn, fp), (fn, tp) = report['overall']['confusion']
+    title = f"Кросс-валидация: {report['backend']}, {report['folds']} фолдов"
+    return f"""<!DOCTYPE html>
+<html lang="ru"><head><meta charset="utf-8"><title>{html.escape(title)}</title>
+<style>body{{font-family:sans-serif;margin:2em}}table{{border-collapse:collapse;margin-bottom:1.5em}}
+td,th{{border:1px solid #ccc;padding:4px 8px;text-align:right}}</style></head><body>
+<h1>{html.escape(title)}</h1>
+<p>Датасет {report['dataset_hash'][:16]} ({report['n_rows']} строк{', без дубликатов' if report['dedup'] else ''}),
+сид {report['seed']}, отчет от {report['created']}.<br>
+Процессов: {report['workers']}, потоков TF в каждом: {report['tf_threads']}, время {report['wall_seconds']:.1f} с
+(сумма времени фолдов {report['fold_seconds_total']:.1f} с).</p>
+<h2>Итог</h2>{table(summary)}
+<p>Вне фолдов: TN {tn}, FP {fp}, FN {fn}, TP {tp}.</p>
+<h2>Фолды</h2>{table(folds)}
+<h2>По шрифтам</h2>{table(report['by_font'])}
+<h2>По авторам (первые {top_groups} по числу ошибок)</h2>{table(report['by_author'][:top_groups])}
+</body></html>
+"""
+
+
+def save_report(report, report_dir=EVALUATION_DIR):
+    """Сохраняет отчет в JSON (его читает интерфейс) и HTML. Возвращает путь к HTML."""
+    os.makedirs(report_dir, exist_ok=True)
+    json_path = report_path(report['dataset_hash'], report['backend'], 'json', report_dir)
+    tmp_path = json_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, json_path)
+    html_path = report_path(report['dataset_hash'], report['backend'], 'html', report_dir)
+    with open(html_path, 'w', encoding='utf-8') as f:
+        f.write(render_html(report))
+    return html_path
+
+
+def load_report(content_hash, backend_name=MODEL_BACKEND, report_dir=EVALUATION_DIR):
+    """Готовый отчет для датасета с этим хешем или None, если оценка еще не запускалась."""
+    path = report_path(content_hash, backend_name, 'json', report_dir)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Кросс-валидация модели и статический отчет для интерфейса")
+    parser.add_argument('csv', nargs='?', default='data/default_dataset.csv', help="Датасет (CSV)")
+    parser.add_argument('--folds', type=int, default=EVAL_FOLDS)
+    parser.add_argument('--workers', type=int, default=EVAL_WORKERS, help="Процессов (по умолчанию - по ядрам)")
+    parser.add_argument('--tf-threads', type=int, default=EVAL_TF_THREADS, help="Потоков TF в каждом процессе")
+    parser.add_argument('--backend', default=MODEL_BACKEND, help="Бэкенд модели (models/backends.py)")
+    parser.add_argument('--dedup', action='store_true', help="Исключить дубликаты, как при обучении с dedup")
+    args = parser.parse_args()
+
+    report = evaluate_dataset(pd.read_csv(args.csv), folds=args.folds, workers=args.workers,
+                              tf_threads=args.tf_threads, backend_name=args.backend, dedup=args.dedup)
+    print(f"Отчет сохранен: {save_report(report)}")
+    print(f"Процессов: {report['workers']}, потоков TF в каждом: {report['tf_threads']}, {report['wall_seconds']:.1f} с "
+          f"(сумма по фолдам {report['fold_seconds_total']:.1f} с)")
+    for name, stats in report['summary'].items():
+        if stats['mean'] is None:
+            print(f"{name:>9}: -")
+        else:
+            print(f"{name:>9}: {stats['mean']:.3f} ± {stats['std']:.3f}")
@@ -1,109 +1,165 @@
 import os
-import joblib
+import json
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 from sklearn.metrics import confusion_matrix
-from tensorflow.keras.models import Sequential, load_model
-from tensorflow.keras.layers import Dense, Dropout
-from tensorflow.keras.optimizers import Adam
-from tensorflow.keras.callbacks import EarlyStopping
+from tensorflow.keras.models import load_model
 from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.model_selection import train_test_split
 from typing import Tuple
 import tensorflow as tf
+from config import MODEL_BACKEND, MODEL_VARIANT, RANDOM_SEED, TEST_SIZE, DETERMINISTIC_TRAINING
+from models.backends import KerasBackend, create_model, get_backend
+from models.quantization import export_quantized_variants, load_variant
+from models.artifacts import ModelArtifacts, save_artifacts, update_manifest, MANIFEST_NAME as ARTIFACTS_MANIFEST
+from models.splits import set_global_seed, load_or_create_split
+from utils.dedup import deduplicate
+from utils.large_dataset import dataset_hash
+from utils.drift import DriftReference, REFERENCE_NAME
 
 MODEL_DIR = os.path.join(os.path.dirname(__file__), 'trained_model')
 
+BOOL_COLUMNS = ['Наличие колонтитулов', 'Наличие нумерации страниц', 'Наличие титульного листа',
+                'Верно ли оформлены заголовки', 'Есть ли содержание с правильными отступами',
+                'Верно ли оформлены ссылки', 'Верно ли оформлены таблицы', 'Верно ли оформлены рисунки',
+                'Соответствует ли оформление списков', 'Правильно ли оформлены приложения',
+                'Верно ли указаны реквизиты документа', 'Соответствует ГОСТ']
 
-def create_model(input_shape):
+MANIFEST_NAME = 'training_manifest.json'
+
+
+def training_manifest(df, dedup=False, content_hash=None):
     """
-    Создает и компилирует модель нейронной сети для бинарной классификации.
-    Архитектура: 3 полносвязных слоя с Dropout для регуляризации.
-    Возвращает скомпилированную модель Keras.
+    Описание обучения: хеш датасета (после исключения дубликатов), сид, доля теста,
+    режим детерминизма, бэкенд модели и его параметры. Совпадение манифестов означает,
+    что повторное обучение даст ту же модель.
+    Уже посчитанный хеш датасета можно передать в content_hash - тогда ни дубликаты,
+    ни хеш заново не вычисляются.
     """
-    model = Sequential([
-        Dense(128, activation='relu', input_shape=(input_shape,)),
-        Dropout(0.3),
-        Dense(64, activation='relu'),
-        Dropout(0.2),
-        Dense(32, activation='relu'),
-        Dense(1, activation='sigmoid')
-    ])
-    model.compile(optimizer=Adam(learning_rate=0.001),
-                  loss='binary_crossentropy',
-                  metrics=['accuracy', 'Precision', 'Recall', 'AUC'])
-    return model
+    if dedup and content_hash is None:
+        df = deduplicate(df)
+    return {
+        'dataset_hash': content_hash if content_hash is not None else dataset_hash(df),
+        'seed': RANDOM_SEED,
+        'test_size': TEST_SIZE,
+        'deterministic': DETERMINISTIC_TRAINING,
+        'backend': MODEL_BACKEND,
+        'params': get_backend(MODEL_BACKEND).params
+    }
+
+
+def load_training_manifest():
+    """Манифест сохраненной модели или None, если модель обучалась без него."""
+    path = os.path.join(MODEL_DIR, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
 
 
-def train_and_save_model(df):
+def is_model_current(df, dedup=False, content_hash=None):
+    """Проверяет, что сохраненная модель обучена на этом же датасете с теми же параметрами."""
+    return (DETERMINISTIC_TRAINING and os.path.exists(os.path.join(MODEL_DIR, ARTIFACTS_MANIFEST))
+            and load_training_manifest() == training_manifest(df, dedup, content_hash))
+
+
+def train_and_save_model(df, dedup=False, force=False, content_hash=None):
     """
     Основной метод обучения модели. Выполняет:
+    0. Исключение дубликатов и повторных сдач работ (если dedup=True)
     1. Предобработку данных
-    2. Разделение на train/test
+    2. Разделение на train/test (индексы кешируются по хешу датасета)
     3. Масштабирование признаков
-    4. Обучение модели с ранней остановкой
-    5. Сохранение всех компонентов
+    4. Обучение модели бэкендом MODEL_BACKEND (с фиксированными сидами при DETERMINISTIC_TRAINING)
+    5. Сохранение всех компонентов и манифеста обучения
+    Если датасет и параметры не изменились, обучение детерминировано и force=False,
+    возвращается сохраненная модель без переобучения.
+    content_hash - уже посчитанный хеш датасета, который пойдет в обучение (после исключения дубликатов).
     Возвращает модель, препроцессоры и историю обучения.
     """
+    if dedup:
+        df = deduplicate(df)
+    manifest = training_manifest(df, content_hash=content_hash)
+    train_idx, test_idx = load_or_create_split(df, content_hash=manifest['dataset_hash'])
     X, y, label_encoder = preprocess_data(df)
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    X_train, X_test, y_train, y_test = X.iloc[train_idx], X.iloc[test_idx], y.iloc[train_idx], y.iloc[test_idx]
+
+    if not force and DETERMINISTIC_TRAINING and load_training_manifest() == manifest:
+        model, scaler, label_encoder, history_data = load_trained_components()
+        if model is not None:
+            return model, scaler, label_encoder, history_data, X_test, y_test
+
+    if DETERMINISTIC_TRAINING:
+        set_global_seed(RANDOM_SEED)
 
     scaler = StandardScaler()
     X_train_scaled = scaler.fit_transform(X_train)  # Масштабируем только трейн
 
-    model = create_model(X_train_scaled.shape[1])
-    early_stopping = EarlyStopping(monitor='val_loss', patience=10, restore_best_weights=True)
+    # Keras, бустинг или логистическая регрессия (см. models/backends.py); история - для кривых обучения
+    model = get_backend(MODEL_BACKEND)()
+    history_data = model.fit(X_train_scaled, y_train)
 
-    # Сохраняем историю обучения
-    history = model.fit(X_train_scaled, y_train,
-                        epochs=50,
-                        batch_size=32,
-                        validation_split=0.2,
-                        callbacks=[early_stopping],
-                        verbose=0)  # verbose=0 чтобы не засорять лог Streamlit
+    save_trained_components(model, scaler, label_encoder, history_data)
+    save_drift_reference(X_train, label_encoder)
+    with open(os.path.join(MODEL_DIR, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
 
-    save_trained_components(model, scaler, label_encoder, history.history)
+    # Квантованный вариант пересобирается после каждого обучения, чтобы не отставать от model.h5
+    if MODEL_VARIANT != 'float32' and model.name == KerasBackend.name:
+        export_quantized_variants(model.keras_model, X_train_scaled, variants=[MODEL_VARIANT], model_dir=MODEL_DIR)
+        model = load_variant(MODEL_VARIANT, MODEL_DIR)
 
     # Возвращаем все, что нужно для графиков
-    return model, scaler, label_encoder, history.history, X_test, y_test
+    return model, scaler, label_encoder, history_data, X_test, y_test
 
 
 def save_trained_components(model, scaler, label_encoder, history_data):
     """
-    Сохраняет все компоненты модели в указанную директорию:
-    - Модель Keras (.h5)
-    - Объекты масштабирования и кодирования (.pkl)
-    - Данные истории обучения (.pkl)
+    Сохраняет все компоненты модели в указанную директорию (без pickle):
+    - Модель в формате бэкенда (.h5 для Keras, .npz для остальных)
+    - Статистики скейлера (.npz) и классы кодировщика (.json)
+    - Данные истории обучения (.npz)
+    - Контрольные суммы всех файлов (artifacts.json)
+    """
+    save_artifacts(model, scaler, label_encoder, history_data, MODEL_DIR)
+
+
+def save_drift_reference(X_train, label_encoder):
+    """
+    Сохраняет снимок распределений обучающей выборки для мониторинга дрейфа (utils/drift.py).
+    Шрифты хранятся названиями, а не кодами, чтобы новые шрифты было видно в отчете.
+    """
+    frame = X_train.copy()
+    if 'Шрифт' in frame.columns:
+        frame['Шрифт'] = label_encoder.inverse_transform(frame['Шрифт'].astype(int))
+    DriftReference.from_frame(frame).save(os.path.join(MODEL_DIR, REFERENCE_NAME))
+    update_manifest([REFERENCE_NAME], MODEL_DIR)
+
+
+def load_artifacts():
+    """
+    Открывает сохраненные компоненты для ленивой загрузки (см. models/artifacts.py).
+    Возвращает ModelArtifacts или None, если модель еще не сохранялась.
     """
-    os.makedirs(MODEL_DIR, exist_ok=True)
-    model.save(os.path.join(MODEL_DIR, 'model.h5'))
-    joblib.dump(scaler, os.path.join(MODEL_DIR, 'scaler.pkl'))
-    joblib.dump(label_encoder, os.path.join(MODEL_DIR, 'label_encoder.pkl'))
-    joblib.dump(history_data, os.path.join(MODEL_DIR, 'history.pkl'))
+    if not os.path.exists(os.path.join(MODEL_DIR, ARTIFACTS_MANIFEST)):
+        return None
+    return ModelArtifacts(MODEL_DIR, MODEL_VARIANT)
 
 
 def load_trained_components():
     """
     Загружает ранее сохраненные компоненты модели.
-    Проверяет наличие всех необходимых файлов перед загрузкой.
+    Каждый файл сверяется с контрольной суммой перед загрузкой.
+    Модель загружается в варианте MODEL_VARIANT из config (если он был экспортирован).
     Возвращает кортеж (model, scaler, label_encoder, history) или None при ошибке.
+    Если нужна только часть компонентов, лучше использовать load_artifacts.
     """
     try:
-        model_path = os.path.join(MODEL_DIR, 'model.h5')
-        scaler_path = os.path.join(MODEL_DIR, 'scaler.pkl')
-        encoder_path = os.path.join(MODEL_DIR, 'label_encoder.pkl')
-        history_path = os.path.join(MODEL_DIR, 'history.pkl')
-
-        if not all(os.path.exists(p) for p in [model_path, scaler_path, encoder_path, history_path]):
+        artifacts = load_artifacts()
+        if artifacts is None:
             return None, None, None, None
-
-        model = tf.keras.models.load_model(model_path, compile=False)
-        scaler = joblib.load(scaler_path)
-        label_encoder = joblib.load(encoder_path)
-        history_data = joblib.load(history_path)
-
-        return model, scaler, label_encoder, history_data
+        return artifacts.model, artifacts.scaler, artifacts.label_encoder, artifacts.history
 
     except Exception as e:
         print(f"Ошибка загрузки компонентов: {str(e)}")
@@ -120,12 +176,7 @@ def preprocess_data(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series, LabelEnc
     Возвращает (X, y, label_encoder).
     """
     data = df.copy()
-    bool_cols = ['Наличие колонтитулов', 'Наличие нумерации страниц', 'Наличие титульного листа',
-                 'Верно ли оформлены заголовки', 'Есть ли содержание с правильными отступами',
-                 'Верно ли оформлены ссылки', 'Верно ли оформлены таблицы', 'Верно ли оформлены рисунки',
-                 'Соответствует ли оформление списков', 'Правильно ли оформлены приложения',
-                 'Верно ли указаны реквизиты документа', 'Соответствует ГОСТ']
-    for col in bool_cols:
+    for col in BOOL_COLUMNS:
         if col in data.columns:
             data[col] = data[col].map({True: 1, False: 0, 'True': 1, 'False': 0})
     if 'Дата создания' in data.columns:
@@ -141,6 +192,47 @@ def preprocess_data(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series, LabelEnc
     y = data['Соответствует ГОСТ']
     return X, y, label_encoder
 
+def feature_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Признаки новых документов до кодирования и масштабирования:
+    те же преобразования, что и в preprocess_data (булевы значения, даты), шрифт остается строкой.
+    Нераспознанные даты остаются пропусками (их учитывает мониторинг дрейфа).
+    """
+    data = df.copy()
+    for col in BOOL_COLUMNS:
+        if col in data.columns:
+            data[col] = data[col].map({True: 1, False: 0, 'True': 1, 'False': 0})
+    if 'Дата создания' in data.columns and not pd.api.types.is_numeric_dtype(data['Дата создания']):
+        dates = pd.to_datetime(data['Дата создания'], errors='coerce', format='%d.%m.%Y')
+        data['Дата создания'] = (dates - pd.Timestamp('2000-01-01')).dt.days
+    return data
+
+
+def prepare_features(df: pd.DataFrame, scaler, label_encoder):
+    """
+    Готовит новые документы к предсказанию уже обученной моделью:
+    - те же преобразования, что и в preprocess_data (булевы значения, даты)
+    - шрифт кодируется сохраненным label_encoder (новый не обучается);
+      шрифт, которого не было в обучении, получает нейтральное значение - среднее обучающей выборки
+    - значение, которое не удалось определить в документе (размер шрифта, интервал и т.д.),
+      тоже заменяется средним обучающей выборки
+    - колонки упорядочиваются как при обучении скейлера и масштабируются
+    Возвращает (масштабированная матрица, список признаков).
+    """
+    data = feature_frame(df)
+    feature_names = list(scaler.feature_names_in_)
+    if 'Дата создания' in data.columns:
+        data['Дата создания'] = data['Дата создания'].fillna(0)
+    if 'Шрифт' in data.columns:
+        fonts = data['Шрифт'].astype(str)
+        known = fonts.isin(label_encoder.classes_).to_numpy()
+        codes = np.full(len(data), scaler.mean_[feature_names.index('Шрифт')])
+        if known.any():
+            codes[known] = label_encoder.transform(fonts[known])
+        data['Шрифт'] = codes
+
+    features = data[feature_names].astype(float).fillna(pd.Series(scaler.mean_, index=feature_names))
+    return scaler.transform(features), feature_names
 
 
 def plot_learning_curves(history_data):
@@ -173,13 +265,16 @@ def plot_confusion_matrix(model, X_test, y_test, scaler):
     """
     X_test_scaled = scaler.transform(X_test)
     y_pred = (model.predict(X_test_scaled) > 0.5).astype("int32")
-    cm = confusion_matrix(y_test, y_pred)
+    return plot_confusion_counts(confusion_matrix(y_test, y_pred))
+
 
+def plot_confusion_counts(cm, title='Матрица ошибок на тестовой выборке'):
+    """Рисует готовую матрицу ошибок [[TN, FP], [FN, TP]] (например, из отчета кросс-валидации)."""
     fig, ax = plt.subplots(figsize=(8, 6))
     sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', ax=ax,
                 xticklabels=['Не соответствует ГОСТ', 'Соответствует ГОСТ'],
                 yticklabels=['Не соответствует ГОСТ', 'Соответствует ГОСТ'])
-    ax.set_title('Матрица ошибок на тестовой выборке')
+    ax.set_title(title)
     ax.set_ylabel('Истинный класс')
     ax.set_xlabel('Предсказанный класс')
     return fig
\ No newline at end of file
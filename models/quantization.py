@@ -0,0 +1,168 @@
+import os
+import json
+import time
+import numpy as np
+import tensorflow as tf
+from sklearn.metrics import accuracy_score, roc_auc_score
+from config import QUANTIZED_VARIANTS, BENCHMARK_DIR
+
+MODEL_DIR = os.path.join(os.path.dirname(__file__), 'trained_model')
+REPORT_NAME = 'quantization_report.json'
+
+
+def variant_path(variant, model_dir=MODEL_DIR):
+    """Путь к файлу варианта модели: model.h5 для float32, model_<variant>.tflite для остальных."""
+    if variant == 'float32':
+        return os.path.join(model_dir, 'model.h5')
+    return os.path.join(model_dir, f'model_{variant}.tflite')
+
+
+class TFLiteModel:
+    """
+    Обертка над интерпретатором TFLite с интерфейсом predict как у модели Keras,
+    чтобы квантованные варианты можно было подставлять в существующий код без изменений.
+    Градиенты через интерпретатор не считаются, поэтому integrated_gradients недоступен.
+    """
+    differentiable = False
+
+    def __init__(self, path):
+        self.path = path
+        self.interpreter = tf.lite.Interpreter(model_path=path)
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch = None
+
+    def predict(self, X, batch_size=None, verbose=0):
+        """Возвращает вероятности формы [n, 1], как model.predict в Keras."""
+        X = np.asarray(X, dtype=np.float32)
+        if len(X) != self._batch:
+            self.interpreter.resize_tensor_input(self._input['index'], X.shape)
+            self.interpreter.allocate_tensors()
+            self._batch = len(X)
+        self.interpreter.set_tensor(self._input['index'], X)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self._output['index']).reshape(-1, 1).copy()
+
+
+def convert_model(model, variant, X_representative=None):
+    """
+    Конвертирует модель Keras в TFLite:
+    - float16: веса хранятся в половинной точности
+    - int8: полное целочисленное квантование весов и активаций
+      (диапазоны калибруются на X_representative, вход и выход остаются float32)
+    Возвращает сериализованную модель (bytes).
+    """
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if variant == 'float16':
+        converter.target_spec.supported_types = [tf.float16]
+    elif variant == 'int8':
+        if X_representative is None:
+            raise ValueError("Для int8-квантования нужна репрезентативная выборка")
+        samples = np.asarray(X_representative, dtype=np.float32)
+
+        def representative_dataset():
+            for row in samples[:500]:
+                yield [row[None, :]]
+
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    else:
+        raise ValueError(f"Неизвестный вариант модели: {variant}")
+    return converter.convert()
+
+
+def export_quantized_variants(model, X_train_scaled, variants=QUANTIZED_VARIANTS, model_dir=MODEL_DIR):
+    """
+    Сохраняет квантованные варианты модели рядом с model.h5 и записывает их контрольные суммы
+    в artifacts.json: ModelArtifacts загружает только варианты, перечисленные в манифесте.
+    Возвращает {вариант: путь к файлу}.
+    """
+    from models.artifacts import update_manifest
+
+    os.makedirs(model_dir, exist_ok=True)
+    paths = {}
+    for variant in variants:
+        path = variant_path(variant, model_dir)
+        with open(path, 'wb') as f:
+            f.write(convert_model(model, variant, X_train_scaled))
+        paths[variant] = path
+    update_manifest([os.path.basename(path) for path in paths.values()], model_dir)
+    return paths
+
+
+def load_variant(variant, model_dir=MODEL_DIR):
+    """Загружает вариант модели: Keras для float32, TFLiteModel для квантованных."""
+    path = variant_path(variant, model_dir)
+    if variant == 'float32':
+        return tf.keras.models.load_model(path, compile=False)
+    return TFLiteModel(path)
+
+
+def benchmark_variants(X_test_scaled, y_test, variants=('float32',) + tuple(QUANTIZED_VARIANTS),
+                       model_dir=MODEL_DIR, repeats=5, throughput_rows=20000):
+    """
+    Сравнивает варианты модели на отложенной выборке:
+    - accuracy и AUC, а также их отклонение от float32
+    - пропускная способность (документов в секунду) на пакете из throughput_rows строк
+      (тестовая выборка повторяется), чтобы не измерять только накладные расходы вызова
+    - размер файла
+    Возвращает отчет {вариант: метрики}.
+    """
+    X_test_scaled = np.asarray(X_test_scaled, dtype=np.float32)
+    y_test = np.asarray(y_test)
+    X_throughput = np.resize(X_test_scaled, (max(throughput_rows, len(X_test_scaled)), X_test_scaled.shape[1]))
+    report = {}
+    for variant in variants:
+        model = load_variant(variant, model_dir)
+        probabilities = model.predict(X_test_scaled, verbose=0).reshape(-1)
+        timings = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            model.predict(X_throughput, batch_size=len(X_throughput), verbose=0)
+            timings.append(time.perf_counter() - started)
+        report[variant] = {
+            'accuracy': float(accuracy_score(y_test, probabilities > 0.5)),
+            'auc': float(roc_auc_score(y_test, probabilities)),
+            'docs_per_second': float(len(X_throughput) / min(timings)),
+            'size_kb': os.path.getsize(variant_path(variant, model_dir)) / 1024
+        }
+
+    if 'float32' in report:
+        for variant, stats in report.items():
+            stats['accuracy_delta'] = stats['accuracy'] - report['float32']['accuracy']
+            stats['auc_delta'] = stats['auc'] - report['float32']['auc']
+            stats['speedup'] = stats['docs_per_second'] / report['float32']['docs_per_second']
+    return report
+
+
+def save_report(report, report_dir=BENCHMARK_DIR):
+    """Сохраняет отчет о квантовании в JSON (вне директории модели, которая хранится в git)."""
+    os.makedirs(report_dir, exist_ok=True)
+    path = os.path.join(report_dir, REPORT_NAME)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return path
+
+
+if __name__ == '__main__':
+    import pandas as pd
+    from models.model_utils import load_artifacts, preprocess_data
+    from models.splits import load_or_create_split
+
+    artifacts = load_artifacts()
+    model, scaler = artifacts.model, artifacts.scaler
+    if not hasattr(model, 'keras_model'):
+        raise SystemExit("Квантование доступно только для бэкенда 'keras' (MODEL_VARIANT = 'float32')")
+    df = pd.read_csv('data/default_dataset.csv')
+    X, y, _ = preprocess_data(df)
+    # То же разбиение, что и в train_and_save_model (из кеша датасета)
+    train_idx, test_idx = load_or_create_split(df)
+    X_train, X_test, y_test = X.iloc[train_idx], X.iloc[test_idx], y.iloc[test_idx]
+    export_quantized_variants(model.keras_model, scaler.transform(X_train))
+    report = benchmark_variants(scaler.transform(X_test), y_test)
+    print(f"Отчет сохранен: {save_report(report)}")
+    for variant, stats in report.items():
+        print(f"{variant:>8}: accuracy {stats['accuracy']:.3f} ({stats['accuracy_delta']:+.3f}), "
+              f"AUC {stats['auc']:.3f} ({stats['auc_delta']:+.3f}), "
+              f"{stats['docs_per_second']:.0f} док/с (x{stats['speedup']:.1f}), {stats['size_kb']:.0f} КБ")
@@ -0,0 +1,53 @@
+import os
+import random
+import numpy as np
+import tensorflow as tf
+from sklearn.model_selection import train_test_split
+from config import RANDOM_SEED, TEST_SIZE
+from utils.large_dataset import dataset_hash, cache_subdir
+
+TARGET_COLUMN = 'Соответствует ГОСТ'
+
+
+def set_global_seed(seed=RANDOM_SEED, deterministic=True):
+    """
+    Фиксирует все источники случайности обучения:
+    - сиды Python, NumPy и TensorFlow (инициализация весов, Dropout, перемешивание в fit)
+    - при deterministic=True - детерминированные реализации операций TF
+    Два обучения на одних данных после этого дают одинаковые веса и метрики.
+    Хеширование строк Python здесь не фиксируется: PYTHONHASHSEED читается только при запуске
+    интерпретатора, поэтому его нужно задать в окружении заранее (PYTHONHASHSEED=0 streamlit run vm_main.py).
+    Обучение от порядка обхода множеств не зависит, так что для воспроизводимости это не требуется.
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+    tf.keras.utils.set_random_seed(seed)
+    if deterministic:
+        tf.config.experimental.enable_op_determinism()
+
+
+def split_path(content_hash, test_size=TEST_SIZE, seed=RANDOM_SEED):
+    """Файл разбиения в кеше датасета (поддиректория splits); параметры разбиения входят в имя файла."""
+    return os.path.join(cache_subdir(content_hash, 'splits'), f'split_seed{seed}_test{test_size:g}.npz')
+
+
+def load_or_create_split(df, test_size=TEST_SIZE, seed=RANDOM_SEED, content_hash=None):
+    """
+    Возвращает стратифицированное разбиение датасета (train_idx, test_idx) - номера строк df.
+    Разбиение считается один раз и сохраняется в кеше датасета по хешу его содержимого,
+    при повторных запусках на тех же данных индексы читаются из файла.
+    """
+    content_hash = content_hash or dataset_hash(df)
+    path = split_path(content_hash, test_size, seed)
+    if os.path.exists(path):
+        with np.load(path, allow_pickle=False) as manifest:
+            if int(manifest['n_rows']) == len(df):
+                return manifest['train_idx'], manifest['test_idx']
+
+    positions = np.arange(len(df))
+    stratify = df[TARGET_COLUMN].to_numpy() if TARGET_COLUMN in df.columns else None
+    train_idx, test_idx = train_test_split(positions, test_size=test_size, random_state=seed, stratify=stratify)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    np.savez(path, train_idx=train_idx, test_idx=test_idx, n_rows=len(df), seed=seed, test_size=test_size)
+    return train_idx, test_idx
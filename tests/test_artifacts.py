@@ -0,0 +1,71 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import StandardScaler, LabelEncoder
+from models.artifacts import (save_scaler, load_scaler, save_label_encoder, load_label_encoder, save_history,
+                              load_history, save_artifacts, update_manifest, ModelArtifacts, ARTIFACT_FILES,
+                              MANIFEST_NAME)
+from models.backends import LogisticRegressionBackend
+
+X = pd.DataFrame(np.random.default_rng(0).normal(size=(50, 3)), columns=['Размер шрифта', 'Шрифт', 'Отступ'])
+y = (X['Размер шрифта'] > 0).astype(int)
+
+
+@pytest.fixture
+def model_dir(tmp_path):
+    scaler = StandardScaler().fit(X)
+    backend = LogisticRegressionBackend()
+    backend.fit(scaler.transform(X), y)
+    label_encoder = LabelEncoder().fit(['Times New Roman', 'Arial'])
+    save_artifacts(backend, scaler, label_encoder, {'loss': [0.7, 0.5]}, model_dir=str(tmp_path))
+    return tmp_path
+
+
+def test_component_roundtrips(tmp_path):
+    scaler = StandardScaler().fit(X)
+    save_scaler(scaler, str(tmp_path / 'scaler.npz'))
+    loaded = load_scaler(str(tmp_path / 'scaler.npz'))
+    np.testing.assert_array_equal(loaded.transform(X), scaler.transform(X))
+    assert list(loaded.feature_names_in_) == list(X.columns)
+
+    label_encoder = LabelEncoder().fit(['Times New Roman', 'Arial', 'Ёлочки'])
+    save_label_encoder(label_encoder, str(tmp_path / 'label_encoder.json'))
+    loaded = load_label_encoder(str(tmp_path / 'label_encoder.json'))
+    assert list(loaded.transform(['Ёлочки', 'Arial'])) == list(label_encoder.transform(['Ёлочки', 'Arial']))
+
+    history = {'loss': [0.75, 0.5, 0.25], 'accuracy': [0.5, 0.75, 1.0]}
+    save_history(history, str(tmp_path / 'history.npz'))
+    assert load_history(str(tmp_path / 'history.npz')) == history
+
+
+def test_changed_byte_is_rejected(model_dir):
+    path = model_dir / ARTIFACT_FILES['scaler']
+    data = bytearray(path.read_bytes())
+    data[len(data) // 2] ^= 0xFF
+    path.write_bytes(bytes(data))
+    with pytest.raises(ValueError):
+        ModelArtifacts(str(model_dir)).verified_path(ARTIFACT_FILES['scaler'])
+    with pytest.raises(ValueError):
+        ModelArtifacts(str(model_dir)).scaler
+
+
+def test_file_missing_from_manifest_is_rejected(model_dir):
+    (model_dir / 'extra.npz').write_bytes(b'data')
+    with pytest.raises(ValueError):
+        ModelArtifacts(str(model_dir)).verified_path('extra.npz')
+    update_manifest(['extra.npz'], str(model_dir))
+    assert ModelArtifacts(str(model_dir)).verified_path('extra.npz') == os.path.join(str(model_dir), 'extra.npz')
+
+
+def test_history_is_not_read_for_prediction(model_dir):
+    # Поврежденная история не мешает предсказанию: ее файл даже не открывается
+    (model_dir / ARTIFACT_FILES['history']).write_bytes(b'broken')
+    artifacts = ModelArtifacts(str(model_dir))
+    probabilities = artifacts.model.predict(artifacts.scaler.transform(X))
+    assert probabilities.shape == (len(X), 1)
+    with open(model_dir / MANIFEST_NAME, encoding='utf-8') as f:
+        assert json.load(f)['backend'] == LogisticRegressionBackend.name
+    with pytest.raises(ValueError):
+        artifacts.history
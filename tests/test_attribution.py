@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+import tensorflow as tf
+from models.attribution import (occlusion_attributions, integrated_gradients, top_contributors, explain_batch,
+                                compute_attributions)
+from models.backends import LogisticRegressionBackend, KerasBackend
+from models.quantization import TFLiteModel, convert_model
+
+FEATURES = ['Размер шрифта', 'Левое поле (см)', 'Межстрочный интервал', 'Шрифт']
+
+
+def linear_model():
+    return LogisticRegressionBackend(np.array([1.5, -2.0, 0.5, 0.0]), 0.3)
+
+
+def test_occlusion_is_drop_in_prediction():
+    model = linear_model()
+    X = np.random.default_rng(0).normal(size=(7, 4)).astype(np.float32)
+    baseline = np.array([0.1, 0.2, -0.3, 0.4], dtype=np.float32)
+    # Маленькие пачки - документы обрабатываются несколькими блоками
+    probabilities, attributions = occlusion_attributions(model, X, baseline=baseline, batch_rows=8)
+    np.testing.assert_allclose(probabilities, model.predict_proba(X), atol=1e-6)
+    for j in range(X.shape[1]):
+        occluded = X.copy()
+        occluded[:, j] = baseline[j]
+        np.testing.assert_allclose(attributions[:, j], model.predict_proba(X) - model.predict_proba(occluded),
+                                   atol=1e-6)
+    # Признак с нулевым весом ни на что не влияет
+    assert np.all(attributions[:, 3] == 0)
+
+
+def test_top_contributors_order_and_k():
+    attributions = np.array([[0.1, -0.5, 0.3, 0.0],
+                             [0.0, 0.2, -0.1, 0.05]])
+    top = top_contributors(attributions, FEATURES, k=2)
+    assert top == [[('Левое поле (см)', -0.5), ('Межстрочный интервал', 0.3)],
+                   [('Левое поле (см)', 0.2), ('Межстрочный интервал', -0.1)]]
+    assert len(top_contributors(attributions, FEATURES, k=10)[0]) == len(FEATURES)
+
+
+def test_integrated_gradients_completeness():
+    tf.keras.utils.set_random_seed(0)
+    model = tf.keras.Sequential([tf.keras.Input(shape=(4,)), tf.keras.layers.Dense(8, activation='tanh'),
+                                 tf.keras.layers.Dense(1, activation='sigmoid')])
+    X = np.random.default_rng(1).normal(size=(5, 4)).astype(np.float32)
+    probabilities, attributions = integrated_gradients(model, X, steps=128)
+    at_baseline = float(model(np.zeros((1, 4), dtype=np.float32))[0, 0])
+    # Сумма вкладов равна изменению выхода от базового значения до x
+    np.testing.assert_allclose(attributions.sum(axis=1), probabilities - at_baseline, atol=1e-3)
+
+
+def test_explain_batch():
+    model = linear_model()
+    X = np.random.default_rng(2).normal(size=(3, 4)).astype(np.float32)
+    results = explain_batch(model, X, FEATURES, method='occlusion', k=2)
+    assert [len(result['top_contributors']) for result in results] == [2, 2, 2]
+    np.testing.assert_allclose([result['probability'] for result in results], model.predict_proba(X), atol=1e-6)
+
+
+def test_integrated_gradients_needs_differentiable_model(tmp_path):
+    tf.keras.utils.set_random_seed(0)
+    keras_model = tf.keras.Sequential([tf.keras.Input(shape=(4,)), tf.keras.layers.Dense(1, activation='sigmoid')])
+    path = tmp_path / 'model_float16.tflite'
+    path.write_bytes(convert_model(keras_model, 'float16'))
+    X = np.random.default_rng(3).normal(size=(3, 4)).astype(np.float32)
+
+    assert compute_attributions(KerasBackend(keras_model), X, method='integrated_gradients')[1].shape == (3, 4)
+    for model in (TFLiteModel(str(path)), linear_model()):
+        with pytest.raises(ValueError):
+            compute_attributions(model, X, method='integrated_gradients')
+        # Окклюзия работает с любой моделью
+        assert compute_attributions(model, X, method='occlusion')[1].shape == (3, 4)
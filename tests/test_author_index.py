@@ -0,0 +1,34 @@
+import pandas as pd
+from utils.author_index import AuthorIndex, normalize_name, load_or_build_index
+
+AUTHORS = pd.Series(['Иванов Иван Иванович', 'Петров Петр Петрович', 'Иванов Иван Иванович',
+                     'Сидорова Анна Сергеевна', 'Иванова Мария Петровна', 'Ёлкин Артём Олегович'],
+                    index=[10, 11, 12, 13, 14, 15])
+
+
+def test_normalize_name():
+    assert normalize_name('  Ёлкин, Артём О.') == 'елкин артем о'
+    assert normalize_name('Иванов-Петров И.И.') == 'иванов петров и и'
+
+
+def test_search_tolerates_typos_word_order_and_initials():
+    index = AuthorIndex.build(AUTHORS)
+    for query in ['Иванов Иван Иванович', 'Иваноф Иван', 'Иван Иванович Иванов', 'Иванов И.И.']:
+        name, score, documents = index.search(query)[0]
+        assert (name, documents) == ('Иванов Иван Иванович', 2), query
+    assert index.search('Елкин Артем')[0][0] == 'Ёлкин Артём Олегович'
+    assert index.search('Сидорова')[0][0] == 'Сидорова Анна Сергеевна'
+    assert index.search('') == []
+
+
+def test_rows_from_chunks():
+    index = AuthorIndex.build([AUTHORS.iloc[:3], AUTHORS.iloc[3:]])
+    assert index.rows('Иванов Иван Иванович').tolist() == [10, 12]
+    assert len(index.rows('Неизвестный Автор')) == 0
+
+
+def test_save_load_roundtrip(tmp_path):
+    built = load_or_build_index(str(tmp_path), lambda: [AUTHORS])
+    loaded = load_or_build_index(str(tmp_path), lambda: [])  # построение не вызывается
+    assert loaded.search('Петров Петр') == built.search('Петров Петр')
+    assert loaded.rows('Петров Петр Петрович').tolist() == [11]
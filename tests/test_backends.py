@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression
+from config import RANDOM_SEED
+from models.backends import ModelBackend, GradientBoostingBackend, LogisticRegressionBackend, get_backend
+
+
+def make_data(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, 6)).astype(np.float32)
+    y = (X[:, 0] + 0.5 * X[:, 1] * X[:, 2] + 0.3 * rng.normal(size=n_rows) > 0).astype(int)
+    return X, y
+
+
+def test_gbt_arrays_match_sklearn():
+    X, y = make_data(500)
+    X_test, _ = make_data(2500, seed=1)  # больше block_rows - проверяется и разбиение на блоки
+    backend = GradientBoostingBackend()
+    history = backend.fit(X, y)
+    reference = GradientBoostingClassifier(random_state=RANDOM_SEED, **backend.params).fit(X, y)
+    np.testing.assert_allclose(backend.predict_proba(X_test), reference.predict_proba(X_test)[:, 1], atol=1e-6)
+    assert backend.predict(X_test, batch_size=700).shape == (len(X_test), 1)
+    assert len(history['loss']) == backend.params['n_estimators']
+
+
+@pytest.mark.parametrize('backend_class', [GradientBoostingBackend, LogisticRegressionBackend])
+def test_save_load_roundtrip(tmp_path, backend_class):
+    X, y = make_data(300)
+    backend = backend_class()
+    backend.fit(X, y)
+    path = str(tmp_path / backend_class.file_name)
+    backend.save(path)
+    loaded = backend_class.load(path)
+    np.testing.assert_array_equal(loaded.predict(X), backend.predict(X))
+
+
+def test_logreg_matches_sklearn():
+    X, y = make_data(300)
+    backend = LogisticRegressionBackend()
+    backend.fit(X, y)
+    reference = LogisticRegression(random_state=RANDOM_SEED, **backend.params).fit(X, y)
+    np.testing.assert_allclose(backend.predict_proba(X), reference.predict_proba(X)[:, 1], atol=1e-6)
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        get_backend('xgboost')
+
+
+def test_backend_must_implement_interface():
+    class PredictOnly(ModelBackend):
+        def predict_proba(self, X):
+            return np.zeros(len(X))
+
+    with pytest.raises(TypeError):
+        PredictOnly()
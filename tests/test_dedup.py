@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+from utils.dedup import minhash_signatures, find_duplicates, deduplicate, duplicate_summary
+
+WORKS = pd.DataFrame({
+    'Название документа': [
+        'Разработка системы проверки оформления ВКР',
+        'Разработка системы проверки оформления ВКР.',  # та же работа, другая пунктуация
+        'Разработка системы провеки оформления ВКР',  # повторная сдача с опечаткой
+        'Разработка системы проверки оформления ВКР',  # то же название, другой автор
+        'Анализ тональности отзывов',
+    ],
+    'Автор': ['Иванов Иван Иванович', 'иванов  иван иванович', 'Иван Иванович Иванов',
+              'Петров Петр Петрович', 'Иванов Иван Иванович'],
+    'Дата создания': ['01.03.2024', '05.03.2024', '20.05.2024', '01.03.2024', '02.02.2024'],
+    'Размер шрифта': [14, 14, 14, 14, 12],
+})
+
+
+def test_minhash_estimates_jaccard():
+    signatures = minhash_signatures(['проверка оформления работ'] * 2 + ['совсем другой текст', 'abc'],
+                                    num_perm=256)
+    assert (signatures[0] == signatures[1]).all()
+    assert (signatures[0] == signatures[2]).mean() < 0.2
+    # Текст короче шингла ни на что не похож
+    assert (signatures[3] != signatures[0]).all()
+
+
+def test_find_duplicates_clusters():
+    cluster_ids = find_duplicates(WORKS)
+    assert cluster_ids.tolist() == [0, 0, 0, 1, 2]
+    assert duplicate_summary(cluster_ids) == {'rows': 5, 'clusters': 3, 'duplicates': 2, 'largest_cluster': 3}
+
+
+def test_deduplicate_keeps_latest_submission():
+    works = WORKS.set_index(np.arange(10, 15))
+    result = deduplicate(works)
+    assert result.index.tolist() == [12, 13, 14]
+    assert result.loc[12, 'Дата создания'] == '20.05.2024'
+
+
+def test_empty_dataset():
+    assert find_duplicates(WORKS.iloc[:0]).empty
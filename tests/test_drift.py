@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+from utils.drift import DriftReference, DriftMonitor, psi, ks_statistic, load_monitor, combined_monitor
+
+rng = np.random.default_rng(0)
+TRAIN = pd.DataFrame({
+    'Размер шрифта': rng.choice([12, 14], size=2000, p=[0.2, 0.8]),
+    'Левое поле (см)': rng.normal(3.0, 0.2, size=2000),
+    'Шрифт': rng.choice(['Times New Roman', 'Arial'], size=2000, p=[0.9, 0.1]),
+})
+
+
+def test_psi_and_ks():
+    counts = [100, 300, 400, 200]
+    assert psi(counts, [50, 150, 200, 100]) < 1e-12
+    assert ks_statistic(counts, [50, 150, 200, 100]) < 1e-12
+    assert psi(counts, [400, 300, 200, 100]) > 0.25
+    assert abs(ks_statistic(counts, [400, 300, 200, 100]) - 0.3) < 1e-12
+    assert psi(counts, [0, 0, 0, 0]) == 0.0
+
+
+def test_reference_bins():
+    reference = DriftReference.from_frame(TRAIN)
+    # Два значения размера шрифта - одна граница посередине
+    assert reference.numeric['Размер шрифта']['edges'] == [13.0]
+    assert len(reference.numeric['Левое поле (см)']['edges']) == 9
+    assert reference.categorical['Шрифт']['categories'] == ['Arial', 'Times New Roman']
+
+
+def test_stable_and_shifted_inputs():
+    reference = DriftReference.from_frame(TRAIN)
+    stable = DriftMonitor(reference)
+    stable.update_batch(TRAIN.sample(500, random_state=1))
+    assert all(row['Статус'] == 'норма' for row in stable.report())
+
+    shifted = DriftMonitor(reference)
+    shifted.update_batch(TRAIN.assign(**{'Левое поле (см)': TRAIN['Левое поле (см)'] + 0.5}).head(500))
+    rows = {row['Признак']: row for row in shifted.report()}
+    assert rows['Левое поле (см)']['Статус'] == 'дрейф'
+    assert rows['Размер шрифта']['Статус'] == 'норма'
+
+
+def test_update_matches_update_batch():
+    reference = DriftReference.from_frame(TRAIN)
+    batch = pd.DataFrame({'Размер шрифта': [14, 12, None, 16],
+                          'Левое поле (см)': [3.0, 2.5, 3.4, np.nan],
+                          'Шрифт': ['Arial', 'Calibri', None, 'Calibri']})
+    by_record, by_batch = DriftMonitor(reference), DriftMonitor(reference)
+    for record in batch.to_dict('records'):
+        by_record.update(record)
+    by_batch.update_batch(batch)
+    assert by_record.to_dict() == by_batch.to_dict()
+    assert by_batch.unseen_categories() == {'Шрифт': [('Calibri', 2)]}
+    assert by_batch.missing == {'Размер шрифта': 1, 'Левое поле (см)': 1, 'Шрифт': 1}
+
+
+def test_saved_monitors_are_combined(tmp_path):
+    reference = DriftReference.from_frame(TRAIN)
+    for source, rows in (('ui', TRAIN.head(10)), ('daemon', TRAIN.tail(20))):
+        monitor = load_monitor(source, reference, str(tmp_path))
+        monitor.update_batch(rows)
+        monitor.save(str(tmp_path / f'{source}.json'))
+    assert combined_monitor(reference, str(tmp_path)).n_docs == 30
+    # Состояние, накопленное для другого снимка, не подхватывается
+    other = DriftReference.from_frame(TRAIN.head(100))
+    assert load_monitor('ui', other, str(tmp_path)).n_docs == 0
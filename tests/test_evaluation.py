@@ -0,0 +1,45 @@
+import warnings
+from models.evaluation import classification_metrics, summarize_folds, group_breakdown, METRICS
+
+
+def test_classification_metrics_on_fixed_input():
+    y_true = [0, 0, 0, 1, 1, 1, 1]
+    probabilities = [0.1, 0.7, 0.2, 0.9, 0.4, 0.8, 0.6]
+    metrics = classification_metrics(y_true, probabilities)
+    # [[TN, FP], [FN, TP]]
+    assert metrics['confusion'] == [[2, 1], [1, 3]]
+    assert metrics['accuracy'] == 5 / 7
+    assert metrics['precision'] == 3 / 4
+    assert metrics['recall'] == 3 / 4
+    assert abs(metrics['auc'] - 10 / 12) < 1e-12
+
+
+def test_auc_is_none_for_single_class():
+    metrics = classification_metrics([1, 1, 1], [0.9, 0.3, 0.6])
+    assert metrics['auc'] is None
+    assert metrics['confusion'] == [[0, 0], [1, 2]]
+
+
+def test_summary_without_auc_in_any_fold():
+    folds = [classification_metrics([1, 1], [0.9, 0.6]), classification_metrics([1, 1, 1], [0.9, 0.3, 0.6])]
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        summary = summarize_folds(folds)
+    assert summary['auc'] == {'mean': None, 'std': None}
+    assert summary['accuracy'] == {'mean': (1.0 + 2 / 3) / 2, 'std': (1.0 - 2 / 3) / 2}
+    assert set(summary) == set(METRICS)
+
+
+def test_group_breakdown_counts_and_order():
+    keys = ['иванов', 'петров', 'иванов', 'сидоров', 'петров', 'петров', 'сидоров']
+    labels = ['Иванов И.', 'Петров П.', 'иванов и', 'Сидоров С.', 'Петров', 'Петров', 'Сидоров С.']
+    y_true = [1, 0, 0, 1, 1, 1, 0]
+    y_pred = [0, 1, 1, 1, 1, 0, 0]
+    rows = group_breakdown(keys, labels, y_true, y_pred)
+    # У Иванова и Петрова по две ошибки, но у Петрова больше документов; подпись - первая в группе
+    assert [row['Группа'] for row in rows] == ['Петров П.', 'Иванов И.', 'Сидоров С.']
+    assert [(row['Документов'], row['Ложно принятых'], row['Ложно отклоненных']) for row in rows] == \
+        [(3, 1, 1), (2, 1, 1), (2, 0, 0)]
+    assert [row['Ошибок модели'] for row in rows] == [2, 2, 0]
+    assert abs(rows[0]['Accuracy'] - 1 / 3) < 1e-12
+    assert rows[0]['Соответствует ГОСТ'] == 2 / 3
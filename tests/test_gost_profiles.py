@@ -0,0 +1,73 @@
+import os
+import docx
+import numpy as np
+import pandas as pd
+from docx.shared import Pt
+from docx_processor import DocxProcessor
+from utils.gost_profiles import compile_profile, evaluate_profiles, get_profile
+
+DATASET = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'default_dataset.csv')
+
+PROFILE = {
+    'name': 'Тестовый',
+    'rules': [
+        {'column': 'Размер шрифта', 'type': 'numeric', 'value': 14, 'tolerance': 0, 'label': 'Размер'},
+        {'column': 'Левое поле (см)', 'type': 'numeric', 'value': 3.0, 'tolerance': 0.05,
+         'label': 'Левое поле', 'group': 'Поля'},
+        {'column': 'Шрифт', 'type': 'equals', 'value': 'Times New Roman', 'label': 'Шрифт',
+         'message': 'Используйте шрифт {expected} (текущий: {actual})'},
+        {'column': 'Наличие титульного листа', 'type': 'required', 'label': 'Титульный лист'},
+    ]
+}
+
+
+def test_rule_kinds():
+    df = pd.DataFrame({
+        'Размер шрифта': [14, 12, 14, None],
+        'Левое поле (см)': [3.0, 3.04, 2.5, 3.0],
+        'Шрифт': ['Times New Roman', 'Times New Roman', 'Arial', None],
+        'Наличие титульного листа': [True, 'True', 'False', 1],
+    })
+    violations = compile_profile(PROFILE).violations(df)
+    assert list(violations.columns) == ['Размер', 'Левое поле', 'Шрифт', 'Титульный лист']
+    expected = [[False, False, False, False],
+                [True, False, False, False],
+                [False, True, True, True],
+                # Шрифт и размер не определены - соответствие не подтверждено
+                [True, False, True, False]]
+    assert violations.to_numpy().tolist() == expected
+
+
+def test_missing_columns_are_not_violations():
+    violations = compile_profile(PROFILE).violations(pd.DataFrame({'Автор': ['Иванов']}))
+    assert not violations.to_numpy().any()
+
+
+def test_several_profiles_match_separate_checks():
+    df = pd.read_csv(DATASET).head(200)
+    profiles = [get_profile('gost_7_32'), get_profile('gost_2_105'), compile_profile(PROFILE)]
+    combined = evaluate_profiles(df, profiles)
+    for profile in profiles:
+        separate = evaluate_profiles(df, [profile])[profile.name]
+        assert np.array_equal(combined[profile.name].to_numpy(), separate.to_numpy())
+
+
+def test_error_counts_and_recommendations():
+    profile = compile_profile(PROFILE)
+    df = pd.DataFrame({'Размер шрифта': [12, 12, 14], 'Шрифт': ['Arial', 'Times New Roman', 'Arial']})
+    assert profile.error_counts(df) == [('Размер', 2), ('Шрифт', 2)]
+    assert profile.recommendations({'Шрифт': 'Arial', 'Размер шрифта': 14}) == [
+        'Используйте шрифт Times New Roman (текущий: Arial)']
+
+
+def test_docx_without_explicit_formatting_fails_rules():
+    document = docx.Document()
+    document.add_paragraph().add_run('Основной текст работы. ' * 20).font.size = Pt(10)
+    values = DocxProcessor.extract_metadata(document, 'work.docx')
+    assert values['Размер шрифта'] == 10
+    assert values['Отступ абзаца (см)'] is None
+    violations = get_profile('gost_7_32').violations(pd.DataFrame([values])).iloc[0]
+    assert violations['Неверный размер шрифта']
+    assert violations['Неверный межстрочный интервал']
+    assert violations['Неправильные отступы']
+    assert violations['Неверный шрифт']
@@ -0,0 +1,77 @@
+import os
+import io
+import numpy as np
+import pandas as pd
+import pytest
+from config import GOST_PROFILES_DIR
+from utils.gost_profiles import get_profile, load_profile, compile_profile
+from utils.large_dataset import ingest_csv, list_stores, dataset_hash, cache_dir_for, cache_subdir, DatasetStore
+
+DATASET = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'default_dataset.csv')
+
+
+def test_ingest_into_existing_cache_dir(tmp_path):
+    """Производные кеши (разбиение, индекс), созданные до загрузки, не мешают сохранить хранилище."""
+    content_hash = dataset_hash(pd.read_csv(DATASET))
+    splits_dir = cache_subdir(content_hash, 'splits', str(tmp_path))
+    os.makedirs(splits_dir)
+    np.savez(os.path.join(splits_dir, 'split.npz'), train_idx=np.arange(3))
+    # Индекс старой версии лежал прямо в директории датасета
+    with open(os.path.join(cache_dir_for(content_hash, str(tmp_path)), 'author_index.npz'), 'wb') as f:
+        f.write(b'old')
+
+    store = ingest_csv(DATASET, 'default', cache_dir=str(tmp_path), chunk_rows=300)
+
+    assert store.store_dir == cache_dir_for(content_hash, str(tmp_path))
+    assert store.n_rows == 1000
+    assert os.path.exists(os.path.join(splits_dir, 'split.npz'))
+    assert os.listdir(tmp_path) == [os.path.basename(store.store_dir)]
+    assert [s.store_dir for s in list_stores(str(tmp_path))] == [store.store_dir]
+    assert len(pd.concat(store.iter_chunks())) == 1000
+
+
+def test_repeated_ingest_reuses_store(tmp_path):
+    first = ingest_csv(DATASET, 'default', cache_dir=str(tmp_path))
+    second = ingest_csv(DATASET, 'default', cache_dir=str(tmp_path))
+    assert first.store_dir == second.store_dir
+    assert os.listdir(tmp_path) == [os.path.basename(first.store_dir)]
+
+
+def test_failed_ingest_removes_temp_dir(tmp_path):
+    broken = io.StringIO('a,b\n1,2\n1,2,3,4\n')
+    with pytest.raises(Exception):
+        ingest_csv(broken, 'broken', cache_dir=str(tmp_path))
+    assert os.listdir(tmp_path) == []
+
+
+def test_concurrent_ingests_do_not_share_temp_dir(tmp_path):
+    """Сессии Streamlit загружают файлы одновременно в одном процессе."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    df = pd.read_csv(DATASET)
+    sources = [df.iloc[:600].to_csv(index=False), df.iloc[400:].to_csv(index=False)]
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        stores = list(pool.map(lambda text: ingest_csv(io.StringIO(text), 'part', cache_dir=str(tmp_path),
+                                                       chunk_rows=50), sources))
+
+    assert [store.n_rows for store in stores] == [600, 600]
+    for store, expected in zip(stores, (df.iloc[:600], df.iloc[400:])):
+        assert dataset_hash(pd.concat(store.iter_chunks())) == dataset_hash(expected.reset_index(drop=True))
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(store.store_dir) for store in stores)
+
+
+def test_error_counts_follow_profile_content(tmp_path):
+    df = pd.read_csv(DATASET)
+    non_compliant = df[df['Соответствует ГОСТ'] == 0]
+    store = ingest_csv(DATASET, 'default', cache_dir=str(tmp_path), chunk_rows=300)
+    profile = get_profile('gost_7_32')
+    assert store.error_counts(profile) == profile.error_counts(non_compliant)
+
+    # Тот же профиль с другим порогом - счетчики пересчитываются по частям и сохраняются
+    edited = load_profile(os.path.join(GOST_PROFILES_DIR, 'gost_7_32.json'))
+    edited['rules'] = [dict(rule, tolerance=1.0) if rule['type'] == 'numeric' else rule for rule in edited['rules']]
+    edited = compile_profile(edited)
+    assert edited.name == profile.name and edited.key != profile.key
+    assert store.error_counts(edited) == edited.error_counts(non_compliant)
+    assert store.error_counts(edited) != store.error_counts(profile)
+    assert DatasetStore(store.store_dir).stats.has_violations(edited)
@@ -0,0 +1,61 @@
+import os
+import functools
+import numpy as np
+import pandas as pd
+import pytest
+from models import splits, model_utils
+from models.splits import load_or_create_split, split_path
+from models.model_utils import training_manifest, is_model_current, train_and_save_model
+from utils.large_dataset import cache_subdir, dataset_hash
+
+DATASET = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'default_dataset.csv')
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    """Кеш разбиений и директория модели во временной папке, быстрый бэкенд."""
+    monkeypatch.setattr(splits, 'cache_subdir', functools.partial(cache_subdir, cache_dir=str(tmp_path / 'cache')))
+    monkeypatch.setattr(model_utils, 'MODEL_DIR', str(tmp_path / 'model'))
+    monkeypatch.setattr(model_utils, 'MODEL_BACKEND', 'logreg')
+    return tmp_path
+
+
+def test_split_is_disjoint_and_stratified(cache):
+    df = pd.read_csv(DATASET)
+    train_idx, test_idx = load_or_create_split(df, test_size=0.2)
+    assert len(np.intersect1d(train_idx, test_idx)) == 0
+    assert sorted(np.concatenate([train_idx, test_idx])) == list(range(len(df)))
+    target = df['Соответствует ГОСТ'].to_numpy()
+    assert abs(target[train_idx].mean() - target[test_idx].mean()) < 0.01
+
+
+def test_cached_split_is_reused_for_same_hash(cache):
+    df = pd.read_csv(DATASET)
+    content_hash = dataset_hash(df)
+    load_or_create_split(df, content_hash=content_hash)
+    # Подменяем сохраненные индексы: повторный вызов должен прочитать их из файла, а не пересчитать
+    path = split_path(content_hash)
+    np.savez(path, train_idx=np.arange(10, len(df)), test_idx=np.arange(10), n_rows=len(df))
+    train_idx, test_idx = load_or_create_split(df, content_hash=content_hash)
+    assert list(test_idx) == list(range(10))
+
+    # Другое число строк при том же хеше - разбиение считается заново
+    train_idx, test_idx = load_or_create_split(df.head(500), content_hash=content_hash)
+    assert len(train_idx) + len(test_idx) == 500
+    assert len(test_idx) != 10
+
+
+def test_manifest_detects_changed_data_and_backend(cache, monkeypatch):
+    df = pd.read_csv(DATASET)
+    assert not is_model_current(df)
+    train_and_save_model(df)
+    assert is_model_current(df)
+    assert is_model_current(df, content_hash=dataset_hash(df))
+
+    changed = df.copy()
+    changed.loc[0, 'Размер шрифта'] += 1
+    assert training_manifest(changed)['dataset_hash'] != training_manifest(df)['dataset_hash']
+    assert not is_model_current(changed)
+
+    monkeypatch.setattr(model_utils, 'MODEL_BACKEND', 'gbt')
+    assert not is_model_current(df)
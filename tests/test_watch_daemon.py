@@ -0,0 +1,100 @@
+import os
+import json
+import shutil
+import functools
+import pandas as pd
+import pytest
+import watch_daemon
+from utils import drift
+from config import ATTRIBUTION_TOP_K
+from watch_daemon import ResultsStore, WatchPipeline, file_hash
+
+DATASET = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'default_dataset.csv')
+
+
+@pytest.fixture
+def folder(tmp_path, monkeypatch):
+    """Папка наблюдения, база результатов и состояние мониторинга дрейфа во временной директории."""
+    monkeypatch.setattr(watch_daemon, 'monitor_path', functools.partial(drift.monitor_path, drift_dir=str(tmp_path)))
+    monkeypatch.setattr(watch_daemon, 'load_monitor', functools.partial(drift.load_monitor, drift_dir=str(tmp_path)))
+    watch_dir = tmp_path / 'incoming'
+    watch_dir.mkdir()
+    pd.read_csv(DATASET).head(20).to_csv(watch_dir / 'works.csv', index=False)
+    return watch_dir
+
+
+def statuses(store):
+    return dict(store.conn.execute("SELECT path, status FROM files").fetchall())
+
+
+def result_count(store):
+    return store.conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+def test_same_content_is_queued_once(folder, tmp_path):
+    shutil.copy(folder / 'works.csv', folder / 'works_copy.csv')
+    pipeline = WatchPipeline(str(folder), ResultsStore(str(tmp_path / 'results.sqlite3')))
+    pipeline.scan()  # первый опрос: размер файлов еще не подтвержден
+    assert pipeline.file_queue.qsize() == 0
+    pipeline.scan()
+    pipeline.scan()
+    assert pipeline.file_queue.qsize() == 1
+    assert list(statuses(pipeline.store).values()) == ['queued']
+
+
+def test_interrupted_file_is_resumed(folder, tmp_path):
+    path = str(folder / 'works.csv')
+    store = ResultsStore(str(tmp_path / 'results.sqlite3'))
+    store.enqueue(file_hash(path), path)
+    store.mark(file_hash(path), 'processing')
+    store.save_results([(file_hash(path), 99, 'частичный', '', 0.5, '', '[]', '[]')])
+    store.conn.close()
+
+    # Новый процесс с той же базой
+    store = ResultsStore(str(tmp_path / 'results.sqlite3'))
+    WatchPipeline(str(folder), store).run(once=True)
+    assert statuses(store) == {path: 'done'}
+    assert result_count(store) == 20
+    contributors = [json.loads(value) for value, in store.conn.execute("SELECT top_contributors FROM results")]
+    assert all(len(top) == ATTRIBUTION_TOP_K for top in contributors)
+
+    # Повторный запуск не проверяет файл заново
+    WatchPipeline(str(folder), store).run(once=True)
+    assert result_count(store) == 20
+
+
+def test_file_is_retried_once_model_is_available(folder, tmp_path, monkeypatch):
+    path = str(folder / 'works.csv')
+    store = ResultsStore(str(tmp_path / 'results.sqlite3'))
+    with monkeypatch.context() as patch:
+        patch.setattr(watch_daemon, 'load_artifacts', lambda: None)
+        WatchPipeline(str(folder), store).run(once=True)
+    assert statuses(store) == {path: 'retry'}
+    assert result_count(store) == 0
+
+    WatchPipeline(str(folder), store).run(once=True)
+    assert statuses(store) == {path: 'done'}
+    assert result_count(store) == 20
+
+
+def test_locked_file_is_retried_and_broken_file_is_not(folder, tmp_path, monkeypatch):
+    (folder / 'broken.docx').write_bytes(b'not a docx')
+    store = ResultsStore(str(tmp_path / 'results.sqlite3'))
+
+    original = WatchPipeline._extract
+
+    def locked(self, path):
+        if path.endswith('.csv'):
+            raise PermissionError('файл занят')
+        return original(self, path)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(WatchPipeline, '_extract', locked)
+        WatchPipeline(str(folder), store).run(once=True)
+    assert statuses(store) == {str(folder / 'works.csv'): 'retry', str(folder / 'broken.docx'): 'error'}
+
+    # Повторное появление файла с тем же содержимым ставит отложенный файл в очередь
+    assert store.enqueue(file_hash(str(folder / 'works.csv')), str(folder / 'works.csv'))
+    assert not store.enqueue(file_hash(str(folder / 'broken.docx')), str(folder / 'broken.docx'))
+    WatchPipeline(str(folder), store).run(once=True)
+    assert statuses(store) == {str(folder / 'works.csv'): 'done', str(folder / 'broken.docx'): 'error'}
@@ -0,0 +1,179 @@
+import os
+import re
+import numpy as np
+import pandas as pd
+from typing import Iterable, List, Tuple
+from config import AUTHOR_INDEX_CANDIDATES
+
+INDEX_NAME = 'author_index.npz'
+INDEX_SUBDIR = 'author_index'  # поддиректория в кеше датасета
+
+
+def normalize_name(name) -> str:
+    """Приводит ФИО к нижнему регистру, заменяет ё на е и убирает знаки препинания."""
+    name = str(name).lower().replace('ё', 'е')
+    return ' '.join(re.findall(r'[^\W\d_]+', name))
+
+
+def token_trigrams(token) -> set:
+    """Триграммы слова с отступами по краям (как в pg_trgm): 'ан' -> {'  а', ' ан', 'ан '}."""
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _token_similarity(query_token, author_token) -> float:
+    """
+    Сходство двух слов ФИО:
+    - инициал (одна буква) совпадает с любым словом на ту же букву
+    - иначе коэффициент Дайса по триграммам (устойчив к опечаткам)
+    """
+    if len(query_token) == 1 or len(author_token) == 1:
+        return 1.0 if query_token[0] == author_token[0] else 0.0
+    a, b = token_trigrams(query_token), token_trigrams(author_token)
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+def name_similarity(query_tokens, author_tokens) -> float:
+    """
+    Сходство ФИО без учета порядка слов: каждому слову запроса подбирается
+    лучшее еще не занятое слово автора. Вклад слова пропорционален его длине,
+    поэтому совпадение инициалов не перевешивает несовпадение фамилии.
+    Учитывается и доля покрытых слов автора, чтобы 'Иванов Иван' было ближе
+    к 'Иванов Иван Иванович', чем к 'Иванов Петр'.
+    """
+    if not query_tokens or not author_tokens:
+        return 0.0
+    free = list(author_tokens)
+    total, weight = 0.0, 0
+    for token in sorted(query_tokens, key=len, reverse=True):  # сначала полные слова, потом инициалы
+        weight += len(token)
+        if not free:
+            continue
+        scores = [_token_similarity(token, candidate) for candidate in free]
+        best = int(np.argmax(scores))
+        total += scores[best] * len(token)
+        if scores[best] > 0:
+            free.pop(best)
+    coverage = 1 - len(free) / len(author_tokens)
+    return 0.8 * total / weight + 0.2 * coverage
+
+
+class AuthorIndex:
+    """
+    Триграммный индекс авторов для нечеткого поиска:
+    - строится один раз по уникальным нормализованным ФИО датасета
+    - кандидаты отбираются по числу общих редких триграмм запроса
+    - лучшие кандидаты переранжируются с учетом перестановки слов, инициалов и опечаток
+    Хранит для каждого автора номера его строк в датасете.
+    """
+
+    def __init__(self, names, trigrams, post_indptr, post_authors, trigram_counts, row_indptr, row_ids):
+        self.names = names  # отображаемое ФИО каждого автора
+        self.trigrams = trigrams
+        self.post_indptr = post_indptr  # триграмма -> авторы (CSR)
+        self.post_authors = post_authors
+        self.trigram_counts = trigram_counts  # число триграмм у автора
+        self.row_indptr = row_indptr  # автор -> строки датасета (CSR)
+        self.row_ids = row_ids
+        self._trigram_ids = {trigram: i for i, trigram in enumerate(trigrams)}
+
+    @classmethod
+    def build(cls, authors: Iterable[pd.Series]) -> 'AuthorIndex':
+        """
+        Строит индекс по колонке 'Автор'. Принимает одну Series или последовательность частей
+        (например, DatasetStore.iter_chunks), номера строк берутся из индекса частей.
+        """
+        if isinstance(authors, pd.Series):
+            authors = [authors]
+        parts = [part.fillna('').astype(str) for part in authors]
+        raw = pd.concat(parts) if parts else pd.Series([], dtype=str)
+        normalized = raw.map(normalize_name)
+        codes, uniques = pd.factorize(normalized)
+        # Для отображения берется первое написание каждого автора
+        first_positions = pd.Series(np.arange(len(codes))).groupby(codes).first().to_numpy()
+        names = raw.to_numpy()[first_positions].astype(str)
+
+        pairs_author, pairs_trigram, trigram_counts = [], [], np.zeros(len(uniques), dtype=np.int32)
+        trigram_ids = {}
+        for author_id, name in enumerate(uniques):
+            grams = set().union(*(token_trigrams(token) for token in name.split() if len(token) > 1)) \
+                if name else set()
+            trigram_counts[author_id] = len(grams)
+            for gram in grams:
+                pairs_author.append(author_id)
+                pairs_trigram.append(trigram_ids.setdefault(gram, len(trigram_ids)))
+
+        pairs_author = np.asarray(pairs_author, dtype=np.int32)
+        pairs_trigram = np.asarray(pairs_trigram, dtype=np.int32)
+        order = np.argsort(pairs_trigram, kind='stable')
+        post_indptr = np.concatenate([[0], np.cumsum(np.bincount(pairs_trigram, minlength=len(trigram_ids)))])
+
+        row_positions = raw.index.to_numpy()
+        row_order = np.argsort(codes, kind='stable')
+        row_indptr = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(uniques)))])
+
+        trigrams = np.array(sorted(trigram_ids, key=trigram_ids.get), dtype=str)
+        return cls(names, trigrams, post_indptr, pairs_author[order], trigram_counts,
+                   row_indptr, row_positions[row_order])
+
+    def search(self, query, k=10, candidates=AUTHOR_INDEX_CANDIDATES) -> List[Tuple[str, float, int]]:
+        """
+        Ищет авторов, похожих на запрос.
+        Возвращает до k результатов (ФИО, сходство 0..1, число документов) по убыванию сходства.
+        """
+        query_tokens = normalize_name(query).split()
+        grams = set().union(*(token_trigrams(t) for t in query_tokens if len(t) > 1)) if query_tokens else set()
+        ids = [self._trigram_ids[g] for g in grams if g in self._trigram_ids]
+        if not ids:
+            return []
+
+        # Кандидаты отбираются по более редкой половине триграмм запроса: частые триграммы ('ов ', 'на ')
+        # почти не отличают авторов, но дают самые длинные списки. Точное сходство считается при переранжировании
+        lengths = self.post_indptr[np.array(ids) + 1] - self.post_indptr[ids]
+        rare = np.array(ids)[np.argsort(lengths, kind='stable')[:max(6, len(ids) // 2)]]
+        postings = np.concatenate([self.post_authors[self.post_indptr[i]:self.post_indptr[i + 1]] for i in rare])
+        authors, shared = np.unique(postings, return_counts=True)
+        dice = 2 * shared / (len(rare) + self.trigram_counts[authors])
+        top = authors[np.argsort(-dice, kind='stable')[:candidates]]
+
+        scored = [(name_similarity(query_tokens, normalize_name(self.names[a]).split()), a) for a in top]
+        scored.sort(key=lambda x: x[0], reverse=True)
+        return [(self.names[a], score, int(self.row_indptr[a + 1] - self.row_indptr[a]))
+                for score, a in scored[:k] if score > 0]
+
+    def rows(self, name) -> np.ndarray:
+        """Номера строк датасета для автора (по отображаемому ФИО из search)."""
+        matches = np.flatnonzero(self.names == name)
+        if len(matches) == 0:
+            return np.empty(0, dtype=np.int64)
+        author_id = matches[0]
+        return self.row_ids[self.row_indptr[author_id]:self.row_indptr[author_id + 1]]
+
+    def save(self, directory):
+        """Сохраняет индекс в directory/author_index.npz (рядом с кешем датасета)."""
+        os.makedirs(directory, exist_ok=True)
+        np.savez(os.path.join(directory, INDEX_NAME), names=self.names, trigrams=self.trigrams,
+                 post_indptr=self.post_indptr, post_authors=self.post_authors,
+                 trigram_counts=self.trigram_counts, row_indptr=self.row_indptr, row_ids=self.row_ids)
+
+    @classmethod
+    def load(cls, directory):
+        """Загружает индекс, сохраненный методом save. Возвращает None, если его нет."""
+        path = os.path.join(directory, INDEX_NAME)
+        if not os.path.exists(path):
+            return None
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['names'], data['trigrams'], data['post_indptr'], data['post_authors'],
+                       data['trigram_counts'], data['row_indptr'], data['row_ids'])
+
+
+def load_or_build_index(directory, authors) -> AuthorIndex:
+    """
+    Загружает индекс из кеша датасета или строит и сохраняет его.
+    authors - Series или функция, возвращающая части колонки 'Автор' (вызывается только при построении).
+    """
+    index = AuthorIndex.load(directory)
+    if index is None:
+        index = AuthorIndex.build(authors() if callable(authors) else authors)
+        index.save(directory)
+    return index
@@ -0,0 +1,193 @@
+import re
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from config import DEDUP_NUM_PERM, DEDUP_BANDS, DEDUP_SHINGLE_SIZE, DEDUP_SIMILARITY, RANDOM_SEED
+from utils.author_index import normalize_name
+
+TITLE_COLUMN = 'Название документа'
+AUTHOR_COLUMN = 'Автор'
+DATE_COLUMN = 'Дата создания'
+_EMPTY = np.iinfo(np.uint32).max  # значение сигнатуры у текстов без шинглов
+
+
+def normalize_text(text) -> str:
+    """Нижний регистр, ё -> е, только слова и числа через один пробел."""
+    return ' '.join(re.findall(r'\w+', str(text).lower().replace('ё', 'е')))
+
+
+def normalize_records(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Приводит строки датасета к виду, в котором копии одной работы совпадают побайтно:
+    - название: normalize_text
+    - автор: нормализованное ФИО со словами по алфавиту (порядок слов не важен)
+    - числа округляются до сотых, прочие значения - строка в нижнем регистре без лишних пробелов
+    """
+    normalized = pd.DataFrame(index=df.index)
+    for col in df.columns:
+        values = df[col]
+        if col == TITLE_COLUMN:
+            normalized[col] = values.map(normalize_text)
+        elif col == AUTHOR_COLUMN:
+            normalized[col] = values.map(lambda name: ' '.join(sorted(normalize_name(name).split())))
+        elif pd.api.types.is_bool_dtype(values):
+            normalized[col] = values.astype(int)
+        elif pd.api.types.is_numeric_dtype(values):
+            normalized[col] = values.round(2)
+        else:
+            normalized[col] = values.astype(str).str.strip().str.lower().str.replace(r'\s+', ' ', regex=True)
+    return normalized
+
+
+def exact_keys(normalized: pd.DataFrame) -> np.ndarray:
+    """64-битный хеш каждой нормализованной строки (одинаковый у точных копий)."""
+    return pd.util.hash_pandas_object(normalized, index=False).to_numpy()
+
+
+def _shingle_hashes(texts, shingle_size):
+    """
+    Хеши символьных шинглов всех текстов за один векторный проход.
+    Тексты склеиваются в один массив кодов символов, шинглы на стыках отбрасываются.
+    Возвращает (хеши шинглов, номер текста для каждого шингла).
+    """
+    lengths = np.fromiter((len(t) for t in texts), dtype=np.int64, count=len(texts))
+    codes = np.frombuffer(''.join(texts).encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+    n_shingles = np.maximum(lengths - shingle_size + 1, 0)
+    if n_shingles.sum() == 0:
+        return np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int64)
+
+    # Полиномиальный хеш окна: переполнение uint64 допустимо
+    hashes = np.zeros(len(codes) - shingle_size + 1, dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for offset in range(shingle_size):
+            hashes = hashes * np.uint64(1000003) + codes[offset:len(codes) - shingle_size + 1 + offset]
+
+    text_ids = np.repeat(np.arange(len(texts)), n_shingles)
+    text_starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    within = np.arange(len(text_ids)) - np.repeat(np.cumsum(n_shingles) - n_shingles, n_shingles)
+    return hashes[text_starts[text_ids] + within], text_ids
+
+
+def minhash_signatures(texts, num_perm=DEDUP_NUM_PERM, shingle_size=DEDUP_SHINGLE_SIZE,
+                       seed=RANDOM_SEED, block_texts=2000) -> np.ndarray:
+    """
+    Сигнатуры MinHash [число текстов, num_perm] по множествам символьных шинглов.
+    Доля совпавших позиций двух сигнатур - оценка сходства Жаккара текстов.
+    Тексты короче шингла получают сигнатуру из _EMPTY (не похожи ни на что).
+    Тексты обрабатываются блоками, поэтому память на промежуточные хеши не зависит от размера датасета.
+    """
+    # Семейство хешей multiply-shift: старшие 32 бита (a * x + b) mod 2^64 при нечетном a
+    rng = np.random.default_rng(seed)
+    a = (rng.integers(0, 1 << 63, num_perm, dtype=np.uint64) << np.uint64(1) | np.uint64(1))[:, None]
+    b = rng.integers(0, 1 << 63, num_perm, dtype=np.uint64)[:, None]
+
+    # Одинаковые тексты (типовые темы работ) хешируются один раз
+    inverse, texts = pd.factorize(pd.Series(list(texts), dtype=object).astype(str))
+    signatures = np.full((len(texts), num_perm), _EMPTY, dtype=np.uint32)
+    for start in range(0, len(texts), block_texts):
+        block = texts[start:start + block_texts].tolist()
+        hashes, text_ids = _shingle_hashes(block, shingle_size)
+        if len(hashes) == 0:
+            continue
+        with np.errstate(over='ignore'):
+            values = ((a * hashes + b) >> np.uint64(32)).astype(np.uint32)  # [num_perm, шинглы]
+        starts = np.flatnonzero(np.r_[True, text_ids[1:] != text_ids[:-1]])
+        signatures[start + text_ids[starts]] = np.minimum.reduceat(values, starts, axis=1).T
+    return signatures[inverse]
+
+
+def lsh_pairs(signatures, groups, bands=DEDUP_BANDS, threshold=DEDUP_SIMILARITY):
+    """
+    Пары почти-дубликатов через LSH: строки попадают в одну корзину, если у них общий
+    ключ группы (нормализованный автор) и совпадает хотя бы одна полоса сигнатуры.
+    Каждая строка сравнивается только с первой строкой своей корзины, поэтому работа линейна.
+    Возвращает массивы (i, j) пар с оценкой сходства не ниже threshold.
+    """
+    n_rows, num_perm = signatures.shape
+    rows_per_band = num_perm // bands
+    valid = signatures[:, 0] != _EMPTY
+    positions = np.arange(n_rows)
+    left, right = [], []
+    for band in range(bands):
+        band_df = pd.DataFrame(signatures[:, band * rows_per_band:(band + 1) * rows_per_band])
+        band_df['group'] = groups
+        keys = pd.util.hash_pandas_object(band_df, index=False).to_numpy()
+        first = pd.Series(positions).groupby(keys).transform('first').to_numpy()
+        candidates = np.flatnonzero((first != positions) & valid)
+        similarity = (signatures[candidates] == signatures[first[candidates]]).mean(axis=1)
+        matched = candidates[similarity >= threshold]
+        left.append(matched)
+        right.append(first[matched])
+    return np.concatenate(left), np.concatenate(right)
+
+
+def find_duplicates(df: pd.DataFrame, threshold=DEDUP_SIMILARITY) -> pd.Series:
+    """
+    Находит дубликаты и повторные сдачи работ:
+    1. точные копии - одинаковые нормализованные строки (по хешу)
+    2. почти-дубликаты - тот же автор и похожее название (MinHash/LSH),
+       считаются только по одной строке из каждой группы точных копий
+    Связанные пары объединяются в кластеры (компоненты связности).
+    Возвращает Series с номером кластера для каждой строки (индекс как у df).
+    """
+    if df.empty:
+        return pd.Series([], index=df.index, dtype=np.int64, name='cluster_id')
+    normalized = normalize_records(df)
+    exact_codes, _ = pd.factorize(exact_keys(normalized))
+    representatives = pd.Series(np.arange(len(df))).groupby(exact_codes).first().to_numpy()
+
+    left, right = [np.arange(len(df))], [representatives[exact_codes]]
+    if TITLE_COLUMN in normalized.columns:
+        unique_part = normalized.iloc[representatives]
+        groups = unique_part[AUTHOR_COLUMN].to_numpy() if AUTHOR_COLUMN in normalized.columns else None
+        signatures = minhash_signatures(unique_part[TITLE_COLUMN].tolist())
+        pair_left, pair_right = lsh_pairs(signatures, groups, threshold=threshold)
+        left.append(representatives[pair_left])
+        right.append(representatives[pair_right])
+
+    left, right = np.concatenate(left), np.concatenate(right)
+    graph = coo_matrix((np.ones(len(left), dtype=np.int8), (left, right)), shape=(len(df), len(df)))
+    _, labels = connected_components(graph, directed=False)
+    # Нумерация кластеров в порядке первого появления в датасете
+    cluster_ids, _ = pd.factorize(labels)
+    return pd.Series(cluster_ids, index=df.index, name='cluster_id')
+
+
+def deduplicate(df: pd.DataFrame, cluster_ids=None) -> pd.DataFrame:
+    """
+    Оставляет по одной строке из каждого кластера - самую позднюю по дате создания
+    (последнюю сдачу работы), порядок строк сохраняется.
+    """
+    if cluster_ids is None:
+        cluster_ids = find_duplicates(df)
+    if DATE_COLUMN in df.columns:
+        dates = pd.to_datetime(df[DATE_COLUMN], format='%d.%m.%Y', errors='coerce')
+    else:
+        dates = pd.Series(pd.NaT, index=df.index)
+    order = pd.DataFrame({'cluster': cluster_ids.to_numpy(), 'date': dates.to_numpy()}, index=df.index)
+    keep = order.sort_values('date', ascending=False, kind='stable', na_position='last') \
+        .drop_duplicates('cluster').index
+    return df.loc[df.index.isin(keep)]
+
+
+def duplicate_summary(cluster_ids: pd.Series) -> dict:
+    """Сводка: строк, уникальных работ (кластеров), лишних копий и размер крупнейшего кластера."""
+    sizes = cluster_ids.value_counts()
+    return {
+        'rows': int(len(cluster_ids)),
+        'clusters': int(len(sizes)),
+        'duplicates': int(len(cluster_ids) - len(sizes)),
+        'largest_cluster': int(sizes.max()) if len(sizes) else 0
+    }
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+
+    for path in sys.argv[1:] or ['data/default_dataset.csv']:
+        data = pd.read_csv(path)
+        started = time.perf_counter()
+        clusters = find_duplicates(data)
+        print(f"{path}: {duplicate_summary(clusters)}, {time.perf_counter() - started:.2f} с")
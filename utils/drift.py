@@ -0,0 +1,304 @@
+import os
+import json
+import glob
+import bisect
+import hashlib
+import numpy as np
+import pandas as pd
+from typing import List
+from config import DRIFT_DIR, DRIFT_BINS, DRIFT_PSI_WARN, DRIFT_PSI_ALERT, DRIFT_MAX_UNSEEN
+
+REFERENCE_NAME = 'drift_reference.json'
+CATEGORICAL_FEATURES = ('Шрифт',)
+OTHER_CATEGORY = '<прочие>'
+MIN_DOCS_FOR_STATUS = 30  # меньше документов - статистики слишком шумные для вывода о дрейфе
+
+
+def _bin_edges(values, bins):
+    """
+    Внутренние границы интервалов по квантилям обучающей выборки.
+    Для признаков с малым числом значений (булевы, размер шрифта) - середины между значениями,
+    чтобы каждое значение попало в свой интервал.
+    """
+    unique = np.unique(values)
+    if len(unique) <= bins:
+        return ((unique[1:] + unique[:-1]) / 2).tolist()
+    return np.unique(np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1])).tolist()
+
+
+def psi(expected, actual, eps=1e-4):
+    """Population Stability Index между двумя гистограммами с одинаковыми интервалами."""
+    expected = np.asarray(expected, dtype=float)
+    actual = np.asarray(actual, dtype=float)
+    if expected.sum() == 0 or actual.sum() == 0:
+        return 0.0
+    p = np.clip(expected / expected.sum(), eps, None)
+    q = np.clip(actual / actual.sum(), eps, None)
+    return float(np.sum((q - p) * np.log(q / p)))
+
+
+def ks_statistic(expected, actual):
+    """
+    Статистика Колмогорова-Смирнова по гистограммам: максимум разности накопленных долей
+    на границах интервалов (нижняя оценка точного значения, точность задается DRIFT_BINS).
+    """
+    expected = np.asarray(expected, dtype=float)
+    actual = np.asarray(actual, dtype=float)
+    if expected.sum() == 0 or actual.sum() == 0:
+        return 0.0
+    return float(np.max(np.abs(np.cumsum(expected) / expected.sum() - np.cumsum(actual) / actual.sum())))
+
+
+class DriftReference:
+    """
+    Снимок распределений обучающей выборки, с которым сравниваются новые документы:
+    - числовые признаки: границы интервалов и частоты
+    - категориальные (шрифт): известные категории и их частоты
+    Сохраняется вместе с моделью (drift_reference.json).
+    """
+
+    def __init__(self, numeric, categorical, n_rows):
+        self.numeric = numeric  # признак -> {'edges': [...], 'counts': [...]}
+        self.categorical = categorical  # признак -> {'categories': [...], 'counts': [...]}
+        self.n_rows = n_rows
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame, categorical=CATEGORICAL_FEATURES, bins=DRIFT_BINS):
+        """Строит снимок по признакам обучающей выборки (до масштабирования, шрифт - строкой)."""
+        numeric, categories = {}, {}
+        for col in frame.columns:
+            values = frame[col].dropna()
+            if col in categorical:
+                counts = values.astype(str).value_counts().sort_index()
+                categories[col] = {'categories': counts.index.tolist(), 'counts': counts.astype(int).tolist()}
+            else:
+                values = values.astype(float).to_numpy()
+                edges = _bin_edges(values, bins)
+                counts = np.bincount(np.searchsorted(edges, values, side='right'), minlength=len(edges) + 1)
+                numeric[col] = {'edges': edges, 'counts': counts.astype(int).tolist()}
+        return cls(numeric, categories, int(len(frame)))
+
+    def to_dict(self):
+        return {'numeric': self.numeric, 'categorical': self.categorical, 'n_rows': self.n_rows}
+
+    def fingerprint(self):
+        """Хеш снимка: состояние мониторов, накопленное для другой модели, не смешивается с текущим."""
+        return hashlib.sha256(json.dumps(self.to_dict(), sort_keys=True).encode('utf-8')).hexdigest()
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path):
+        """Загружает снимок. Возвращает None, если файла нет (модель обучена до появления мониторинга)."""
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data['numeric'], data['categorical'], data['n_rows'])
+
+
+class DriftMonitor:
+    """
+    Потоковый монитор входных данных с постоянной памятью:
+    - гистограмма каждого числового признака на интервалах снимка обучающей выборки
+    - частоты известных категорий и счетчики новых (не более DRIFT_MAX_UNSEEN поименно)
+    - число пропущенных значений
+    Обновление - O(1) на документ (поиск интервала среди DRIFT_BINS границ),
+    отчет (PSI, KS) строится по счетчикам без повторного просмотра документов.
+    """
+
+    def __init__(self, reference: DriftReference, state=None):
+        self.reference = reference
+        self._category_index = {col: {c: i for i, c in enumerate(spec['categories'])}
+                                for col, spec in reference.categorical.items()}
+        state = state or {}
+        self.n_docs = state.get('n_docs', 0)
+        self.counts = {col: np.asarray(state.get('counts', {}).get(col, np.zeros(len(spec['edges']) + 1)),
+                                       dtype=np.int64)
+                       for col, spec in reference.numeric.items()}
+        self.category_counts = {col: np.asarray(state.get('category_counts', {}).get(
+                                    col, np.zeros(len(spec['categories']))), dtype=np.int64)
+                                for col, spec in reference.categorical.items()}
+        self.unseen = {col: dict(state.get('unseen', {}).get(col, {})) for col in reference.categorical}
+        self.missing = {col: int(state.get('missing', {}).get(col, 0))
+                        for col in list(reference.numeric) + list(reference.categorical)}
+
+    def _count_unseen(self, col, value, count=1):
+        unseen = self.unseen[col]
+        if value not in unseen and len(unseen) >= DRIFT_MAX_UNSEEN:
+            value = OTHER_CATEGORY
+        unseen[value] = unseen.get(value, 0) + count
+
+    def update(self, record: dict):
+        """Учитывает один документ (словарь признак -> значение, как в predict_compliance)."""
+        self.n_docs += 1
+        for col, spec in self.reference.numeric.items():
+            value = record.get(col)
+            if value is None or pd.isna(value):
+                self.missing[col] += 1
+            else:
+                self.counts[col][bisect.bisect_right(spec['edges'], float(value))] += 1
+        for col, index in self._category_index.items():
+            value = record.get(col)
+            if value is None or pd.isna(value):
+                self.missing[col] += 1
+            elif str(value) in index:
+                self.category_counts[col][index[str(value)]] += 1
+            else:
+                self._count_unseen(col, str(value))
+
+    def update_batch(self, frame: pd.DataFrame):
+        """Учитывает пакет документов векторно (та же стоимость на документ, что и update)."""
+        self.n_docs += len(frame)
+        for col, spec in self.reference.numeric.items():
+            if col not in frame.columns:
+                self.missing[col] += len(frame)
+                continue
+            values = pd.to_numeric(frame[col], errors='coerce').to_numpy(dtype=float)
+            present = values[~np.isnan(values)]
+            self.missing[col] += int(len(values) - len(present))
+            self.counts[col] += np.bincount(np.searchsorted(spec['edges'], present, side='right'),
+                                            minlength=len(spec['edges']) + 1)
+        for col, index in self._category_index.items():
+            if col not in frame.columns:
+                self.missing[col] += len(frame)
+                continue
+            values = frame[col].dropna().astype(str)
+            self.missing[col] += int(len(frame) - len(values))
+            for value, count in values.value_counts().items():
+                if value in index:
+                    self.category_counts[col][index[value]] += int(count)
+                else:
+                    self._count_unseen(col, value, int(count))
+
+    def merge(self, other: 'DriftMonitor'):
+        """Добавляет счетчики другого монитора (например, демона и веб-интерфейса) к этому."""
+        self.n_docs += other.n_docs
+        for col in self.counts:
+            self.counts[col] += other.counts[col]
+        for col in self.category_counts:
+            self.category_counts[col] += other.category_counts[col]
+            for value, count in other.unseen[col].items():
+                self._count_unseen(col, value, count)
+        for col in self.missing:
+            self.missing[col] += other.missing[col]
+        return self
+
+    def _status(self, psi_value, unseen_count):
+        if self.n_docs < MIN_DOCS_FOR_STATUS:
+            return 'мало данных'
+        if psi_value >= DRIFT_PSI_ALERT:
+            return 'дрейф'
+        if psi_value >= DRIFT_PSI_WARN or unseen_count > 0:
+            return 'внимание'
+        return 'норма'
+
+    def report(self) -> List[dict]:
+        """
+        Отчет по признакам: PSI и KS относительно обучающей выборки, доля пропусков,
+        число документов с новыми категориями и статус (норма/внимание/дрейф).
+        Новые категории входят в PSI отдельным интервалом с нулевой частотой в обучении.
+        """
+        rows = []
+        for col, spec in self.reference.numeric.items():
+            psi_value = psi(spec['counts'], self.counts[col])
+            rows.append({'Признак': col, 'Документов': int(self.counts[col].sum()), 'PSI': psi_value,
+                         'KS': ks_statistic(spec['counts'], self.counts[col]),
+                         'Пропуски': self.missing[col] / max(self.n_docs, 1), 'Новые значения': 0,
+                         'Статус': self._status(psi_value, 0)})
+        for col, spec in self.reference.categorical.items():
+            unseen_count = sum(self.unseen[col].values())
+            expected = list(spec['counts']) + [0]
+            actual = list(self.category_counts[col]) + [unseen_count]
+            psi_value = psi(expected, actual)
+            rows.append({'Признак': col, 'Документов': int(sum(actual)), 'PSI': psi_value, 'KS': None,
+                         'Пропуски': self.missing[col] / max(self.n_docs, 1), 'Новые значения': unseen_count,
+                         'Статус': self._status(psi_value, unseen_count)})
+        rows.sort(key=lambda row: row['PSI'], reverse=True)
+        return rows
+
+    def unseen_categories(self):
+        """Новые категории по признакам с числом документов, по убыванию."""
+        return {col: sorted(values.items(), key=lambda x: x[1], reverse=True) for col, values in self.unseen.items()}
+
+    def to_dict(self):
+        return {
+            'reference': self.reference.fingerprint(),
+            'n_docs': self.n_docs,
+            'counts': {col: values.tolist() for col, values in self.counts.items()},
+            'category_counts': {col: values.tolist() for col, values in self.category_counts.items()},
+            'unseen': self.unseen,
+            'missing': self.missing
+        }
+
+    def save(self, path):
+        """Сохраняет счетчики (атомарно, файл небольшой и не растет с числом документов)."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+def monitor_path(source, drift_dir=DRIFT_DIR):
+    """Файл состояния монитора источника ('ui', 'daemon' и т.д.)."""
+    return os.path.join(drift_dir, f'{source}.json')
+
+
+def load_monitor(source, reference: DriftReference, drift_dir=DRIFT_DIR) -> DriftMonitor:
+    """
+    Загружает монитор источника. Если состояние накоплено для другого снимка
+    (модель переобучена), начинает с нуля.
+    """
+    path = monitor_path(source, drift_dir)
+    state = None
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            state = json.load(f)
+        if state.get('reference') != reference.fingerprint():
+            state = None
+    return DriftMonitor(reference, state)
+
+
+def combined_monitor(reference: DriftReference, drift_dir=DRIFT_DIR) -> DriftMonitor:
+    """Объединяет мониторы всех источников в один (для общего отчета)."""
+    combined = DriftMonitor(reference)
+    for path in sorted(glob.glob(os.path.join(drift_dir, '*.json'))):
+        source = os.path.splitext(os.path.basename(path))[0]
+        combined.merge(load_monitor(source, reference, drift_dir))
+    return combined
+
+
+if __name__ == '__main__':
+    import argparse
+    from models.model_utils import load_artifacts, preprocess_data, save_drift_reference
+    from models.splits import load_or_create_split
+
+    parser = argparse.ArgumentParser(description="Отчет о дрейфе входных данных относительно обучающей выборки")
+    parser.add_argument('--dir', default=DRIFT_DIR, help="Папка с состоянием мониторов")
+    parser.add_argument('--source', help="Отчет только по одному источнику (ui, daemon)")
+    parser.add_argument('--build-reference', metavar='CSV',
+                        help="Построить снимок для модели, обученной до появления мониторинга, по ее датасету")
+    args = parser.parse_args()
+
+    if args.build_reference:
+        data = pd.read_csv(args.build_reference)
+        X, _, label_encoder = preprocess_data(data)
+        train_idx, _ = load_or_create_split(data)
+        save_drift_reference(X.iloc[train_idx], label_encoder)
+        print(f"Снимок обучающей выборки сохранен ({len(train_idx)} строк)")
+
+    artifacts = load_artifacts()
+    reference = artifacts.drift_reference if artifacts is not None else None
+    if reference is None:
+        print("Ошибка: снимок обучающей выборки не найден, переобучите модель или используйте --build-reference")
+    else:
+        monitor = (load_monitor(args.source, reference, args.dir) if args.source
+                   else combined_monitor(reference, args.dir))
+        print(f"Документов: {monitor.n_docs}")
+        print(pd.DataFrame(monitor.report()).fillna("-").to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+        for col, values in monitor.unseen_categories().items():
+            if values:
+                print(f"Новые значения '{col}': " + ", ".join(f"{value} ({count})" for value, count in values[:10]))
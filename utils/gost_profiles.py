@@ -0,0 +1,214 @@
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Tuple
+from config import GOST_PROFILES_DIR, DEFAULT_GOST_PROFILE
+
+try:
+    import yaml
+except ImportError:  # YAML-профили необязательны, JSON поддерживается всегда
+    yaml = None
+
+# Скомпилированные профили, ключ - sha256 от содержимого профиля
+_COMPILED_CACHE = {}
+
+
+def load_profile(path):
+    """
+    Загружает профиль требований ГОСТ из файла JSON или YAML.
+    Возвращает словарь профиля или None при ошибке.
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            if path.endswith(('.yaml', '.yml')):
+                if yaml is None:
+                    print(f"Профиль {path} пропущен: для YAML нужен пакет PyYAML")
+                    return None
+                profile = yaml.safe_load(f)
+            else:
+                profile = json.load(f)
+        profile.setdefault('name', os.path.splitext(os.path.basename(path))[0])
+        return profile
+    except Exception as e:
+        print(f"Ошибка загрузки профиля {path}: {str(e)}")
+        return None
+
+
+def list_profiles(directory=GOST_PROFILES_DIR) -> Dict[str, dict]:
+    """
+    Возвращает все профили из директории в виде {идентификатор: профиль}.
+    Идентификатор - имя файла без расширения.
+    """
+    profiles = {}
+    if not os.path.isdir(directory):
+        return profiles
+    for file_name in sorted(os.listdir(directory)):
+        profile_id, ext = os.path.splitext(file_name)
+        if ext not in ('.json', '.yaml', '.yml'):
+            continue
+        profile = load_profile(os.path.join(directory, file_name))
+        if profile is not None:
+            profiles[profile_id] = profile
+    return profiles
+
+
+def profile_hash(profile: dict) -> str:
+    """Хеш содержимого профиля, не зависящий от порядка ключей."""
+    payload = json.dumps(profile, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _as_float_matrix(df: pd.DataFrame, columns: List[str]) -> np.ndarray:
+    """Собирает указанные колонки в матрицу float; отсутствующие колонки заполняются NaN."""
+    matrix = np.full((len(df), len(columns)), np.nan)
+    for j, col in enumerate(columns):
+        if col in df.columns:
+            values = df[col].replace({'True': 1, 'False': 0})
+            matrix[:, j] = pd.to_numeric(values, errors='coerce').to_numpy(dtype=float)
+    return matrix
+
+
+class CompiledProfile:
+    """
+    Профиль ГОСТ, скомпилированный в массивы для векторной проверки:
+    - числовые правила: эталоны и допуски (|x - эталон| > допуск)
+    - категориальные правила: ожидаемые значения (x != эталон)
+    - обязательные элементы: флаг должен быть истинным
+    Одна проверка пакета документов - по одному сравнению на тип правил.
+    """
+
+    def __init__(self, profile: dict, key: str):
+        self.key = key
+        self.name = profile.get('name', key[:8])
+        self.description = profile.get('description', '')
+
+        numeric, categorical, required = [], [], []
+        for rule in profile.get('rules', []):
+            rule = dict(rule)
+            rule.setdefault('label', rule['column'])
+            rule.setdefault('group', rule['label'])
+            rule.setdefault('message', rule['label'])
+            kind = rule.get('type', 'numeric')
+            if kind == 'numeric':
+                numeric.append(rule)
+            elif kind == 'equals':
+                categorical.append(rule)
+            elif kind == 'required':
+                required.append(rule)
+            else:
+                raise ValueError(f"Неизвестный тип правила '{kind}' в профиле {self.name}")
+
+        # Порядок правил в результатах: числовые, категориальные, обязательные
+        self.rules = numeric + categorical + required
+        self.labels = [rule['label'] for rule in self.rules]
+        self.groups = [rule['group'] for rule in self.rules]
+
+        self.numeric_columns = [rule['column'] for rule in numeric]
+        self.targets = np.array([float(rule['value']) for rule in numeric])
+        self.tolerances = np.array([float(rule.get('tolerance', 0.0)) for rule in numeric])
+        self.categorical_columns = [rule['column'] for rule in categorical]
+        self.categorical_values = np.array([rule['value'] for rule in categorical], dtype=object)
+        self.required_columns = [rule['column'] for rule in required]
+
+    def violations(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Матрица нарушений (документы x правила) для пакета документов."""
+        return evaluate_profiles(df, [self])[self.name]
+
+    def error_counts(self, df: pd.DataFrame, by_group=False) -> List[Tuple[str, int]]:
+        """
+        Считает число документов с каждым нарушением.
+        При by_group=True правила объединяются по полю 'group' (например, все поля).
+        Возвращает отсортированный по убыванию список (ошибка, количество) без нулевых.
+        """
+        violations = self.violations(df)
+        if by_group:
+            violations = violations.T.groupby(self.groups, sort=False).any().T
+        counts = [(label, int(count)) for label, count in violations.sum().items() if count > 0]
+        counts.sort(key=lambda x: x[1], reverse=True)
+        return counts
+
+    def recommendations(self, values: dict) -> List[str]:
+        """Формирует рекомендации по исправлению для одного документа."""
+        violated = self.violations(pd.DataFrame([values])).iloc[0]
+        messages = []
+        for rule, is_violated in zip(self.rules, violated):
+            if is_violated:
+                messages.append(rule['message'].format(expected=rule.get('value', ''),
+                                                       actual=values.get(rule['column'], '')))
+        return messages
+
+
+def compile_profile(profile: dict) -> CompiledProfile:
+    """
+    Компилирует профиль в CompiledProfile.
+    Результат кешируется по хешу содержимого, повторная компиляция не выполняется.
+    """
+    key = profile_hash(profile)
+    if key not in _COMPILED_CACHE:
+        _COMPILED_CACHE[key] = CompiledProfile(profile, key)
+    return _COMPILED_CACHE[key]
+
+
+def get_profile(profile_id=DEFAULT_GOST_PROFILE, directory=GOST_PROFILES_DIR) -> CompiledProfile:
+    """Загружает и компилирует профиль по идентификатору (имени файла)."""
+    for ext in ('.json', '.yaml', '.yml'):
+        path = os.path.join(directory, profile_id + ext)
+        if os.path.exists(path):
+            profile = load_profile(path)
+            if profile is not None:
+                return compile_profile(profile)
+    raise FileNotFoundError(f"Профиль ГОСТ '{profile_id}' не найден в {directory}")
+
+
+def evaluate_profiles(df: pd.DataFrame, profiles: List[CompiledProfile]) -> Dict[str, pd.DataFrame]:
+    """
+    Проверяет пакет документов сразу по нескольким профилям за один проход:
+    - колонки датасета читаются один раз
+    - эталоны и допуски всех профилей склеиваются в общие векторы
+    - на каждый тип правил выполняется одно векторное сравнение
+    Возвращает {имя профиля: DataFrame нарушений (bool)}.
+    """
+    numeric_cols = sorted({col for p in profiles for col in p.numeric_columns})
+    required_cols = sorted({col for p in profiles for col in p.required_columns})
+
+    # Числовые правила: |X[:, idx] - targets| > tolerances (отсутствующая колонка - не нарушение;
+    # пропуск в документе - нарушение, как и у категориальных правил: значение не определено)
+    numeric_matrix = _as_float_matrix(df, numeric_cols)
+    numeric_idx = np.array([numeric_cols.index(col) for p in profiles for col in p.numeric_columns], dtype=int)
+    numeric_present = np.array([col in df.columns for col in numeric_cols], dtype=bool)[numeric_idx]
+    targets = np.concatenate([p.targets for p in profiles]) if profiles else np.empty(0)
+    tolerances = np.concatenate([p.tolerances for p in profiles]) if profiles else np.empty(0)
+    numeric_values = numeric_matrix[:, numeric_idx]
+    with np.errstate(invalid='ignore'):
+        numeric_violations = ((np.abs(numeric_values - targets) > tolerances + 1e-9)
+                              | (np.isnan(numeric_values) & numeric_present))
+
+    # Категориальные правила: X[:, idx] != expected (отсутствующая колонка - не нарушение;
+    # пропуск в документе - нарушение: соответствие не подтверждено, например шрифт не определен)
+    categorical = [(col, value) for p in profiles for col, value in zip(p.categorical_columns, p.categorical_values)]
+    categorical_violations = np.zeros((len(df), len(categorical)), dtype=bool)
+    if categorical:
+        present = np.array([col in df.columns for col, _ in categorical])
+        cols = [col for col, _ in categorical if col in df.columns]
+        expected = np.array([value for col, value in categorical if col in df.columns], dtype=object)
+        if cols:
+            values = df[cols].to_numpy(dtype=object)
+            categorical_violations[:, present] = pd.isna(values) | (values != expected)
+
+    # Обязательные элементы: флаг равен 0 (NaN - колонки нет, не нарушение)
+    required_matrix = _as_float_matrix(df, required_cols)
+    required_idx = np.array([required_cols.index(col) for p in profiles for col in p.required_columns], dtype=int)
+    required_violations = required_matrix[:, required_idx] == 0
+
+    results = {}
+    num_pos = cat_pos = req_pos = 0
+    for p in profiles:
+        n_num, n_cat, n_req = len(p.numeric_columns), len(p.categorical_columns), len(p.required_columns)
+        block = np.hstack([numeric_violations[:, num_pos:num_pos + n_num],
+                           categorical_violations[:, cat_pos:cat_pos + n_cat],
+                           required_violations[:, req_pos:req_pos + n_req]])
+        results[p.name] = pd.DataFrame(block, columns=p.labels, index=df.index)
+        num_pos, cat_pos, req_pos = num_pos + n_num, cat_pos + n_cat, req_pos + n_req
+    return results
@@ -0,0 +1,341 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import numpy as np
+import pandas as pd
+from typing import Iterator, List, Tuple
+from config import (DATASET_CACHE_DIR, LARGE_DATASET_CHUNK_ROWS, LARGE_DATASET_SAMPLE_SIZE,
+                    RANDOM_SEED)
+from utils.gost_profiles import list_profiles, compile_profile, evaluate_profiles
+
+TARGET_COLUMN = 'Соответствует ГОСТ'
+META_NAME = 'meta.json'
+SAMPLE_NAME = 'sample.csv'
+
+
+def dataset_hash(df: pd.DataFrame) -> str:
+    """
+    Хеш содержимого датасета (построчные хеши pandas, без учета индекса).
+    Совпадает с хешем, который ingest_csv вычисляет по частям.
+    """
+    digest = hashlib.sha256()
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def cache_dir_for(dataset_hash_value, cache_dir=DATASET_CACHE_DIR):
+    """Директория кеша датасета (хранилище частей, индексы и т.д.)."""
+    return os.path.join(cache_dir, dataset_hash_value[:16])
+
+
+def cache_subdir(dataset_hash_value, kind, cache_dir=DATASET_CACHE_DIR):
+    """
+    Поддиректория производного кеша датасета (индекс авторов, разбиения и т.д.).
+    Производные кеши не пишутся в корень директории датасета, чтобы не смешиваться с частями хранилища.
+    """
+    return os.path.join(cache_dir_for(dataset_hash_value, cache_dir), kind)
+
+
+def _publish_store(tmp_dir, store_dir):
+    """
+    Переносит собранное хранилище на место. Если директория датасета уже есть
+    (в ней лежат производные кеши), файлы переносятся в нее по одному, meta.json - последним:
+    хранилище считается готовым только при наличии meta.json.
+    """
+    if not os.path.exists(store_dir):
+        os.replace(tmp_dir, store_dir)
+        return
+    for file_name in sorted(os.listdir(tmp_dir), key=lambda name: name == META_NAME):
+        os.replace(os.path.join(tmp_dir, file_name), os.path.join(store_dir, file_name))
+
+
+class IncrementalStats:
+    """
+    Агрегаты датасета, обновляемые по частям:
+    - число документов и соответствующих ГОСТ
+    - count/sum/sumsq/min/max по числовым колонкам
+    - частоты шрифтов
+    - число нарушений каждого правила каждого профиля среди несоответствующих документов;
+      ключ - хеш содержимого профиля (CompiledProfile.key), поэтому после правки профиля
+      старые счетчики не используются
+    Память не зависит от размера датасета.
+    """
+
+    def __init__(self, state=None):
+        state = state or {}
+        self.total_docs = state.get('total_docs', 0)
+        self.compliant_docs = state.get('compliant_docs', 0)
+        self.non_compliant_docs = state.get('non_compliant_docs', 0)
+        self.numeric = state.get('numeric', {})
+        self.fonts = state.get('fonts', {})
+        self.violations = state.get('violations', {})
+
+    def update(self, chunk: pd.DataFrame, profiles):
+        """Добавляет часть датасета к агрегатам."""
+        self.total_docs += len(chunk)
+        if TARGET_COLUMN in chunk.columns:
+            target = chunk[TARGET_COLUMN].replace({'True': 1, 'False': 0}).astype(int)
+            self.compliant_docs += int(target.sum())
+            self.non_compliant_docs += int((target == 0).sum())
+
+        for col in chunk.select_dtypes(include=['number', 'bool']).columns:
+            values = chunk[col].astype(float).dropna().to_numpy()
+            if len(values) == 0:
+                continue
+            agg = self.numeric.setdefault(col, {'count': 0, 'sum': 0.0, 'sumsq': 0.0,
+                                                'min': float('inf'), 'max': float('-inf')})
+            agg['count'] += int(len(values))
+            agg['sum'] += float(values.sum())
+            agg['sumsq'] += float((values ** 2).sum())
+            agg['min'] = min(agg['min'], float(values.min()))
+            agg['max'] = max(agg['max'], float(values.max()))
+
+        if 'Шрифт' in chunk.columns:
+            for font, count in chunk['Шрифт'].value_counts().items():
+                self.fonts[font] = self.fonts.get(font, 0) + int(count)
+
+        self.update_violations(chunk, profiles)
+
+    def update_violations(self, chunk: pd.DataFrame, profiles):
+        """Добавляет нарушения несоответствующих документов части; все профили - за один проход."""
+        if TARGET_COLUMN in chunk.columns:
+            target = chunk[TARGET_COLUMN].replace({'True': 1, 'False': 0}).astype(int)
+            non_compliant = chunk[target.to_numpy() == 0]
+        else:
+            non_compliant = chunk.iloc[0:0]
+        results = evaluate_profiles(non_compliant, profiles)
+        for profile in profiles:
+            counts = self.violations.setdefault(profile.key, {})
+            for label, count in results[profile.name].sum().items():
+                counts[label] = counts.get(label, 0) + int(count)
+
+    def has_violations(self, profile) -> bool:
+        """Посчитаны ли нарушения для этой версии профиля."""
+        return profile.key in self.violations
+
+    def error_counts(self, profile) -> List[Tuple[str, int]]:
+        """Отсортированный список (ошибка, количество) для профиля, как CompiledProfile.error_counts."""
+        counts = [(label, count) for label, count in self.violations.get(profile.key, {}).items() if count > 0]
+        counts.sort(key=lambda x: x[1], reverse=True)
+        return counts
+
+    def summary(self) -> pd.DataFrame:
+        """Таблица mean/std/min/max по числовым колонкам."""
+        rows = {}
+        for col, agg in self.numeric.items():
+            mean = agg['sum'] / agg['count']
+            variance = max(agg['sumsq'] / agg['count'] - mean ** 2, 0.0)
+            rows[col] = {'mean': mean, 'std': variance ** 0.5, 'min': agg['min'], 'max': agg['max']}
+        return pd.DataFrame(rows).T
+
+    def to_dict(self):
+        return {
+            'total_docs': self.total_docs,
+            'compliant_docs': self.compliant_docs,
+            'non_compliant_docs': self.non_compliant_docs,
+            'numeric': self.numeric,
+            'fonts': self.fonts,
+            'violations': self.violations
+        }
+
+
+class StratifiedReservoir:
+    """
+    Стратифицированная выборка фиксированного размера из потока частей.
+    Каждой строке присваивается случайный ключ, в каждом классе хранятся sample_size строк
+    с наименьшими ключами (равномерная выборка без возвращения).
+    При финализации классы берутся пропорционально их доле в полном датасете.
+    """
+
+    def __init__(self, sample_size=LARGE_DATASET_SAMPLE_SIZE, seed=RANDOM_SEED):
+        self.sample_size = sample_size
+        self.rng = np.random.default_rng(seed)
+        self.reservoirs = {}
+        self.class_counts = {}
+
+    def update(self, chunk: pd.DataFrame):
+        keys = self.rng.random(len(chunk))
+        labels = chunk[TARGET_COLUMN].astype(str) if TARGET_COLUMN in chunk.columns else pd.Series('all', index=chunk.index)
+        for label, idx in labels.groupby(labels).indices.items():
+            self.class_counts[label] = self.class_counts.get(label, 0) + len(idx)
+            part = chunk.iloc[idx].assign(_key=keys[idx])
+            current = self.reservoirs.get(label)
+            merged = part if current is None else pd.concat([current, part])
+            self.reservoirs[label] = merged.nsmallest(self.sample_size, '_key')
+
+    def result(self) -> pd.DataFrame:
+        total = sum(self.class_counts.values())
+        parts = []
+        for label, reservoir in self.reservoirs.items():
+            share = max(1, round(self.sample_size * self.class_counts[label] / total))
+            parts.append(reservoir.nsmallest(share, '_key'))
+        if not parts:
+            return pd.DataFrame()
+        return pd.concat(parts).drop(columns='_key').sort_index()
+
+
+class DatasetStore:
+    """
+    Датасет, сохраненный на диск частями фиксированного размера:
+    - chunk_XXXXX.csv - строки датасета по chunk_rows в каждом файле
+    - sample.csv - стратифицированная выборка для графиков и обучения
+    - meta.json - агрегаты IncrementalStats и параметры хранилища
+    Страницы таблицы читаются только из нужных файлов, весь датасет в память не загружается.
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, META_NAME), encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.stats = IncrementalStats(self.meta['stats'])
+        self._sample = None
+
+    @property
+    def name(self):
+        return self.meta['name']
+
+    @property
+    def dataset_hash(self):
+        return self.meta['dataset_hash']
+
+    @property
+    def n_rows(self):
+        return self.meta['n_rows']
+
+    @property
+    def sample(self) -> pd.DataFrame:
+        if self._sample is None:
+            self._sample = pd.read_csv(os.path.join(self.store_dir, SAMPLE_NAME))
+        return self._sample
+
+    def _chunk_path(self, chunk_idx):
+        return os.path.join(self.store_dir, f'chunk_{chunk_idx:05d}.csv')
+
+    def iter_chunks(self) -> Iterator[pd.DataFrame]:
+        """Последовательно читает части датасета; индекс строк - их номера во всем датасете."""
+        for chunk_idx in range(self.meta['n_chunks']):
+            chunk = pd.read_csv(self._chunk_path(chunk_idx))
+            chunk.index = range(chunk_idx * self.meta['chunk_rows'], chunk_idx * self.meta['chunk_rows'] + len(chunk))
+            yield chunk
+
+    def read_page(self, page, page_size) -> pd.DataFrame:
+        """Возвращает страницу таблицы (нумерация с 0), читая только нужные части."""
+        chunk_rows = self.meta['chunk_rows']
+        start = page * page_size
+        stop = min(start + page_size, self.n_rows)
+        if start >= stop:
+            return pd.DataFrame(columns=self.meta['columns'])
+        parts = []
+        for chunk_idx in range(start // chunk_rows, (stop - 1) // chunk_rows + 1):
+            chunk_start = chunk_idx * chunk_rows
+            skip = max(start - chunk_start, 0)
+            parts.append(pd.read_csv(self._chunk_path(chunk_idx),
+                                     skiprows=range(1, skip + 1), nrows=stop - chunk_start - skip))
+        page_df = pd.concat(parts, ignore_index=True)
+        page_df.index = range(start, start + len(page_df))
+        return page_df
+
+    def read_rows(self, positions) -> pd.DataFrame:
+        """Читает строки по их номерам в датасете, открывая только части, где они лежат."""
+        positions = np.sort(np.asarray(positions, dtype=np.int64))
+        chunk_rows = self.meta['chunk_rows']
+        parts = []
+        for chunk_idx in np.unique(positions // chunk_rows):
+            chunk = pd.read_csv(self._chunk_path(chunk_idx))
+            in_chunk = positions[positions // chunk_rows == chunk_idx] - chunk_idx * chunk_rows
+            parts.append(chunk.iloc[in_chunk])
+        if not parts:
+            return pd.DataFrame(columns=self.meta['columns'])
+        return pd.concat(parts, ignore_index=True)
+
+    def error_counts(self, profile) -> List[Tuple[str, int]]:
+        """
+        Число нарушений правил профиля по всему датасету (см. IncrementalStats.error_counts).
+        Профиль, добавленный или измененный после загрузки, досчитывается одним проходом
+        по частям, результат сохраняется в meta.json.
+        """
+        if not self.stats.has_violations(profile):
+            for chunk in self.iter_chunks():
+                self.stats.update_violations(chunk, [profile])
+            self.meta['stats'] = self.stats.to_dict()
+            tmp_path = os.path.join(self.store_dir, META_NAME + '.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.meta, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, os.path.join(self.store_dir, META_NAME))
+        return self.stats.error_counts(profile)
+
+    def filter_rows(self, predicate) -> pd.DataFrame:
+        """Собирает строки, для которых predicate(chunk) вернул True, просматривая части по одной."""
+        return pd.concat([chunk[predicate(chunk)] for chunk in self.iter_chunks()], ignore_index=True)
+
+
+def ingest_csv(source, name, cache_dir=DATASET_CACHE_DIR, chunk_rows=LARGE_DATASET_CHUNK_ROWS,
+               sample_size=LARGE_DATASET_SAMPLE_SIZE) -> DatasetStore:
+    """
+    Загружает CSV по частям на диск и за тот же проход считает агрегаты и выборку.
+    source - путь или файловый объект (например, загруженный в Streamlit файл).
+    Память экономится только при чтении с диска: файл из st.file_uploader уже целиком находится в памяти.
+    Хранилище адресуется хешем содержимого: повторная загрузка того же файла не выполняется.
+    Временные файлы удаляются и при ошибке загрузки.
+    Возвращает DatasetStore.
+    """
+    profiles = [compile_profile(p) for p in list_profiles().values()]
+    # Своя временная директория на каждую загрузку: сессии Streamlit работают в одном процессе
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix='.ingest_', dir=cache_dir)
+    try:
+        stats = IncrementalStats()
+        reservoir = StratifiedReservoir(sample_size)
+        digest = hashlib.sha256()
+        n_rows, n_chunks, columns = 0, 0, []
+        for chunk in pd.read_csv(source, chunksize=chunk_rows):
+            columns = list(chunk.columns)
+            chunk.index = range(n_rows, n_rows + len(chunk))
+            digest.update(pd.util.hash_pandas_object(chunk, index=False).to_numpy().tobytes())
+            chunk.to_csv(os.path.join(tmp_dir, f'chunk_{n_chunks:05d}.csv'), index=False)
+            stats.update(chunk, profiles)
+            reservoir.update(chunk)
+            n_rows += len(chunk)
+            n_chunks += 1
+
+        content_hash = digest.hexdigest()
+        store_dir = cache_dir_for(content_hash, cache_dir)
+        if os.path.exists(os.path.join(store_dir, META_NAME)):
+            # Такой датасет уже загружен - временные файлы не нужны
+            return DatasetStore(store_dir)
+
+        reservoir.result().to_csv(os.path.join(tmp_dir, SAMPLE_NAME), index=False)
+        meta = {
+            'name': name,
+            'dataset_hash': content_hash,
+            'n_rows': n_rows,
+            'n_chunks': n_chunks,
+            'chunk_rows': chunk_rows,
+            'columns': columns,
+            'stats': stats.to_dict()
+        }
+        with open(os.path.join(tmp_dir, META_NAME), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        _publish_store(tmp_dir, store_dir)
+        return DatasetStore(store_dir)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def list_stores(cache_dir=DATASET_CACHE_DIR) -> List[DatasetStore]:
+    """Возвращает все ранее загруженные на диск датасеты."""
+    if not os.path.isdir(cache_dir):
+        return []
+    return [DatasetStore(os.path.join(cache_dir, d)) for d in sorted(os.listdir(cache_dir))
+            if os.path.exists(os.path.join(cache_dir, d, META_NAME))]
+
+
+if __name__ == '__main__':
+    import sys
+
+    # Загрузка очень больших файлов без веб-интерфейса: python -m utils.large_dataset путь.csv
+    for path in sys.argv[1:]:
+        store = ingest_csv(path, os.path.basename(path))
+        print(f"{path}: {store.n_rows} строк, {store.meta['n_chunks']} частей -> {store.store_dir}")
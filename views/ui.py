@@ -1,6 +1,11 @@
+import os
 import streamlit as st
 import pandas as pd
-from models.model_utils import plot_learning_curves, plot_confusion_matrix
+from config import DEFAULT_GOST_PROFILE, LARGE_DATASET_PAGE_SIZE, AUTHOR_SEARCH_TOP_K, EVAL_TOP_GROUPS
+from models.model_utils import plot_learning_curves, plot_confusion_counts
+from utils.gost_profiles import list_profiles, compile_profile
+from utils.author_index import load_or_build_index, normalize_name, INDEX_SUBDIR
+from utils.large_dataset import cache_subdir
 
 
 
@@ -19,38 +24,89 @@ def show_main_interface():
     """)
 
 
-def show_dataset_analysis(df):
+def show_profile_selector():
+    """
+    Позволяет выбрать профиль требований ГОСТ (например, ГОСТ 7.32 или 2.105).
+    Профили загружаются из GOST_PROFILES_DIR и компилируются один раз.
+    Возвращает скомпилированный профиль.
+    """
+    profiles = list_profiles()
+    profile_ids = list(profiles.keys())
+    default_index = profile_ids.index(DEFAULT_GOST_PROFILE) if DEFAULT_GOST_PROFILE in profile_ids else 0
+    profile_id = st.selectbox("Профиль требований ГОСТ", profile_ids, index=default_index,
+                              format_func=lambda pid: profiles[pid]['name'])
+    profile = compile_profile(profiles[profile_id])
+    if profile.description:
+        st.caption(profile.description)
+    return profile
+
+
+def show_dataset_analysis(df, stats=None, duplicates=None):
     """
     Визуализирует базовую статистику датасета:
     - Общее количество документов
     - Соотношение соответствующих/не соответствующих ГОСТу
+    - Число исключенных дубликатов (duplicates - сводка utils.dedup.duplicate_summary)
+    Для датасетов на диске (stats - IncrementalStats) числа берутся из агрегатов,
+    посчитанных при загрузке, без обращения к строкам.
     Выводит информацию в виде текста и метрик.
     """
     st.subheader("🔍 Анализ датасета")
-    total_docs = len(df)
-    compliant_docs = df['Соответствует ГОСТ'].sum()
+    if stats is not None:
+        total_docs = stats.total_docs
+        compliant_docs = stats.compliant_docs
+    else:
+        total_docs = len(df)
+        compliant_docs = df['Соответствует ГОСТ'].sum()
 
     st.write(f"📂 Всего документов: {total_docs}")
     st.write(f"✅ Соответствует ГОСТ: {compliant_docs} ({compliant_docs / total_docs * 100:.1f}%)")
     st.write(f"❌ Не соответствует ГОСТ: {total_docs - compliant_docs} ({(1 - compliant_docs / total_docs) * 100:.1f}%)")
+    if duplicates is not None:
+        st.write(f"🔁 Исключено дубликатов: {duplicates['duplicates']} из {duplicates['rows']} "
+                 f"(самая большая группа копий: {duplicates['largest_cluster']})")
+
+    if stats is not None:
+        with st.expander("Статистика по параметрам (весь датасет)"):
+            st.dataframe(stats.summary())
+
+
+def show_dataset_table(store):
+    """
+    Постраничный просмотр датасета, сохраненного на диске.
+    Каждая страница читается с диска отдельно, весь датасет в браузер не передается.
+    """
+    with st.expander("Просмотр датасета"):
+        total_pages = max(1, -(-store.n_rows // LARGE_DATASET_PAGE_SIZE))
+        page = st.number_input(f"Страница (всего {total_pages})", min_value=1, max_value=total_pages,
+                               value=1, step=1, key="dataset_page")
+        st.dataframe(store.read_page(page - 1, LARGE_DATASET_PAGE_SIZE))
 
 
-def show_model_metrics(metrics):
+def show_model_metrics(summary):
     """
     Отображает ключевые метрики качества модели:
     - Accuracy, Precision, Recall, AUC-ROC
+    Значения - средние по фолдам из отчета кросс-валидации (summary), None - отчета еще нет.
     Использует колонки для компактного представления.
     """
     st.subheader("📊 Метрики модели")
+    if summary is None:
+        st.info("Метрики появятся после построения отчета кросс-валидации (`python -m models.evaluation`).")
+        return
     cols = st.columns(4)
-    cols[0].metric("Точность", f"{metrics['accuracy'] * 100:.1f}%")
-    cols[1].metric("Precision", f"{metrics['precision'] * 100:.1f}%")
-    cols[2].metric("Recall", f"{metrics['recall'] * 100:.1f}%")
-    cols[3].metric("AUC-ROC", f"{metrics['auc']:.3f}")
+    cols[0].metric("Точность", f"{summary['accuracy']['mean'] * 100:.1f}%")
+    cols[1].metric("Precision", f"{summary['precision']['mean'] * 100:.1f}%")
+    cols[2].metric("Recall", f"{summary['recall']['mean'] * 100:.1f}%")
+    # AUC не определен, если в каждом фолде был только один класс
+    cols[3].metric("AUC-ROC", f"{summary['auc']['mean']:.3f}" if summary['auc']['mean'] is not None else "—")
 
 
-def show_training_analysis(history_data, model, X_test, y_test, scaler):
-    """Отображает графики анализа обучения и производительности модели."""
+def show_training_analysis(history_data, evaluation):
+    """
+    Отображает графики анализа обучения и качество модели по отчету кросс-валидации.
+    Отчет строится офлайн (python -m models.evaluation), здесь он только читается - ничего не пересчитывается.
+    """
     st.subheader("📈 Анализ модели")
     with st.expander("Показать графики производительности и обучения"):
 
@@ -62,12 +118,50 @@ def show_training_analysis(history_data, model, X_test, y_test, scaler):
         else:
             st.info("Кривая обучения недоступна (модель была загружена, а не обучена в этой сессии).")
 
+        st.write("#### Кросс-валидация")
+        if evaluation is None:
+            st.info("Отчет кросс-валидации для этого датасета еще не построен. Запустите "
+                    "`python -m models.evaluation <датасет.csv>` (с `--dedup`, если дубликаты исключаются).")
+            return
+        st.info(f"{evaluation['folds']} фолдов, бэкенд {evaluation['backend']}, "
+                f"{evaluation['n_rows']} документов, отчет от {evaluation['created']}.")
+        cols = st.columns(len(evaluation['summary']))
+        for col, (name, stats) in zip(cols, evaluation['summary'].items()):
+            if stats['mean'] is None:
+                col.metric(name, "—")
+            else:
+                col.metric(name, f"{stats['mean']:.3f}", f"± {stats['std']:.3f}", delta_color="off")
+        st.dataframe(pd.DataFrame(evaluation['fold_metrics']).drop(columns=['confusion']))
+
         st.write("#### Матрица ошибок (Confusion Matrix)")
-        st.info("Показывает производительность текущей модели на тестовой части выбранного датасета.")
-        confusion_matrix_fig = plot_confusion_matrix(model, X_test, y_test, scaler)
-        st.pyplot(confusion_matrix_fig)
+        st.info("Предсказания для каждого документа получены моделью, которая не видела его при обучении.")
+        st.pyplot(plot_confusion_counts(evaluation['overall']['confusion'], 'Матрица ошибок (вне фолдов)'))
+
+        st.write("#### Ошибки по шрифтам")
+        st.dataframe(pd.DataFrame(evaluation['by_font']))
+        st.write(f"#### Авторы с наибольшим числом ошибок модели (первые {EVAL_TOP_GROUPS})")
+        st.dataframe(pd.DataFrame(evaluation['by_author'][:EVAL_TOP_GROUPS]))
+
 
 
+def show_drift_report(monitor):
+    """
+    Отчет о дрейфе входных данных относительно обучающей выборки:
+    - PSI и KS по каждому признаку, доля пропусков и статус
+    - новые значения категориальных признаков (например, шрифты, которых не было в обучении)
+    Строится по накопленным счетчикам (документы из интерфейса и демона), без повторной обработки.
+    """
+    with st.expander("📉 Мониторинг дрейфа входных данных"):
+        if monitor is None:
+            st.info("Снимок обучающей выборки не найден - переобучите модель.")
+            return
+        st.write(f"Проверено документов: {monitor.n_docs}")
+        st.dataframe(pd.DataFrame(monitor.report()))
+        for col, values in monitor.unseen_categories().items():
+            if values:
+                st.warning(f"Новые значения «{col}»: " +
+                           ", ".join(f"{value} ({count})" for value, count in values[:10]))
+
 
 def show_error_analysis(analysis):
     """
@@ -81,13 +175,28 @@ def show_error_analysis(analysis):
         st.write(f"- {error}: {count} документов ({count / analysis['total_docs'] * 100:.1f}%)")
 
 
-def show_author_search(df):
+@st.cache_resource(show_spinner="Строим индекс авторов...")
+def _get_author_index(content_hash, _df, _store=None):
+    """
+    Индекс авторов датасета, кешируется по хешу содержимого:
+    в памяти процесса Streamlit и на диске в поддиректории кеша датасета.
+    """
+    if _store is not None:
+        return load_or_build_index(os.path.join(_store.store_dir, INDEX_SUBDIR),
+                                   lambda: (chunk['Автор'] for chunk in _store.iter_chunks()))
+    return load_or_build_index(cache_subdir(content_hash, INDEX_SUBDIR), _df['Автор'])
+
+
+def show_author_search(df, profile, content_hash, store=None):
     """
     Реализует функционал поиска документов по автору:
-    - Поле ввода с подсказками
+    - Нечеткий поиск по триграммному индексу (опечатки, порядок слов, инициалы)
+    - Выбор автора из ранжированного списка совпадений
     - Статистика по соответствию ГОСТу
     - Визуализация частых ошибок автора
     - Подсказки по использованию
+    Для датасета на диске (store) документы автора читаются по номерам строк из индекса.
+    content_hash - хеш датасета, посчитанный один раз в main (ключ кеша индекса).
     """
     st.subheader("👤 Поиск по автору")
 
@@ -95,7 +204,7 @@ def show_author_search(df):
     author_name = st.text_input(
         "Введите ФИО автора:",
         key="author_search",
-        help="Начните вводить фамилию и имя автора"
+        help="Можно вводить ФИО в любом порядке, с инициалами и опечатками"
     )
 
     # Кнопка поиска (чтобы не искать при каждом изменении текста)
@@ -104,8 +213,17 @@ def show_author_search(df):
             st.warning("Введите хотя бы 2 символа для поиска")
             return
 
-        with st.spinner("Ищем документы автора..."):
-            author_analysis = analyze_author(df, author_name)
+        index = _get_author_index(content_hash, df, store)
+        matches = index.search(author_name, k=AUTHOR_SEARCH_TOP_K)
+        author_analysis = None
+        if matches:
+            labels = {f"{name} ({n_docs} док., совпадение {score:.0%})": name for name, score, n_docs in matches}
+            selected = labels[st.selectbox("Найденные авторы:", list(labels), key="author_match")]
+
+            with st.spinner("Ищем документы автора..."):
+                rows = index.rows(selected)
+                author_docs = store.read_rows(rows) if store is not None else df.loc[rows]
+                author_analysis = analyze_author(author_docs, selected, profile)
 
         if author_analysis:
             st.success(f"Найдено документов: {author_analysis['total_docs']}")
@@ -138,7 +256,7 @@ def show_author_search(df):
             st.warning("Автор не найден. Попробуйте изменить запрос.")
 
         # Подсказка для пользователя
-        st.info("💡 Совет: для точного поиска вводите фамилию полностью")
+        st.info("💡 Совет: если нужного автора нет в списке, добавьте имя или отчество")
 
 
 def show_document_checker():
@@ -206,14 +324,15 @@ def show_document_checker():
             submitted = st.form_submit_button("Проверить")
             if submitted:
                 st.session_state.submitted = True
+                st.session_state.drift_counted = False  # новая проверка еще не учтена в мониторинге
 
 
-def analyze_author(df, author_name):
+def analyze_author(df, author_name, profile):
     """
     Анализирует документы конкретного автора:
-    - Фильтрует документы по автору (без учета регистра)
+    - Фильтрует документы по автору (без учета регистра, ё/е и знаков препинания)
     - Считает статистику соответствия ГОСТу
-    - Выявляет характерные ошибки оформления
+    - Выявляет характерные ошибки оформления по правилам профиля
     - Сортирует ошибки по частоте встречаемости
     Возвращает структурированные данные для отображения.
     """
@@ -221,8 +340,8 @@ def analyze_author(df, author_name):
         return None
 
     try:
-        # Ищем документы автора (без учета регистра)
-        author_docs = df[df['Автор'].str.strip().str.lower() == author_name.strip().lower()]
+        # Ищем документы автора (так же, как их группирует индекс авторов)
+        author_docs = df[df['Автор'].map(normalize_name) == normalize_name(author_name)]
 
         if author_docs.empty:
             return None
@@ -237,28 +356,9 @@ def analyze_author(df, author_name):
         non_compliant = author_docs[author_docs['Соответствует ГОСТ'] == 0]
 
         if not non_compliant.empty:
-            # Анализ частых ошибок
-            errors = {
-                'Неправильные поля': ((non_compliant['Верхнее поле (см)'] != 2.0) |
-                                      (non_compliant['Нижнее поле (см)'] != 2.0) |
-                                      (non_compliant['Левое поле (см)'] != 3.0) |
-                                      (non_compliant['Правое поле (см)'] != 1.0)).sum(),
-                'Неверный шрифт': (non_compliant['Шрифт'] != 'Times New Roman').sum(),
-                'Неправильные отступы': (non_compliant['Отступ абзаца (см)'] != 1.25).sum(),
-                'Отсутствует нумерация': (non_compliant['Наличие нумерации страниц'] == 0).sum(),
-                'Ошибки в колонтитулах': (non_compliant['Наличие колонтитулов'] == 0).sum(),
-                'Неправильные заголовки': (non_compliant['Верно ли оформлены заголовки'] == 0).sum(),
-                'Неправильные рисунки': (non_compliant['Верно ли оформлены рисунки'] == 0).sum(),
-                'Неправильные ссылки': (non_compliant['Верно ли оформлены ссылки'] == 0).sum(),
-                'Неправильные таблицы': (non_compliant['Верно ли оформлены таблицы'] == 0).sum(),
-                'Неправильные реквизиты': (non_compliant['Верно ли указаны реквизиты документа'] == 0).sum()
-            }
-
-            # Фильтруем только ошибки, которые встречаются
-            error_list = [(error, count) for error, count in errors.items() if count > 0]
-
-            # Сортируем по количеству ошибок (от большего к меньшему)
-            error_list.sort(key=lambda x: x[1], reverse=True)
+            # Анализ частых ошибок: правила одной группы (например, все поля) считаются вместе,
+            # результат уже отфильтрован и отсортирован по убыванию
+            error_list = profile.error_counts(non_compliant, by_group=True)
 
         return {
             'total_docs': total_docs,
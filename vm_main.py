@@ -2,8 +2,14 @@ import streamlit as st
 import pandas as pd
 import os
 import numpy as np
-from sklearn.model_selection import train_test_split
-from models.model_utils import train_and_save_model, load_trained_components, preprocess_data
+from models.model_utils import (train_and_save_model, load_trained_components, is_model_current,
+                                load_artifacts, prepare_features)
+from models.evaluation import load_report
+from models.attribution import explain_batch
+from config import LARGE_DATASET_THRESHOLD_MB
+from utils.large_dataset import ingest_csv, list_stores, dataset_hash
+from utils.dedup import find_duplicates, deduplicate, duplicate_summary
+from utils.drift import load_monitor, combined_monitor, monitor_path
 from views.ui import (
     show_main_interface,
     show_dataset_analysis,
@@ -11,27 +17,42 @@ from views.ui import (
     show_error_analysis,
     show_author_search,
     show_document_checker,
-    show_training_analysis
+    show_training_analysis,
+    show_profile_selector,
+    show_dataset_table,
+    show_drift_report
 )
 
 
 
-def predict_compliance(input_data, model, scaler, label_encoder):
-    """Предсказание соответствия ГОСТ с помощью нейросети"""
-    try:
-        input_df = pd.DataFrame([input_data])
+@st.cache_data(show_spinner="Ищем дубликаты...")
+def find_duplicates_cached(df):
+    """Кластеры дубликатов датасета, пересчитываются только при смене данных."""
+    return find_duplicates(df)
 
-        if 'Шрифт' in input_df.columns:
-            input_df['Шрифт'] = label_encoder.transform(input_df['Шрифт'])
 
-        bool_cols = ['Наличие колонтитулов', 'Наличие нумерации страниц', 'Наличие титульного листа']
-        for col in bool_cols:
-            if col in input_df.columns:
-                input_df[col] = input_df[col].astype(int)
+def cached_dataset_hash(source_key, df):
+    """
+    Хеш содержимого датасета, считается один раз на источник данных и хранится в сессии,
+    а не при каждом перезапуске скрипта Streamlit.
+    """
+    hashes = st.session_state.setdefault('dataset_hashes', {})
+    if source_key not in hashes:
+        hashes[source_key] = dataset_hash(df)
+    return hashes[source_key]
 
-        scaled_data = scaler.transform(input_df)
-        prediction = model.predict(scaled_data)
-        return prediction[0][0]
+
+def predict_compliance(input_data, model, scaler, label_encoder):
+    """
+    Предсказание соответствия ГОСТ с помощью нейросети.
+    Вместе с вероятностью возвращает признаки, сильнее всего повлиявшие на оценку.
+    Шрифт, которого не было в обучающих данных, не вызывает ошибку (см. prepare_features).
+    Возвращает {'probability', 'top_contributors'} или None при ошибке.
+    """
+    try:
+        # Те же преобразования и порядок колонок, что и при пакетной проверке
+        scaled_data, feature_names = prepare_features(pd.DataFrame([input_data]), scaler, label_encoder)
+        return explain_batch(model, scaled_data, feature_names)[0]
     except Exception as e:
         st.error(f"Ошибка при предсказании: {str(e)}")
         return None
@@ -44,36 +65,86 @@ def main():
     datasets = {}
     default_df = pd.read_csv('data/default_dataset.csv')
     datasets['default'] = default_df
-
-    uploaded_file = st.file_uploader("Загрузите свой датасет (CSV)", type=["csv"])
+    # Ключи источников для кеша хешей: файл меняется - меняется ключ
+    sources = {'default': f"default:{os.path.getmtime('data/default_dataset.csv')}"}
+
+    # Большие датасеты хранятся на диске по частям, в памяти - только стратифицированная выборка
+    stores = {}
+    for store in list_stores():
+        stores[f"{store.name} (на диске)"] = store
+
+    uploaded_file = st.file_uploader(
+        "Загрузите свой датасет (CSV)", type=["csv"],
+        help="Загруженный файл целиком хранится в памяти сервера (не больше server.maxUploadSize, "
+             "по умолчанию 200 МБ). Очень большие датасеты сохраняйте на диск командой "
+             "`python -m utils.large_dataset путь.csv` - они появятся в списке датасетов.")
     if uploaded_file is not None:
         try:
-            custom_df = pd.read_csv(uploaded_file)
-            datasets['custom'] = custom_df
-            st.success("Датасет успешно загружен!")
+            if uploaded_file.size > LARGE_DATASET_THRESHOLD_MB * 1024 * 1024:
+                upload_key = f"{uploaded_file.name}:{uploaded_file.size}"
+                if st.session_state.get('large_upload_key') != upload_key:
+                    with st.spinner("Большой датасет сохраняется на диск по частям..."):
+                        st.session_state.large_store = ingest_csv(uploaded_file, uploaded_file.name)
+                    st.session_state.large_upload_key = upload_key
+                # Тот же датасет уже есть в списке сохраненных на диске - не дублируем
+                stores = {key: existing for key, existing in stores.items()
+                          if existing.store_dir != st.session_state.large_store.store_dir}
+                stores['custom'] = st.session_state.large_store
+                st.success(f"Датасет сохранен на диск: {stores['custom'].n_rows} строк. "
+                           f"Для графиков и обучения используется выборка из {len(stores['custom'].sample)} строк.")
+            else:
+                custom_df = pd.read_csv(uploaded_file)
+                datasets['custom'] = custom_df
+                sources['custom'] = f"upload:{uploaded_file.name}:{uploaded_file.size}"
+                st.success("Датасет успешно загружен!")
         except Exception as e:
             st.error(f"Ошибка загрузки файла: {str(e)}")
 
+    for key, store in stores.items():
+        datasets[key] = store.sample
+
     dataset_choice = st.selectbox("Выберите датасет для работы",
                                   list(datasets.keys()))
     df = datasets[dataset_choice]
-
-    # Инициализируем переменные для данных обучения
-    X, y, _ = preprocess_data(df)
-    _, X_test, _, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    store = stores.get(dataset_choice)
+    # Для датасета на диске - хеш всего файла, посчитанный при загрузке (по нему строится отчет
+    # python -m models.evaluation <csv>), а не хеш выборки в памяти
+    content_hash = store.dataset_hash if store is not None else cached_dataset_hash(sources[dataset_choice], df)
+
+    profile = show_profile_selector()
+
+    # Копии одной работы и повторные сдачи можно исключить из обучения и статистики.
+    # Для датасета на диске дубликаты ищутся в выборке, агрегаты по всему файлу не используются
+    dedup = st.checkbox("Исключить дубликаты и повторные сдачи работ")
+    analysis_df, duplicates = df, None
+    if dedup:
+        cluster_ids = find_duplicates_cached(df)
+        duplicates = duplicate_summary(cluster_ids)
+        analysis_df = deduplicate(df, cluster_ids)
+    analysis_hash = cached_dataset_hash(f"{content_hash}:dedup", analysis_df) if dedup else content_hash
+    stats = store.stats if store is not None and not dedup else None
 
     # 2. Кнопка принудительного переобучения
     force_retrain = st.button("Переобучить модель на текущем датасете")
 
-    history_data = None
-    model_exists = os.path.exists('models/trained_model/model.h5')
+    model, history_data = None, None
+    model_exists = load_artifacts() is not None
+    # Модель обучается на analysis_df: дубликаты уже исключены выше, хеш берется из сессии.
+    # Хеш датасета на диске относится ко всему файлу, а обучение идет на выборке - ее хеш свой
+    training_hash = analysis_hash if store is None or dedup else cached_dataset_hash(f"{content_hash}:sample", df)
 
     # 3. Определяем, нужно ли обучать модель
-    if force_retrain or not model_exists:
+    if force_retrain and is_model_current(analysis_df, content_hash=training_hash):
+        # Обучение детерминировано: на тех же данных получится та же модель, поэтому она просто загружается
+        model, scaler, label_encoder, history_data = load_trained_components()
+        if model is not None:
+            st.info("ℹ️ Датасет не изменился - используется модель, уже обученная на нем")
+    if model is None and (force_retrain or not model_exists):
         with st.spinner("Модель обучается... Это может занять некоторое время."):
-            model, scaler, label_encoder, history_data, _, _ = train_and_save_model(df)
+            model, scaler, label_encoder, history_data, _, _ = train_and_save_model(
+                analysis_df, force=True, content_hash=training_hash)
         st.success("✅ Модель обучена и сохранена!")
-    else:
+    elif model is None:
         # Загружаем существующую модель
         model, scaler, label_encoder, history_data = load_trained_components()
         if model is not None:
@@ -82,63 +153,44 @@ def main():
             # Если загрузка не удалась, все равно обучаем
             st.warning("⚠️ Не удалось загрузить модель. Будет выполнено переобучение...")
             with st.spinner("Модель обучается..."):
-                model, scaler, label_encoder, history_data, _, _ = train_and_save_model(df)
+                model, scaler, label_encoder, history_data, _, _ = train_and_save_model(
+                    analysis_df, content_hash=training_hash)
             st.success("✅ Модель обучена и сохранена!")
 
+    # Качество модели - из готового отчета кросс-валидации, в интерфейсе ничего не пересчитывается
+    evaluation = load_report(analysis_hash)
     if model:
-        # Метрики и графики теперь можно показывать всегда
-        show_training_analysis(history_data, model, X_test, y_test, scaler)
-
-    if 'metrics' not in st.session_state:
-        X, y, _ = preprocess_data(df)
-        X_scaled = scaler.transform(X)
-        y_pred = (model.predict(X_scaled) > 0.5).astype(int)
-
-        from sklearn.metrics import accuracy_score, precision_score, recall_score, roc_auc_score
-        st.session_state.metrics = {
-            'accuracy': accuracy_score(y, y_pred),
-            'precision': precision_score(y, y_pred),
-            'recall': recall_score(y, y_pred),
-            'auc': roc_auc_score(y, y_pred)
-        }
+        show_training_analysis(history_data, evaluation)
+
+    artifacts = load_artifacts()
+    drift_reference = artifacts.drift_reference if artifacts is not None else None
+    show_drift_report(combined_monitor(drift_reference) if drift_reference is not None else None)
 
-    show_model_metrics(st.session_state.metrics)
-    show_dataset_analysis(df)
+    show_model_metrics(evaluation['summary'] if evaluation is not None else None)
+    show_dataset_analysis(analysis_df, stats, duplicates)
+    if store is not None:
+        show_dataset_table(store)
 
     error_counts = []
-    if 'Соответствует ГОСТ' in df.columns:
+    total_docs = len(analysis_df)
+    if stats is not None:
+        # Агрегаты по всему датасету посчитаны при загрузке на диск (новая версия профиля досчитывается)
+        error_counts = store.error_counts(profile)[:5]
+        total_docs = store.n_rows
+    elif 'Соответствует ГОСТ' in analysis_df.columns:
         # Получаем только документы, не соответствующие ГОСТ
-        non_compliant = df[df['Соответствует ГОСТ'] == 0]
-        total_non_compliant = len(non_compliant)
-
-        if total_non_compliant > 0:
-            # Считаем ошибки по каждому параметру отдельно
-            error_counts = [
-                ("Неправильные верхние поля", (non_compliant['Верхнее поле (см)'] != 2.0).sum()),
-                ("Неправильные нижние поля", (non_compliant['Нижнее поле (см)'] != 2.0).sum()),
-                ("Неправильные левые поля", (non_compliant['Левое поле (см)'] != 3.0).sum()),
-                ("Неправильные правые поля", (non_compliant['Правое поле (см)'] != 1.0).sum()),
-                ("Неверный шрифт", (non_compliant['Шрифт'] != 'Times New Roman').sum()),
-                ("Неправильные отступы", (non_compliant['Отступ абзаца (см)'] != 1.25).sum()),
-                ("Отсутствует нумерация", (non_compliant['Наличие нумерации страниц'] == 0).sum()),
-                ("Ошибки в колонтитулах", (non_compliant['Наличие колонтитулов'] == 0).sum())
-            ]
-
-            # Фильтруем только те ошибки, которые встречаются
-            error_counts = [err for err in error_counts if err[1] > 0]
-
-            # Сортируем по количеству ошибок (от большего к меньшему)
-            error_counts.sort(key=lambda x: x[1], reverse=True)
-
-            # Берем топ-5 ошибок
-            error_counts = error_counts[:5]
+        non_compliant = analysis_df[analysis_df['Соответствует ГОСТ'] == 0]
+
+        if len(non_compliant) > 0:
+            # Считаем ошибки по каждому правилу профиля (отсортированы по убыванию), берем топ-5
+            error_counts = profile.error_counts(non_compliant)[:5]
 
     show_error_analysis({
         'error_counts': error_counts,
-        'total_docs': len(df)
+        'total_docs': total_docs
     })
 
-    show_author_search(df)
+    show_author_search(df, profile, content_hash, store)
     show_document_checker()
 
     if 'submitted' in st.session_state and st.session_state.submitted:
@@ -164,18 +216,30 @@ def main():
             'Наличие титульного листа': int(st.session_state.has_title_page),
             'Верно ли оформлены заголовки': int(st.session_state.correct_headers),
             'Есть ли содержание с правильными отступами': int(st.session_state.has_contents),
-            'Верно ли оформены ссылки': int(st.session_state.correct_links),
-            'Верно ли оформены таблицы': int(st.session_state.correct_tables),
-            'Верно ли оформены рисунки': int(st.session_state.correct_images),
+            'Верно ли оформлены ссылки': int(st.session_state.correct_links),
+            'Верно ли оформлены таблицы': int(st.session_state.correct_tables),
+            'Верно ли оформлены рисунки': int(st.session_state.correct_images),
             'Соответствует ли оформление списков': int(st.session_state.correct_lists),
             'Правильно ли оформлены приложения': int(st.session_state.correct_appendix),
             'Верно ли указаны реквизиты документа': int(st.session_state.correct_details),
             'Дата создания': days_since_2000
         }
 
-        compliance_prob = predict_compliance(input_data, model, scaler, label_encoder)
+        result = predict_compliance(input_data, model, scaler, label_encoder)
+
+        if input_data['Шрифт'] not in label_encoder.classes_:
+            st.warning(f"⚠️ Шрифт «{input_data['Шрифт']}» не встречался в обучающих данных - "
+                       f"модель оценивает его нейтрально, проверьте по рекомендациям")
+
+        if result is not None and drift_reference is not None and not st.session_state.get('drift_counted'):
+            # Каждая проверка учитывается в мониторинге дрейфа один раз, а не при каждой перерисовке
+            monitor = load_monitor('ui', drift_reference)
+            monitor.update(input_data)
+            monitor.save(monitor_path('ui'))
+            st.session_state.drift_counted = True
 
-        if compliance_prob is not None:
+        if result is not None:
+            compliance_prob = result['probability']
             st.subheader("🔍 Результаты проверки")
             col1, col2 = st.columns(2)
 
@@ -191,39 +255,15 @@ def main():
 
             with col2:
                 st.write("**Рекомендации:**")
-                if st.session_state.font != 'Times New Roman':
-                    st.write("- Используйте шрифт Times New Roman")
-                if st.session_state.font_size != 14:
-                    st.write(f"- Установите размер шрифта 14 (текущий: {st.session_state.font_size})")
-                if st.session_state.top_margin != 2.0:
-                    st.write(f"- Верхнее поле должно быть 2.0 см (текущее: {st.session_state.top_margin} см)")
-                if st.session_state.bottom_margin != 2.0:
-                    st.write(f"- Нижнее поле должно быть 2.0 см (текущее: {st.session_state.bottom_margin} см)")
-                if st.session_state.left_margin != 3.0:
-                    st.write(f"- Левое поле должно быть 3.0 см (текущее: {st.session_state.left_margin} см)")
-                if st.session_state.right_margin != 1.0:
-                    st.write(f"- Правое поле должно быть 1.0 см (текущее: {st.session_state.right_margin} см)")
-                if st.session_state.line_spacing != 1.5:
-                    st.write(f"- Межстрочный интервал должен быть 1.5 (текущий: {st.session_state.line_spacing})")
-                if st.session_state.paragraph_indent != 1.25:
-                    st.write(f"- Отступ абзаца должен быть 1.25 см (текущий: {st.session_state.paragraph_indent} см)")
-                if not st.session_state.has_headers:
-                    st.write("- Добавьте колонтитулы")
-                if not st.session_state.has_pagination:
-                    st.write("- Добавьте нумерацию страниц")
-                if not st.session_state.has_title_page:
-                    st.write("- Добавьте титульный лист")
-
-                # Добавляем рекомендации для новых параметров
-                st.write("\n**Проверьте также:**")
-                st.write("- Правильность оформления заголовков")
-                st.write("- Корректность оформления рисунков")
-                st.write("- Правильность оформления ссылок")
-                st.write("- Соответствие таблиц требованиям ГОСТ")
-                st.write("- Наличие и правильность реквизитов документа")
-                st.write("- Наличие содержания с правильными отступами")
-                st.write("- Оформление списков по ГОСТу")
-                st.write("- Правильность оформления приложений")
+                for recommendation in profile.recommendations(input_data):
+                    st.write(f"- {recommendation}")
+
+                # Признаки, которые сильнее всего снизили оценку модели для этого документа
+                negative = [(feature, value) for feature, value in result['top_contributors'] if value < 0]
+                if negative:
+                    st.write("\n**Сильнее всего снизили оценку:**")
+                    for feature, _ in negative:
+                        st.write(f"- {feature}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,337 @@
+import os
+import json
+import time
+import queue
+import signal
+import sqlite3
+import hashlib
+import argparse
+import threading
+import docx
+import pandas as pd
+from config import (WATCH_DIR, RESULTS_DB, WATCH_POLL_INTERVAL, WATCH_QUEUE_SIZE, WATCH_BATCH_SIZE,
+                    WATCH_EXTRACT_WORKERS, DEFAULT_GOST_PROFILE)
+from docx_processor import DocxProcessor
+from models.model_utils import load_artifacts, prepare_features, feature_frame
+from models.attribution import explain_batch
+from utils.gost_profiles import get_profile
+from utils.drift import load_monitor, monitor_path
+
+SUPPORTED_EXTENSIONS = ('.docx', '.csv')
+
+
+def file_hash(path):
+    """SHA-256 содержимого файла, читается блоками."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def verdict(probability):
+    """Вердикт по вероятности соответствия (те же пороги, что и в веб-интерфейсе)."""
+    if probability > 0.7:
+        return 'Соответствует ГОСТ'
+    if probability > 0.4:
+        return 'Требуется проверка'
+    return 'Не соответствует ГОСТ'
+
+
+class ResultsStore:
+    """
+    Локальное хранилище очереди и результатов на SQLite:
+    - files: файл (по хешу содержимого) и его статус queued/processing/done/error/retry
+      (retry - временная ошибка: модель не загружена, файл еще занят; такой файл проверяется повторно)
+    - results: результат проверки каждого документа (строки CSV или DOCX), вместе с признаками,
+      сильнее всего повлиявшими на оценку модели
+    Очередь хранится в той же базе, поэтому переживает перезапуск демона.
+    """
+
+    def __init__(self, path=RESULTS_DB):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS files (
+                    file_hash TEXT PRIMARY KEY,
+                    path TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    queued_at REAL,
+                    processed_at REAL,
+                    error TEXT
+                );
+                CREATE TABLE IF NOT EXISTS results (
+                    file_hash TEXT NOT NULL,
+                    row_idx INTEGER NOT NULL,
+                    document TEXT,
+                    author TEXT,
+                    probability REAL,
+                    verdict TEXT,
+                    violations TEXT,
+                    top_contributors TEXT,
+                    PRIMARY KEY (file_hash, row_idx)
+                );
+            """)
+            # База, созданная до сохранения вкладов признаков
+            columns = [row[1] for row in self.conn.execute("PRAGMA table_info(results)")]
+            if 'top_contributors' not in columns:
+                self.conn.execute("ALTER TABLE results ADD COLUMN top_contributors TEXT")
+
+    def enqueue(self, file_hash, path):
+        """
+        Добавляет файл в очередь. Возвращает False, если файл с таким содержимым уже известен.
+        Файл, отложенный из-за временной ошибки (retry), ставится в очередь снова.
+        """
+        with self.lock, self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO files (file_hash, path, status, queued_at) VALUES (?, ?, 'queued', ?) "
+                "ON CONFLICT (file_hash) DO UPDATE SET path = excluded.path, status = 'queued', "
+                "queued_at = excluded.queued_at WHERE files.status = 'retry'",
+                (file_hash, path, time.time()))
+            return cursor.rowcount > 0
+
+    def requeue_retryable(self):
+        """Возвращает в очередь файлы, отложенные из-за временных ошибок (вызывается при запуске демона)."""
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE files SET status = 'queued' WHERE status = 'retry'")
+
+    def pending(self):
+        """Файлы, не обработанные до конца (в том числе прерванные перезапуском)."""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT file_hash, path FROM files WHERE status IN ('queued', 'processing') ORDER BY queued_at"
+            ).fetchall()
+
+    def mark(self, file_hash, status, error=None):
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE files SET status = ?, processed_at = ?, error = ? WHERE file_hash = ?",
+                              (status, time.time(), error, file_hash))
+            if status == 'processing':
+                # Частичные результаты прерванной обработки перезаписываются
+                self.conn.execute("DELETE FROM results WHERE file_hash = ?", (file_hash,))
+
+    def save_results(self, rows):
+        with self.lock, self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+
+class WatchPipeline:
+    """
+    Конвейер фоновой проверки документов из папки:
+    1. сканер - опрашивает папку, пропускает уже обработанные файлы по хешу содержимого
+    2. извлечение (несколько потоков) - DocxProcessor для DOCX, чтение по частям для CSV
+    3. оценка (один поток) - правила профиля ГОСТ, модель и вклады признаков (explain_batch),
+       пакетами до WATCH_BATCH_SIZE строк; каждый пакет учитывается в мониторинге дрейфа (источник 'daemon')
+    Стадии связаны очередями ограниченного размера: если оценка не успевает,
+    извлечение и сканирование блокируются (обратное давление), память не растет.
+    """
+
+    def __init__(self, watch_dir=WATCH_DIR, store=None, profile=None,
+                 poll_interval=WATCH_POLL_INTERVAL, workers=WATCH_EXTRACT_WORKERS):
+        self.watch_dir = watch_dir
+        self.store = store or ResultsStore()
+        self.profile = profile or get_profile(DEFAULT_GOST_PROFILE)
+        self.poll_interval = poll_interval
+        self.workers = workers
+        self.file_queue = queue.Queue(maxsize=WATCH_QUEUE_SIZE)
+        self.batch_queue = queue.Queue(maxsize=WATCH_QUEUE_SIZE)
+        self.stop_event = threading.Event()
+        self._sizes = {}  # путь -> (размер, mtime) на прошлом опросе
+        self._hashes = {}  # (путь, размер, mtime) -> хеш, чтобы не пересчитывать
+        self._failed = set()  # файлы, на которых оценка завершилась ошибкой
+
+    # --- Сканирование ---
+
+    def scan(self, require_stable=True):
+        """Один проход по папке: новые и полностью записанные файлы ставятся в очередь."""
+        for entry in sorted(os.scandir(self.watch_dir), key=lambda e: e.name):
+            if not entry.is_file() or not entry.name.lower().endswith(SUPPORTED_EXTENSIONS):
+                continue
+            stat = entry.stat()
+            signature = (stat.st_size, stat.st_mtime)
+            previous = self._sizes.get(entry.path)
+            self._sizes[entry.path] = signature
+            # Файл, который еще копируется, меняет размер между опросами
+            if require_stable and previous != signature:
+                continue
+            key = (entry.path,) + signature
+            if key in self._hashes:
+                continue
+            self._hashes[key] = file_hash(entry.path)
+            if self.store.enqueue(self._hashes[key], entry.path):
+                self.file_queue.put((self._hashes[key], entry.path))
+
+    # --- Извлечение ---
+
+    def _extract(self, path):
+        """Возвращает строки датасета из файла пакетами (DataFrame)."""
+        if path.lower().endswith('.docx'):
+            yield pd.DataFrame([DocxProcessor.extract_metadata(docx.Document(path), os.path.basename(path))])
+        else:
+            yield from pd.read_csv(path, chunksize=WATCH_BATCH_SIZE)
+
+    def extract_worker(self):
+        while True:
+            item = self.file_queue.get()
+            if item is None:
+                self.batch_queue.put(None)
+                return
+            digest, path = item
+            self.store.mark(digest, 'processing')
+            try:
+                offset = 0
+                for batch in self._extract(path):
+                    self.batch_queue.put((digest, batch, offset, False))
+                    offset += len(batch)
+                # Пустой пакет-маркер: файл извлечен полностью
+                self.batch_queue.put((digest, pd.DataFrame(), offset, True))
+            except OSError as e:
+                # Файл занят или еще копируется - проверяется повторно при следующем появлении или запуске
+                print(f"Ошибка извлечения {path}: {str(e)}")
+                self.store.mark(digest, 'retry', str(e))
+            except Exception as e:
+                print(f"Ошибка извлечения {path}: {str(e)}")
+                self.store.mark(digest, 'error', str(e))
+
+    # --- Оценка ---
+
+    def score_worker(self):
+        # История обучения для оценки не нужна и не загружается
+        model = scaler = label_encoder = reference = load_error = None
+        try:
+            artifacts = load_artifacts()
+            if artifacts is None:
+                raise ValueError("модель еще не обучена")
+            model, scaler, label_encoder = artifacts.model, artifacts.scaler, artifacts.label_encoder
+            reference = artifacts.drift_reference
+        except Exception as e:
+            # Без модели оценивать нечего, но очередь продолжает разбираться, иначе извлечение остановится
+            load_error = f"Не удалось загрузить модель: {str(e)}"
+            print(load_error)
+        self.monitor = load_monitor('daemon', reference) if reference is not None else None
+        finished_workers = 0
+        while finished_workers < self.workers:
+            items = [self.batch_queue.get()]
+            rows = len(items[0][1]) if items[0] is not None else 0
+            # Добираем пакет до WATCH_BATCH_SIZE строк из того, что уже стоит в очереди
+            while rows < WATCH_BATCH_SIZE:
+                try:
+                    item = self.batch_queue.get_nowait()
+                except queue.Empty:
+                    break
+                items.append(item)
+                rows += len(item[1]) if item is not None else 0
+
+            finished_workers += sum(item is None for item in items)
+            items = [item for item in items if item is not None]
+            if items and load_error is not None:
+                # Модель появится после обучения - файлы проверяются при следующем запуске
+                self._fail(items, load_error, status='retry')
+            elif items:
+                self._score(items, model, scaler, label_encoder)
+
+    def _fail(self, items, message, status='error'):
+        """Помечает файлы пакета статусом ошибки (один раз на файл), их остальные части пропускаются."""
+        for digest, _, _, _ in items:
+            if digest not in self._failed:
+                self._failed.add(digest)
+                self.store.mark(digest, status, message)
+
+    def _score(self, items, model, scaler, label_encoder):
+        frames = [batch for _, batch, _, _ in items if len(batch)]
+        if frames:
+            batch = pd.concat(frames, ignore_index=True)
+            try:
+                X_scaled, feature_names = prepare_features(batch, scaler, label_encoder)
+                # Предсказание и вклады признаков - один векторный проход по всему пакету
+                explained = explain_batch(model, X_scaled, feature_names)
+            except Exception as e:
+                # Ошибка в одном файле не должна останавливать остальные - оцениваем по отдельности
+                if len(items) > 1:
+                    for item in items:
+                        self._score([item], model, scaler, label_encoder)
+                    return
+                self._failed.add(items[0][0])
+                self.store.mark(items[0][0], 'error', str(e))
+                return
+            violations = self.profile.violations(batch)
+            if self.monitor is not None:
+                self.monitor.update_batch(feature_frame(batch))
+                self.monitor.save(monitor_path('daemon'))
+
+        position = 0
+        for digest, part, offset, is_last in items:
+            rows = []
+            for i in range(len(part)):
+                row = batch.iloc[position + i]
+                failed = [label for label, flag in violations.iloc[position + i].items() if flag]
+                result = explained[position + i]
+                rows.append((digest, offset + i, str(row.get('Название документа', '')),
+                             str(row.get('Автор', '')), result['probability'], verdict(result['probability']),
+                             json.dumps(failed, ensure_ascii=False),
+                             json.dumps(result['top_contributors'], ensure_ascii=False)))
+            position += len(part)
+            self.store.save_results(rows)
+            if is_last and digest not in self._failed:
+                self.store.mark(digest, 'done')
+
+    # --- Запуск ---
+
+    def run(self, once=False):
+        """
+        Запускает конвейер. Сначала возобновляются файлы, оставшиеся в очереди с прошлого запуска,
+        и файлы, отложенные из-за временных ошибок.
+        При once=True папка просматривается один раз и демон завершается после обработки.
+        """
+        os.makedirs(self.watch_dir, exist_ok=True)
+        threads = [threading.Thread(target=self.score_worker, daemon=True)]
+        threads += [threading.Thread(target=self.extract_worker, daemon=True) for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+
+        self.store.requeue_retryable()
+        for digest, path in self.store.pending():
+            if os.path.exists(path):
+                self.file_queue.put((digest, path))
+            else:
+                self.store.mark(digest, 'error', 'Файл удален до обработки')
+
+        while not self.stop_event.is_set():
+            self.scan(require_stable=not once)
+            if once:
+                break
+            self.stop_event.wait(self.poll_interval)
+
+        if not once:
+            # Необработанные файлы остаются в базе со статусом queued и будут обработаны при следующем запуске
+            while True:
+                try:
+                    self.file_queue.get_nowait()
+                except queue.Empty:
+                    break
+        for _ in range(self.workers):
+            self.file_queue.put(None)
+        for thread in threads:
+            thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Фоновая проверка документов из папки на соответствие ГОСТ")
+    parser.add_argument('--dir', default=WATCH_DIR, help="Папка, в которую поступают DOCX/CSV")
+    parser.add_argument('--db', default=RESULTS_DB, help="Файл базы результатов SQLite")
+    parser.add_argument('--profile', default=DEFAULT_GOST_PROFILE, help="Профиль требований ГОСТ")
+    parser.add_argument('--interval', type=float, default=WATCH_POLL_INTERVAL, help="Интервал опроса, с")
+    parser.add_argument('--once', action='store_true', help="Обработать текущие файлы и завершиться")
+    args = parser.parse_args()
+
+    pipeline = WatchPipeline(args.dir, ResultsStore(args.db), get_profile(args.profile), args.interval)
+    signal.signal(signal.SIGINT, lambda *_: pipeline.stop_event.set())
+    signal.signal(signal.SIGTERM, lambda *_: pipeline.stop_event.set())
+    print(f"Наблюдение за папкой {args.dir}, результаты: {args.db}")
+    pipeline.run(once=args.once)
+
+
+if __name__ == "__main__":
+    main()